@@ -1 +1,284 @@
-<content omitted>
\ No newline at end of file
+"""FYND search API
+
+The search index is loaded once when this module is imported. Under
+start_backend.py (gunicorn with preload_app) that happens in the master
+process, and the workers are forked afterwards so they share its pages.
+"""
+import gc
+import json
+import math
+import os
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from flask import Flask, request
+from flask_cors import CORS
+
+# The engine modules live at the repository root and import each other by name
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if REPO_ROOT in sys.path:
+    sys.path.remove(REPO_ROOT)
+sys.path.insert(0, REPO_ROOT)  # Ahead of this directory, so the root modules win
+
+from search_engine import FlipkartSearchEngine
+from search_metrics import QueryTrace, SearchMetrics
+from trending_index import TRENDING_METRICS
+
+try:
+    import orjson
+except ImportError:  # The standard json module is used instead
+    orjson = None
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE_NAME = 'flipkart_com-ecommerce_sample.csv'
+MAX_LIMIT = 100
+
+
+def _default_data_file() -> str:
+    """The CSV next to this file, falling back to the one at the repository root"""
+    local = os.path.join(BACKEND_DIR, DATA_FILE_NAME)
+    if os.path.exists(local):
+        return local
+    return os.path.join(BACKEND_DIR, os.pardir, os.pardir, DATA_FILE_NAME)
+
+
+DATA_FILE = os.environ.get('FYND_DATA_FILE', _default_data_file())
+SNAPSHOT_PATH = os.environ.get('FYND_INDEX_SNAPSHOT', f"{DATA_FILE}.fyndidx")
+INDEX_BACKEND = os.environ.get('FYND_INDEX_BACKEND', 'columnar')
+# Word positions for quoted-phrase matching and the proximity ranking boost
+POSITIONAL_INDEX = os.environ.get('FYND_POSITIONAL_INDEX', '0') == '1'
+# Per-stage search latencies, served at /metrics; FYND_METRICS=0 turns the timing hooks off
+METRICS = SearchMetrics() if os.environ.get('FYND_METRICS', '1') != '0' else None
+
+
+def load_engine():
+    """Load the engine from its snapshot (or build it); returns (engine, seconds, error)"""
+    start = time.perf_counter()
+    try:
+        engine = FlipkartSearchEngine(DATA_FILE, index_backend=INDEX_BACKEND, snapshot_path=SNAPSHOT_PATH,
+                                      metrics=METRICS, positional_index=POSITIONAL_INDEX)
+    except Exception as e:
+        print(f"❌ Failed to load search engine: {str(e)}")
+        return None, time.perf_counter() - start, str(e)
+    return engine, time.perf_counter() - start, None
+
+
+engine, load_seconds, load_error = load_engine()
+# Keep the loaded index out of the cyclic GC so collections in forked workers
+# do not write to (and so copy) the pages it lives on
+gc.freeze()
+
+app = Flask(__name__)
+CORS(app)
+
+
+def _dumps(payload: Dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _loads(body: bytes) -> Dict:
+    if not body:
+        return {}
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def _respond(payload: Dict, status: int = 200):
+    return app.response_class(_dumps(payload), status=status, mimetype='application/json')
+
+
+def _error(message: str, status: int):
+    return _respond({'error': message}, status)
+
+
+def _number(value) -> Optional[float]:
+    """Finite float or None"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _first_image(value) -> Optional[str]:
+    """First URL of the catalog's JSON-encoded image list"""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        images = json.loads(value)
+    except ValueError:
+        return value
+    return images[0] if isinstance(images, list) and images else None
+
+
+@lru_cache(maxsize=65536)
+def _product(doc_id: int, version: int) -> Dict:
+    """A catalog row in the frontend's Product shape, cached per index version"""
+    row = engine.df.iloc[doc_id]
+    categories = row.get('category_hierarchy')
+    categories = categories if isinstance(categories, list) else []
+    price = _number(row.get('discounted_price'))
+    retail_price = _number(row.get('retail_price'))
+    rating = _number(row.get('product_rating'))
+    timestamp = row.get('crawl_timestamp')
+    timestamp = timestamp if isinstance(timestamp, str) else ''
+
+    product = {
+        'id': str(row['uniq_id']) if isinstance(row.get('uniq_id'), str) else str(doc_id),
+        'name': str(row.get('product_name', '')),
+        'category': categories[0] if categories else '',
+        'subcategory': categories[1] if len(categories) > 1 else None,
+        'brand': str(row.get('brand', '')) or None,
+        'price': price if price is not None else (retail_price or 0.0),
+        'currency': 'INR',
+        'rating': rating or 0.0,
+        'stock': 1,
+        'image_url': _first_image(row.get('image')),
+        'description': str(row.get('description', '')),
+        'discount': None,
+        'external_id': str(row['pid']) if isinstance(row.get('pid'), str) else None,
+        'source': 'flipkart',
+        'created_at': timestamp,
+        'updated_at': timestamp,
+    }
+    if price is not None and retail_price and retail_price > price:
+        product['discount'] = f"{round((retail_price - price) / retail_price * 100)}% off"
+    return product
+
+
+def _products(doc_ids: List[int]) -> List[Dict]:
+    return [_product(doc_id, engine.index_version) for doc_id in doc_ids]
+
+
+def _limit(value, default: int) -> int:
+    try:
+        return max(1, min(int(value), MAX_LIMIT))
+    except (TypeError, ValueError):
+        return default
+
+
+def _request_filters(body: Dict) -> Dict:
+    """Map the frontend's extracted parameters onto engine filters
+
+    Brands and categories the catalog does not know are ignored rather than
+    turned into filters that match nothing.
+    """
+    filters = {'price': {}, 'brands': [], 'categories': []}
+    price_max = _number(body.get('price_max'))
+    if price_max:
+        filters['price']['max_price'] = price_max
+    min_rating = _number(body.get('min_rating'))
+    if min_rating:
+        filters['min_rating'] = min_rating  # Applied in the candidate mask, so `limit` results still come back
+    brand = str(body.get('brand') or '').strip().lower()
+    if brand and brand in engine.brand_counts:
+        filters['brands'].append(brand)
+    category = str(body.get('category') or '').strip().lower()
+    if category and category in engine.category_counts:
+        filters['categories'].append(category)
+    return filters
+
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    ready = engine is not None
+    payload = {
+        'status': 'healthy' if ready else 'unhealthy',
+        'search_engine_ready': ready,
+        'index': {
+            'load_seconds': round(load_seconds, 3),
+            'backend': INDEX_BACKEND,
+            'documents': engine.num_docs if ready else 0,
+            'terms': len(engine.doc_freqs) if ready else 0,
+            'snapshot': SNAPSHOT_PATH if os.path.exists(SNAPSHOT_PATH) else None,
+        },
+        'pid': os.getpid(),
+    }
+    if load_error:
+        payload['error'] = load_error
+    return _respond(payload, 200 if ready else 503)
+
+
+@app.route('/api/search', methods=['POST'])
+def search():
+    if engine is None:
+        return _error('Search engine is not available', 503)
+    try:
+        body = _loads(request.get_data(cache=False))
+    except ValueError:
+        return _error('Request body must be JSON', 400)
+    if not isinstance(body, dict):
+        return _error('Request body must be a JSON object', 400)
+    query = str(body.get('query') or '').strip()
+    if not query:
+        return _error('Query is required', 400)
+
+    start = time.perf_counter()
+    limit = _limit(body.get('limit'), 20)
+    trace = QueryTrace(query) if body.get('trace') else None
+    results = engine.search(query, top_n=limit, filters=_request_filters(body), trace=trace)
+    products = _products([doc_id for doc_id, _ in results])
+
+    payload = {
+        'products': products,
+        'total': len(products),
+        'sources': {'local': len(products), 'external': 0},
+        'took_ms': round((time.perf_counter() - start) * 1000, 3),
+        'corrections': results.corrections,  # Misspelled term -> term searched instead
+    }
+    if trace is not None:
+        payload['trace'] = trace.as_dict()
+    return _respond(payload)
+
+
+@app.route('/api/trending', methods=['GET'])
+def trending():
+    if engine is None:
+        return _error('Search engine is not available', 503)
+    limit = _limit(request.args.get('limit'), 10)
+    metric = request.args.get('sort', 'discount').strip().lower()
+    if metric not in TRENDING_METRICS:
+        return _error(f"sort must be one of {', '.join(TRENDING_METRICS)}", 400)
+    # Biggest discounts (or best ratings, or both) first among live, unblocked products
+    results = engine.trending_products(request.args.get('category', ''), limit, metric)
+    return _respond({'products': _products([doc_id for doc_id, _ in results])})
+
+
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    if engine is None:
+        return _error('Search engine is not available', 503)
+    start = time.perf_counter()
+    suggestions = engine.suggest(request.args.get('q', ''), _limit(request.args.get('limit'), 8))
+    return _respond({
+        'suggestions': [{'text': text, 'kind': kind, 'count': count} for text, count, kind in suggestions],
+        'took_ms': round((time.perf_counter() - start) * 1000, 3),
+    })
+
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    if engine is None:
+        return _error('Search engine is not available', 503)
+    return _respond({
+        'total_products': engine.num_docs,
+        'categories': len(engine.category_counts),
+        'brands': len(engine.brand_counts),
+        'cache': engine.result_cache.stats(),
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Search stage latencies and counters of this worker, in the Prometheus text format"""
+    if METRICS is None:
+        return _error('Metrics are disabled (FYND_METRICS=0)', 404)
+    return app.response_class(METRICS.to_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+if __name__ == '__main__':
+    app.run(host=os.environ.get('FYND_HOST', '0.0.0.0'), port=int(os.environ.get('FYND_PORT', 5000)),
+            threaded=True)
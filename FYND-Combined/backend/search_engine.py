@@ -1 +0,0 @@
-<content omitted>
\ No newline at end of file
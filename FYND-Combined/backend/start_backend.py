@@ -1 +1,57 @@
-<content omitted>
\ No newline at end of file
+"""Start the FYND backend
+
+Loads the search index once, then forks the gunicorn workers so they share
+the loaded index instead of each building their own. Falls back to Flask's
+threaded development server where gunicorn is not available (e.g. Windows).
+
+Environment: FYND_HOST, FYND_PORT, FYND_WORKERS, FYND_THREADS, plus the
+FYND_DATA_FILE / FYND_INDEX_SNAPSHOT / FYND_INDEX_BACKEND settings read by app.py.
+"""
+import multiprocessing
+import os
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+
+def _options() -> dict:
+    return {
+        'bind': f"{os.environ.get('FYND_HOST', '0.0.0.0')}:{os.environ.get('FYND_PORT', '5000')}",
+        'workers': int(os.environ.get('FYND_WORKERS', multiprocessing.cpu_count())),
+        'threads': int(os.environ.get('FYND_THREADS', 1)),
+        'preload_app': True,  # Import app (and load the index) before forking
+        'keepalive': 5,
+        'accesslog': None,
+    }
+
+
+if BaseApplication is not None:
+    class FYNDServer(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+
+def main():
+    print("\n🚀 Starting FYND backend...")
+    if BaseApplication is None:
+        print("gunicorn is not installed, using the Flask development server")
+        from app import app
+        app.run(host=os.environ.get('FYND_HOST', '0.0.0.0'), port=int(os.environ.get('FYND_PORT', 5000)),
+                threaded=True)
+        return
+    FYNDServer(_options()).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,12 @@ export interface BackendSearchResponse {
   }
 }
 
+export interface BackendSuggestion {
+  text: string
+  kind: 'brand' | 'category' | 'term'
+  count: number
+}
+
 export class BackendApiService {
   private static readonly BACKEND_URL = 'http://localhost:5000/api'
 
@@ -78,6 +84,29 @@ export class BackendApiService {
     }
   }
 
+  // Get type-ahead suggestions for the text typed so far
+  static async getSuggestions(query: string, limit = 8): Promise<BackendSuggestion[]> {
+    try {
+      const params = new URLSearchParams({ q: query, limit: limit.toString() })
+      const response = await fetch(`${this.BACKEND_URL}/suggest?${params}`, {
+        method: 'GET',
+        headers: {
+          'Content-Type': 'application/json',
+        }
+      })
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+
+      const data = await response.json()
+      return data.suggestions || []
+    } catch (error) {
+      console.error('Error getting suggestions from backend:', error)
+      return []
+    }
+  }
+
   // Check backend health
   static async checkHealth(): Promise<boolean> {
     try {
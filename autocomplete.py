@@ -0,0 +1,130 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Mapping, Tuple
+import numpy as np
+
+# Suggestion kinds, in the order one wins when the same text is several kinds
+SUGGESTION_KINDS = ('brand', 'category', 'term')
+_MAX_CHAR = '\U0010ffff'  # Sorts after any character, so prefix + _MAX_CHAR ends the prefix range
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(str(text).lower().split())
+
+
+class PrefixSuggester:
+    """Weighted prefix completion over sorted arrays
+
+    Suggestion texts are kept sorted, so the texts starting with a prefix form
+    one contiguous range found by two binary searches; the best k of the range
+    are then picked by weight (ties by text). Short prefixes match large
+    ranges, so the top completions of every prefix up to
+    cached_prefix_length characters are kept precomputed. update() changes
+    one text's count in place and refreshes only the cached prefixes of that
+    text, so catalog updates do not rebuild the suggester.
+    """
+    cached_prefix_length = 2
+    cached_top = 20  # Completions kept per cached prefix; larger limits fall back to a range scan
+
+    def __init__(self, entries: Iterable[Tuple[str, int, str]]):
+        # text -> count per kind; a text's weight is its largest count, its kind the first kind it has
+        self.counts: Dict[str, List[int]] = {}
+        for text, weight, kind in entries:
+            text = _normalize(text)
+            if text and weight > 0:
+                self.counts.setdefault(text, [0] * len(SUGGESTION_KINDS))[SUGGESTION_KINDS.index(kind)] += weight
+        self.texts: List[str] = sorted(self.counts)
+        self.weights = np.fromiter((max(self.counts[text]) for text in self.texts), dtype=np.int64,
+                                   count=len(self.texts))
+        self.kinds = np.fromiter((self._kind(self.counts[text]) for text in self.texts), dtype=np.int8,
+                                 count=len(self.texts))
+        self._cached: Dict[str, List[Tuple[str, int, str]]] = {}
+        for prefix in {text[:length] for text in self.texts
+                       for length in range(1, self.cached_prefix_length + 1) if len(text) >= length}:
+            self._cache_prefix(prefix)
+
+    @staticmethod
+    def _kind(counts: List[int]) -> int:
+        return next(kind_index for kind_index, count in enumerate(counts) if count > 0)
+
+    @classmethod
+    def from_counts(cls, term_counts: Mapping[str, int], brand_counts: Mapping[str, int],
+                    category_counts: Mapping[str, int]) -> 'PrefixSuggester':
+        """Suggester over indexed terms (by document frequency) and brands and categories (by product count)"""
+        entries = [(text, count, kind) for kind, counts in (('brand', brand_counts), ('category', category_counts),
+                                                             ('term', term_counts))
+                   for text, count in counts.items()]
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        return bisect_left(self.texts, prefix), bisect_left(self.texts, prefix + _MAX_CHAR)
+
+    def _top(self, start: int, end: int, limit: int) -> List[Tuple[str, int, str]]:
+        """The best `limit` (text, weight, kind) in positions [start, end), best first"""
+        weights = self.weights[start:end]
+        if end - start > limit:
+            # Keep everything tied with the limit-th weight so ties can break by text
+            threshold = np.partition(weights, len(weights) - limit)[len(weights) - limit]
+            positions = np.flatnonzero(weights >= threshold)
+        else:
+            positions = np.arange(end - start)
+        # Positions are in text order, so a stable sort by weight breaks ties by text
+        order = start + positions[np.argsort(-weights[positions], kind='stable')][:limit]
+        return [(self.texts[position], int(self.weights[position]), SUGGESTION_KINDS[self.kinds[position]])
+                for position in order.tolist()]
+
+    def _cache_prefix(self, prefix: str):
+        """Precompute the top completions of a short prefix, if it matches more than cached_top texts"""
+        start, end = self._range(prefix)
+        if end - start > self.cached_top:
+            self._cached[prefix] = self._top(start, end, self.cached_top)
+        else:
+            self._cached.pop(prefix, None)
+
+    def update(self, text: str, delta: int, kind: str):
+        """Add delta to the count of text as kind, inserting or dropping the text as needed"""
+        text = _normalize(text)
+        if not text or not delta:
+            return
+        counts = self.counts.get(text)
+        if counts is None:
+            if delta < 0:
+                return
+            counts = self.counts[text] = [0] * len(SUGGESTION_KINDS)
+        kind_index = SUGGESTION_KINDS.index(kind)
+        counts[kind_index] = max(counts[kind_index] + delta, 0)
+
+        position = bisect_left(self.texts, text)
+        present = position < len(self.texts) and self.texts[position] == text
+        if max(counts) <= 0:
+            del self.counts[text]
+            if present:
+                del self.texts[position]
+                self.weights = np.delete(self.weights, position)
+                self.kinds = np.delete(self.kinds, position)
+        elif present:
+            self.weights[position] = max(counts)
+            self.kinds[position] = self._kind(counts)
+        else:
+            self.texts.insert(position, text)
+            self.weights = np.insert(self.weights, position, max(counts))
+            self.kinds = np.insert(self.kinds, position, self._kind(counts))
+        for length in range(1, min(self.cached_prefix_length, len(text)) + 1):
+            self._cache_prefix(text[:length])
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, int, str]]:
+        """(text, weight, kind) of the best completions of prefix, best first
+
+        A trailing space is kept, so a finished word completes to longer phrases only.
+        """
+        trailing = ' ' if prefix[-1:].isspace() else ''
+        prefix = _normalize(prefix)
+        if not prefix or limit <= 0:
+            return []
+        prefix += trailing
+        cached = self._cached.get(prefix)
+        if cached is not None and limit <= len(cached):
+            return cached[:limit]
+        return self._top(*self._range(prefix), limit)
@@ -0,0 +1,216 @@
+"""Search benchmarks: index build time, peak RSS and query latency on synthetic catalogs
+
+    python benchmarks/run_benchmarks.py                                   # 10k and 100k rows
+    python benchmarks/run_benchmarks.py --sizes 10000 --compare benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --sizes 1000000                   # About 10x the memory of 100k
+
+Each catalog size runs in a fresh process so its peak RSS is its own.
+--compare exits with status 1 when a metric is worse than the baseline by
+more than --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_catalog import catalog_csv, make_queries
+
+DEFAULT_SIZES = (10_000, 100_000)  # The sizes in baseline.json; pass --sizes 1000000 for 1M rows
+PERCENTILES = (50, 95, 99)
+# Metric -> absolute change ignored as noise, so sub-millisecond timings do not flap
+METRICS = {
+    'build_seconds': 0.1,
+    'peak_rss_mb': 10.0,
+    'search_ms.p50': 0.05,
+    'search_ms.p95': 0.1,
+    'search_ms.p99': 0.2,
+    'extract_ms.p50': 0.01,
+    'extract_ms.p95': 0.02,
+    'extract_ms.p99': 0.05,
+}
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MiB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024  # Bytes on macOS, KiB elsewhere
+
+
+def latency_percentiles(seconds: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 of per-call timings, in milliseconds"""
+    values = np.percentile(np.asarray(seconds) * 1000, PERCENTILES)
+    return {f"p{p}": round(float(value), 4) for p, value in zip(PERCENTILES, values)}
+
+
+def run_size(args, num_rows: int) -> Dict:
+    """Build an engine over one synthetic catalog and replay the query mix against it"""
+    from search_engine import FlipkartSearchEngine
+
+    path = catalog_csv(num_rows, args.data_dir, args.seed)
+    start = time.perf_counter()
+    # The result cache is disabled so every replayed query is actually executed
+    engine = FlipkartSearchEngine(path, index_backend=args.backend, retrieval_mode=args.retrieval_mode,
+                                  cache_size=0, build_workers=args.workers)
+    build_seconds = time.perf_counter() - start
+    build_rss = peak_rss_mb()
+
+    queries = make_queries(args.queries, args.seed)
+    for query in queries[:args.warmup]:
+        engine.search(query)
+
+    search_times, extract_times, empty = [], [], 0
+    for query in queries:
+        start = time.perf_counter()
+        results = engine.search(query)
+        search_times.append(time.perf_counter() - start)
+        empty += not results
+    for query in queries:
+        start = time.perf_counter()
+        engine.extractor.process(query.lower())
+        extract_times.append(time.perf_counter() - start)
+
+    return {
+        'rows': len(engine.df),
+        'build_seconds': round(build_seconds, 3),
+        'build_rss_mb': None if build_rss is None else round(build_rss, 1),
+        'peak_rss_mb': None if peak_rss_mb() is None else round(peak_rss_mb(), 1),
+        'search_ms': latency_percentiles(search_times),
+        'extract_ms': latency_percentiles(extract_times),
+        'empty_results': empty,  # Queries with no hits; a jump here means results changed, not speed
+    }
+
+
+def run_in_subprocess(args, num_rows: int) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result_file = os.path.join(tmp_dir, 'result.json')
+        command = [sys.executable, os.path.abspath(__file__), '--worker', str(num_rows),
+                   '--result-file', result_file, *settings_argv(args)]
+        subprocess.run(command, check=True)
+        with open(result_file) as f:
+            return json.load(f)
+
+
+def settings(args) -> Dict:
+    """Options that change what is measured; runs compare fairly only when they match"""
+    return {'queries': args.queries, 'warmup': args.warmup, 'seed': args.seed, 'backend': args.backend,
+            'retrieval_mode': args.retrieval_mode, 'workers': args.workers}
+
+
+def settings_argv(args) -> List[str]:
+    argv = ['--queries', str(args.queries), '--warmup', str(args.warmup), '--seed', str(args.seed),
+            '--backend', args.backend, '--retrieval-mode', args.retrieval_mode, '--data-dir', args.data_dir]
+    if args.workers is not None:
+        argv += ['--workers', str(args.workers)]
+    return argv
+
+
+def environment() -> Dict:
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'system': platform.system(), 'cpu_count': os.cpu_count()}
+
+
+def metric(result: Dict, name: str) -> Optional[float]:
+    """Value of a dotted metric name such as 'search_ms.p95'"""
+    for key in name.split('.'):
+        result = result.get(key) if isinstance(result, dict) else None
+    return result
+
+
+def print_results(report: Dict):
+    for size, result in report['results'].items():
+        print(f"\n{int(size):,} rows: build {result['build_seconds']:.2f}s, "
+              f"peak RSS {result['peak_rss_mb']} MiB, {result['empty_results']} empty queries")
+        for name in ('search_ms', 'extract_ms'):
+            values = ', '.join(f"{key} {value:.3f}" for key, value in result[name].items())
+            print(f"  {name:<10} {values}")
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print each metric against the baseline; returns the regressions"""
+    if baseline.get('settings') != report['settings']:
+        print(f"Warning: baseline settings {baseline.get('settings')} differ from {report['settings']}")
+    if baseline.get('environment') != report['environment']:
+        print(f"Warning: baseline was recorded on {baseline.get('environment')}")
+
+    regressions = []
+    print(f"\n{'rows':>10} {'metric':<16} {'baseline':>10} {'current':>10} {'change':>8}")
+    for size, result in report['results'].items():
+        reference = baseline.get('results', {}).get(size)
+        if reference is None:
+            print(f"{int(size):>10,} no baseline")
+            continue
+        for name, slack in METRICS.items():
+            old, new = metric(reference, name), metric(result, name)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            regressed = new - old > slack and change > tolerance
+            if regressed:
+                regressions.append(f"{int(size):,} rows {name}: {old} -> {new} ({change:+.0%})")
+            print(f"{int(size):>10,} {name:<16} {old:>10} {new:>10} {change:>+8.0%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark index builds and searches on synthetic catalogs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--queries', type=int, default=1000, help="queries replayed per catalog")
+    parser.add_argument('--warmup', type=int, default=50, help="untimed queries run first")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backend', default='dict', help="index_backend of the engine")
+    parser.add_argument('--retrieval-mode', default='exhaustive')
+    parser.add_argument('--workers', type=int, default=None, help="build_workers (default: all CPUs)")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'fynd-benchmarks'),
+                        help="where generated catalogs are kept between runs")
+    parser.add_argument('--save', metavar='PATH', help="write the results as a baseline")
+    parser.add_argument('--compare', metavar='PATH', help="baseline to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="relative slowdown allowed before a metric counts as a regression")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        with open(args.result_file, 'w') as f:
+            json.dump(run_size(args, args.worker), f)
+        return
+
+    report = {'environment': environment(), 'settings': settings(args),
+              'results': {str(size): run_in_subprocess(args, size) for size in args.sizes}}
+    print_results(report)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+
+# Seed vocabulary shaped like the Flipkart export; generated words extend it into a long tail
+BRANDS = [
+    'Samsung', 'Apple', 'Nike', 'Puma', 'Adidas', 'Reebok', "Levi's", 'HP', 'Dell', 'Lenovo',
+    'Titan', 'Fastrack', 'Sonata', 'Roadster', 'Biba', 'W', 'Allen Solly', 'Van Heusen',
+    'Peter England', 'Wildcraft', 'Skybags', 'Prestige', 'Pigeon', 'Philips', 'Bajaj',
+    'boAt', 'JBL', 'Sony', 'Mi', 'Lakme', 'Maybelline', 'Nivea', 'Lotto', 'Sparx', 'Bata',
+]
+CATEGORIES = [
+    "Clothing >> Men's Clothing >> T-Shirts",
+    "Clothing >> Men's Clothing >> Shirts >> Casual Shirts",
+    "Clothing >> Women's Clothing >> Sarees",
+    "Clothing >> Women's Clothing >> Kurtas & Kurtis",
+    "Clothing >> Women's Clothing >> Lingerie, Sleep & Swimwear >> Bras",
+    "Footwear >> Men's Footwear >> Sports Shoes >> Running Shoes",
+    "Footwear >> Women's Footwear >> Sandals",
+    "Mobiles & Accessories >> Mobile Accessories >> Cases & Covers",
+    "Mobiles & Accessories >> Mobiles",
+    "Computers >> Laptops",
+    "Computers >> Computer Peripherals >> Printers & Inks",
+    "Watches >> Wrist Watches",
+    "Bags, Wallets & Belts >> Wallets",
+    "Bags, Wallets & Belts >> Bags >> Backpacks",
+    "Home & Kitchen >> Kitchen Appliances >> Pressure Cookers",
+    "Audio & Video >> Headphones",
+    "Beauty and Personal Care >> Makeup >> Lips",
+]
+WORDS = [
+    'cotton', 'slim', 'fit', 'regular', 'printed', 'solid', 'striped', 'round', 'neck', 'collar',
+    'casual', 'formal', 'party', 'sports', 'running', 'walking', 'leather', 'synthetic', 'silk',
+    'georgette', 'denim', 'black', 'blue', 'red', 'white', 'green', 'grey', 'pink', 'analog',
+    'digital', 'wireless', 'bluetooth', 'stainless', 'steel', 'litre', 'combo', 'pack', 'men',
+    'women', 'boys', 'girls', 'shirt', 'tshirt', 'kurta', 'saree', 'shoes', 'sandals', 'watch',
+    'wallet', 'backpack', 'cover', 'case', 'mobile', 'laptop', 'printer', 'headphones', 'cooker',
+    'lipstick', 'matte', 'waterproof', 'premium', 'classic', 'designer', 'genuine', 'warranty',
+]
+
+
+def _tail_words(rng: np.random.Generator, count: int) -> List[str]:
+    """Pronounceable pseudo-words standing in for the catalog's long tail of model names"""
+    consonants, vowels = list('bcdfghjklmnprstvz'), list('aeiou')
+    words = set()
+    while len(words) < count:
+        length = int(rng.integers(2, 5))
+        words.add(''.join(rng.choice(consonants) + rng.choice(vowels) for _ in range(length)))
+    return sorted(words)
+
+
+def _zipf_weights(size: int, exponent: float = 1.1) -> np.ndarray:
+    """Rank-frequency weights, so a few terms have long posting lists as in real catalogs"""
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    return weights / weights.sum()
+
+
+def make_catalog(num_rows: int, seed: int = 0, tail_words: int = 20_000) -> pd.DataFrame:
+    """Synthetic catalog with the columns FlipkartSearchEngine reads from the export"""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(WORDS + _tail_words(rng, tail_words), dtype=object)
+    word_weights = _zipf_weights(len(vocabulary))
+
+    name_lengths = rng.integers(3, 9, num_rows)
+    description_lengths = rng.integers(0, 60, num_rows)
+    words = rng.choice(vocabulary, size=int(name_lengths.sum() + description_lengths.sum()), p=word_weights)
+    brands = rng.choice(BRANDS, size=num_rows, p=_zipf_weights(len(BRANDS), 0.8))
+    categories = rng.choice(CATEGORIES, size=num_rows)
+
+    names, descriptions, position = [], [], 0
+    for brand, name_length, description_length in zip(brands, name_lengths, description_lengths):
+        name_end = position + name_length
+        names.append(f"{brand} {' '.join(words[position:name_end]).title()}")
+        descriptions.append(' '.join(words[name_end:name_end + description_length]))
+        position = name_end + description_length
+
+    retail_price = np.round(np.exp(rng.uniform(np.log(99), np.log(80_000), num_rows)))
+    discounted_price = np.round(retail_price * rng.uniform(0.3, 1.0, num_rows))
+    ratings = np.round(rng.uniform(1.0, 5.0, num_rows), 1).astype(object)
+    ratings[rng.random(num_rows) < 0.6] = 'No rating available'  # As in the export
+    return pd.DataFrame({
+        'product_name': names,
+        'brand': brands,
+        'category_hierarchy': categories,
+        'description': descriptions,
+        'retail_price': retail_price,
+        'discounted_price': discounted_price,
+        'product_rating': ratings,
+    })
+
+
+def catalog_csv(num_rows: int, directory: str, seed: int = 0) -> str:
+    """Path of the synthetic catalog CSV for num_rows, writing it on first use"""
+    path = os.path.join(directory, f"catalog_{num_rows}_{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        make_catalog(num_rows, seed).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    return path
+
+
+def make_queries(count: int, seed: int = 0, brands: Optional[List[str]] = None) -> List[str]:
+    """Query mix of plain keywords, price limits, quoted terms, -exclusions and brands"""
+    rng = np.random.default_rng(seed)
+    brands = [brand.lower() for brand in (brands or BRANDS)]
+    head_words = WORDS[:40]  # Frequent words, which have the longest posting lists
+    products = ['shirt', 'tshirt', 'kurta', 'saree', 'shoes', 'sandals', 'watch', 'wallet',
+                'backpack', 'mobile cover', 'laptop', 'headphones', 'cooker', 'lipstick']
+
+    def pick(options):
+        return options[int(rng.integers(len(options)))]
+
+    templates = [
+        lambda: f"{pick(head_words)} {pick(products)}",
+        lambda: f"{pick(products)} under {int(rng.integers(2, 60)) * 100}",
+        lambda: f"{pick(head_words)} {pick(products)} above ₹{int(rng.integers(1, 30)) * 500:,}",
+        lambda: f"{pick(products)} {int(rng.integers(1, 20)) * 250} to {int(rng.integers(20, 80)) * 250}",
+        lambda: f"\"{pick(head_words)} {pick(head_words)}\" {pick(products)}",
+        lambda: f"{pick(products)} -{pick(head_words)}",
+        lambda: f"{pick(brands)} {pick(products)}",
+        lambda: f"{pick(brands)} {pick(head_words)} {pick(products)} under {int(rng.integers(5, 50)) * 100} -{pick(head_words)}",
+    ]
+    return [templates[int(rng.integers(len(templates)))]() for _ in range(count)]
@@ -0,0 +1,63 @@
+import os
+from typing import Optional
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # The catalog cache needs pyarrow; everything else works without it
+    pa = pq = None
+
+SOURCE_HASH_KEY = b'fynd_source_hash'
+PRICE_COLUMNS = ('retail_price', 'discounted_price')
+DICTIONARY_COLUMNS = ('brand',)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("The catalog cache requires pyarrow")
+
+
+def _column_array(name: str, series: pd.Series):
+    """Arrow array for one cleaned column, keeping list and numeric types"""
+    values = series.tolist()
+    if any(isinstance(value, list) for value in values):
+        return pa.array([[str(item) for item in value] if isinstance(value, list) else []
+                         for value in values], type=pa.list_(pa.string()))
+    if name in PRICE_COLUMNS:
+        return pa.array(pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64'), type=pa.float64())
+    if series.dtype.kind in 'biuf':
+        return pa.array(series.to_numpy())
+    array = pa.array([None if pd.isna(value) else str(value) for value in values], type=pa.string())
+    return array.dictionary_encode() if name in DICTIONARY_COLUMNS else array
+
+
+def write_catalog_cache(df: pd.DataFrame, path: str, source_hash: str) -> None:
+    """Write a cleaned catalog to Parquet, tagged with the hash of the CSV it came from"""
+    _require_pyarrow()
+    table = pa.table({name: _column_array(name, df[name]) for name in df.columns})
+    table = table.replace_schema_metadata({SOURCE_HASH_KEY: source_hash.encode('utf-8')})
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_catalog_cache(path: str, source_hash: str) -> Optional[pd.DataFrame]:
+    """Cleaned catalog from the cache, or None when it is missing or was built from other data"""
+    _require_pyarrow()
+    if not os.path.exists(path):
+        return None
+    metadata = pq.read_schema(path).metadata or {}
+    if metadata.get(SOURCE_HASH_KEY) != source_hash.encode('utf-8'):
+        return None
+
+    table = pq.read_table(path)
+    data = {}
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_list(column.type):
+            data[name] = column.to_pylist()  # Lists, as the cleaning code produces
+        elif pa.types.is_dictionary(column.type):
+            data[name] = column.cast(pa.string()).to_pandas()
+        else:
+            data[name] = column.to_pandas()
+    return pd.DataFrame(data)
@@ -0,0 +1,174 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Sequence, Set
+from topk_retrieval import ArrayPostingCursor
+
+
+class ColumnarIndex:
+    """Inverted index stored as contiguous NumPy arrays (CSR layout by term id)
+
+    Term ids come from a Vocabulary shared with the owner of the index, so
+    term id t's postings are doc_ids[offsets[t]:offsets[t + 1]].
+    """
+
+    def __init__(self, offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                 doc_lengths: np.ndarray):
+        self.offsets = offsets          # term id -> start of its postings, one entry per term plus one
+        self.doc_ids = doc_ids          # posting doc ids, ascending within each term
+        self.tfs = tfs                  # posting term frequencies, aligned with doc_ids
+        self.doc_lengths = doc_lengths  # doc id -> number of indexed terms
+        self.live = np.ones(len(doc_lengths), dtype=bool)  # False once a doc's postings are retired
+        self.retired = 0
+
+    @classmethod
+    def from_postings(cls, index: Dict[int, List[Tuple[int, int]]], doc_lengths: Sequence[int],
+                      num_terms: int = 0) -> 'ColumnarIndex':
+        """Freeze a term id -> [(doc_id, tf)] mapping into columnar arrays covering num_terms ids"""
+        num_terms = max(num_terms, max(index, default=-1) + 1)
+        sizes = np.zeros(num_terms, dtype=np.int64)
+        for term_id, postings in index.items():
+            sizes[term_id] = len(postings)
+
+        offsets = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.int32)
+        for term_id, postings in index.items():
+            if postings:
+                start, end = offsets[term_id], offsets[term_id + 1]
+                doc_ids[start:end], tfs[start:end] = zip(*postings)
+
+        return cls(offsets, doc_ids, tfs, np.asarray(doc_lengths, dtype=np.int32))
+
+    def merge(self, staged: Dict[int, List[Tuple[int, int]]], doc_lengths: Sequence[int],
+              exclude: Set[int], num_terms: int = 0) -> 'ColumnarIndex':
+        """New index holding the live frozen postings plus staged ones, minus excluded docs"""
+        num_terms = max(num_terms, len(self), max(staged, default=-1) + 1)
+        term_ids = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+        keep = self.live[self.doc_ids]
+        term_parts, doc_parts, tf_parts = [term_ids[keep]], [self.doc_ids[keep]], [self.tfs[keep]]
+
+        for term_id, postings in staged.items():
+            postings = [entry for entry in postings if entry[0] not in exclude]
+            if postings:
+                term_parts.append(np.full(len(postings), term_id, dtype=np.int64))
+                docs, tfs = zip(*postings)
+                doc_parts.append(np.array(docs, dtype=np.int32))
+                tf_parts.append(np.array(tfs, dtype=np.int32))
+
+        term_ids = np.concatenate(term_parts)
+        doc_ids = np.concatenate(doc_parts)
+        order = np.lexsort((doc_ids, term_ids))
+        offsets = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=num_terms), out=offsets[1:])
+        return ColumnarIndex(offsets, doc_ids[order], np.concatenate(tf_parts)[order],
+                             np.asarray(doc_lengths, dtype=np.int32))
+
+    def __len__(self) -> int:
+        """Number of term ids covered by the offsets"""
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the posting arrays"""
+        return self.offsets.nbytes + self.doc_ids.nbytes + self.tfs.nbytes
+
+    def cursor(self, term_id: int, bound: float, weight: int) -> ArrayPostingCursor:
+        """WAND cursor over a term's frozen postings"""
+        doc_ids, tfs = self.postings(term_id)
+        return ArrayPostingCursor(term_id, doc_ids, tfs, self.live, bound, weight)
+
+    def is_live(self, doc_id: int) -> bool:
+        """Whether the frozen arrays hold current postings for doc_id"""
+        return doc_id < len(self.live) and bool(self.live[doc_id])
+
+    def retire(self, doc_id: int):
+        """Mask a document's frozen postings, e.g. after it was updated or deleted"""
+        self.live[doc_id] = False
+        self.retired += 1
+
+    def postings(self, term_id: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (doc_ids, tfs) views for a term id; None stands for a term not in the vocabulary"""
+        if term_id is None or term_id >= len(self):
+            return self.doc_ids[:0], self.tfs[:0]
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    def term_bounds(self) -> Dict[int, Tuple[int, int]]:
+        """term id -> (max tf, min doc length) over its postings"""
+        sizes = np.diff(self.offsets)
+        present = np.flatnonzero(sizes)
+        if not len(present):
+            return {}
+        starts = self.offsets[:-1][present]
+        max_tfs = np.maximum.reduceat(self.tfs, starts)
+        min_lengths = np.minimum.reduceat(self.doc_lengths[self.doc_ids], starts)
+        return {term_id: (max_tf, min_length) for term_id, max_tf, min_length
+                in zip(present.tolist(), max_tfs.tolist(), min_lengths.tolist())}
+
+    def doc_freqs(self) -> Dict[int, int]:
+        """term id -> number of postings, for terms that have any"""
+        sizes = np.diff(self.offsets)
+        present = np.flatnonzero(sizes)
+        return dict(zip(present.tolist(), sizes[present].tolist()))
+
+    def doc_freq(self, term_id: Optional[int]) -> int:
+        """Number of postings for a term id"""
+        if term_id is None or term_id >= len(self):
+            return 0
+        return int(self.offsets[term_id + 1] - self.offsets[term_id])
+
+    def score(self, query_terms: List[Optional[int]], idfs: List[float], avg_doc_length: float,
+              k1: float, b: float, candidate_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Score every posting of the query terms at once
+
+        Mirrors SearchEngineBase.search: a document's score is its BM25 sum over
+        the query term ids, multiplied by the number of query terms it matches.
+        Postings outside candidate_mask (a bool array over doc ids) are dropped
+        before any weights are computed. Returns (doc_ids, scores) for all
+        matching documents, unsorted.
+        """
+        doc_parts, tf_parts, idf_parts = [], [], []
+        for term, idf in zip(query_terms, idfs):
+            docs, tfs = self.postings(term)
+            if len(docs) and self.retired:
+                live = self.live[docs]
+                docs, tfs = docs[live], tfs[live]
+            if len(docs) and candidate_mask is not None:
+                keep = candidate_mask[docs]
+                docs, tfs = docs[keep], tfs[keep]
+            if len(docs):
+                doc_parts.append(docs)
+                tf_parts.append(tfs)
+                idf_parts.append(np.full(len(docs), idf))
+
+        if not doc_parts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+
+        docs = np.concatenate(doc_parts)
+        tf = np.concatenate(tf_parts).astype(np.float64)
+        idf = np.concatenate(idf_parts)
+        doc_length = self.doc_lengths[docs].astype(np.float64)
+
+        numerator = tf * (k1 + 1)
+        denominator = tf + k1 * (1 - b + b * (doc_length / avg_doc_length))
+        weights = idf * (numerator / denominator)
+
+        # bincount accumulates in input order, i.e. query-term order per document
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        bm25 = np.bincount(inverse, weights=weights)
+        matches = np.bincount(inverse)
+        return unique_docs, bm25 * matches
+
+
+def top_n_scores(doc_ids: np.ndarray, scores: np.ndarray, top_n: int) -> List[Tuple[int, float]]:
+    """Highest scores first, ties broken by ascending doc id"""
+    if top_n <= 0:
+        return []
+    if len(doc_ids) > top_n:
+        # Keep everything scoring at least the n-th best so ties at the cut survive
+        cutoff = np.partition(scores, len(scores) - top_n)[len(scores) - top_n]
+        keep = scores >= cutoff
+        doc_ids, scores = doc_ids[keep], scores[keep]
+    order = np.lexsort((doc_ids, -scores))[:top_n]
+    return list(zip(doc_ids[order].tolist(), scores[order].tolist()))
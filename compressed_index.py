@@ -0,0 +1,241 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from columnar_index import ColumnarIndex
+from topk_retrieval import PostingCursor
+
+BLOCK_SIZE = 128  # Postings per block; blocks are the unit of skipping and of partial decoding
+
+
+def varbyte_encode(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Variable-byte encode non-negative ints, 7 bits per byte, least significant first
+
+    The high bit marks the last byte of each value. Returns (bytes, byte
+    length of each value).
+    """
+    values = np.asarray(values, dtype=np.int64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for bits in (7, 14, 21, 28):
+        lengths += values >= (1 << bits)
+    starts = np.cumsum(lengths) - lengths
+    data = np.zeros(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max(initial=0))):
+        present = lengths > k
+        byte = (values[present] >> (7 * k)) & 0x7F
+        byte |= np.where(lengths[present] == k + 1, 0x80, 0)
+        data[starts[present] + k] = byte
+    return data, lengths
+
+
+def varbyte_decode(data: np.ndarray) -> np.ndarray:
+    """Inverse of varbyte_encode
+
+    When every value fits in one byte (the common case for doc id gaps and
+    term frequencies) the result is a uint8 array; otherwise int64.
+    """
+    if data.min(initial=0x80) >= 0x80:
+        return data ^ 0x80  # Clear the terminator bits
+    last = data >= 0x80
+    ends = np.flatnonzero(last)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = 7 * (np.arange(len(data)) - np.repeat(starts, ends - starts + 1))
+    return np.add.reduceat((data & 0x7F).astype(np.int64) << shifts, starts)
+
+
+def _group_ends(lengths: np.ndarray, groups: np.ndarray, num_groups: int) -> np.ndarray:
+    """Cumulative end offset of each group of consecutive encoded values"""
+    offsets = np.zeros(num_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(groups, weights=lengths, minlength=num_groups).astype(np.int64), out=offsets[1:])
+    return offsets
+
+
+class CompressedIndex(ColumnarIndex):
+    """ColumnarIndex whose postings are delta + variable-byte encoded in blocks
+
+    Doc ids are stored as gaps from the previous posting of the same term and
+    term frequencies as small ints, both variable-byte encoded, so most
+    postings take two or three bytes instead of eight. Each block of
+    BLOCK_SIZE postings records its last doc id and byte offsets, which serve
+    as skip pointers: a cursor jumps straight to the block that may hold a
+    target doc and decodes only that block. Whole posting lists are decoded
+    with vectorized NumPy operations for exhaustive scoring, and the most
+    recently used ones are kept decoded, up to decoded_cache_postings postings,
+    so hot query terms score as fast as with the uncompressed arrays.
+    """
+    decoded_cache_postings = 1 << 18
+
+    def __init__(self, offsets: np.ndarray, block_offsets: np.ndarray, block_last_doc: np.ndarray,
+                 doc_bytes: np.ndarray, doc_byte_offsets: np.ndarray,
+                 tf_bytes: np.ndarray, tf_byte_offsets: np.ndarray, doc_lengths: np.ndarray):
+        self.offsets = offsets                    # term id -> start of its postings, as in ColumnarIndex
+        self.block_offsets = block_offsets        # term id -> its first block
+        self.block_last_doc = block_last_doc      # block -> last doc id in it (skip pointer)
+        self.doc_bytes = doc_bytes                # encoded doc id gaps
+        self.doc_byte_offsets = doc_byte_offsets  # block -> start of its doc id gaps
+        self.tf_bytes = tf_bytes                  # encoded term frequencies
+        self.tf_byte_offsets = tf_byte_offsets    # block -> start of its term frequencies
+        self.doc_lengths = doc_lengths
+        self.live = np.ones(len(doc_lengths), dtype=bool)
+        self.retired = 0
+        self._decoded = OrderedDict()  # term id -> (doc_ids, tfs), least recently used first
+        self._decoded_postings = 0
+        self._decoded_lock = threading.Lock()
+
+    @classmethod
+    def from_columnar(cls, columnar: ColumnarIndex) -> 'CompressedIndex':
+        """Compress the postings of a ColumnarIndex; retired documents are dropped"""
+        if columnar.retired:
+            columnar = ColumnarIndex.merge(columnar, {}, columnar.doc_lengths, set())
+        offsets, doc_ids = columnar.offsets, columnar.doc_ids.astype(np.int64)
+        sizes = np.diff(offsets)
+        block_offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(-(-sizes // BLOCK_SIZE), out=block_offsets[1:])
+        num_blocks = int(block_offsets[-1])
+
+        terms = np.repeat(np.arange(len(sizes)), sizes)
+        position = np.arange(len(doc_ids)) - np.repeat(offsets[:-1], sizes)
+        blocks = block_offsets[:-1][terms] + position // BLOCK_SIZE
+
+        gaps = doc_ids.copy()
+        gaps[1:] -= doc_ids[:-1]
+        firsts = offsets[:-1][sizes > 0]
+        gaps[firsts] = doc_ids[firsts]  # Each term starts from doc id 0
+
+        doc_bytes, doc_byte_lengths = varbyte_encode(gaps)
+        tf_bytes, tf_byte_lengths = varbyte_encode(columnar.tfs)
+        block_ends = np.cumsum(np.bincount(blocks, minlength=num_blocks)) - 1
+        return cls(
+            np.asarray(offsets, dtype=np.int64), block_offsets,
+            doc_ids[block_ends].astype(np.int32) if num_blocks else np.empty(0, dtype=np.int32),
+            doc_bytes, _group_ends(doc_byte_lengths, blocks, num_blocks),
+            tf_bytes, _group_ends(tf_byte_lengths, blocks, num_blocks),
+            np.asarray(columnar.doc_lengths, dtype=np.int32)
+        )
+
+    @classmethod
+    def from_postings(cls, index: Dict[int, List[Tuple[int, int]]], doc_lengths: Sequence[int],
+                      num_terms: int = 0) -> 'CompressedIndex':
+        return cls.from_columnar(ColumnarIndex.from_postings(index, doc_lengths, num_terms))
+
+    def merge(self, staged: Dict[int, List[Tuple[int, int]]], doc_lengths: Sequence[int],
+              exclude: Set[int], num_terms: int = 0) -> 'CompressedIndex':
+        return CompressedIndex.from_columnar(super().merge(staged, doc_lengths, exclude, num_terms))
+
+    def _decode(self, first_block: int, end_block: int, base: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc_ids, tfs) of the consecutive blocks [first_block, end_block) of one term"""
+        gaps = varbyte_decode(self.doc_bytes[self.doc_byte_offsets[first_block]:self.doc_byte_offsets[end_block]])
+        tfs = varbyte_decode(self.tf_bytes[self.tf_byte_offsets[first_block]:self.tf_byte_offsets[end_block]])
+        doc_ids = np.cumsum(gaps, dtype=np.int32)
+        if base:
+            doc_ids += base
+        return doc_ids, tfs.astype(np.int32)
+
+    def decode_block(self, term_id: int, block: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc_ids, tfs) of one block of a term's postings"""
+        base = int(self.block_last_doc[block - 1]) if block > self.block_offsets[term_id] else 0
+        return self._decode(block, block + 1, base)
+
+    def postings(self, term_id: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return decoded (doc_ids, tfs) arrays for a term id"""
+        if term_id is None or term_id >= len(self):
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        with self._decoded_lock:
+            postings = self._decoded.get(term_id)
+            if postings is not None:
+                self._decoded.move_to_end(term_id)
+                return postings
+
+        postings = self._decode(int(self.block_offsets[term_id]), int(self.block_offsets[term_id + 1]))
+        size = len(postings[0])
+        if size <= self.decoded_cache_postings:
+            with self._decoded_lock:
+                if term_id not in self._decoded:
+                    self._decoded[term_id] = postings
+                    self._decoded_postings += size
+                while self._decoded_postings > self.decoded_cache_postings:
+                    _, (evicted, _) = self._decoded.popitem(last=False)
+                    self._decoded_postings -= len(evicted)
+        return postings
+
+    @property
+    def doc_ids(self) -> np.ndarray:
+        """All posting doc ids, decoded (for merges, snapshots and the batch-search matrix)"""
+        totals = np.cumsum(varbyte_decode(self.doc_bytes), dtype=np.int64)
+        sizes = np.diff(self.offsets)
+        firsts = self.offsets[:-1][sizes > 0]
+        # Running total before each term's first posting, which restarts from doc id 0
+        bases = np.where(firsts > 0, totals[np.maximum(firsts - 1, 0)], 0) if len(totals) else totals
+        return (totals - np.repeat(bases, sizes[sizes > 0])).astype(np.int32)
+
+    @property
+    def tfs(self) -> np.ndarray:
+        return varbyte_decode(self.tf_bytes).astype(np.int32)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the encoded postings and skip pointers, excluding the decoded cache"""
+        arrays = (self.offsets, self.block_offsets, self.block_last_doc, self.doc_bytes,
+                  self.doc_byte_offsets, self.tf_bytes, self.tf_byte_offsets)
+        return sum(array.nbytes for array in arrays)
+
+    def cursor(self, term_id: int, bound: float, weight: int) -> 'BlockPostingCursor':
+        return BlockPostingCursor(term_id, self, bound, weight)
+
+
+class BlockPostingCursor(PostingCursor):
+    """PostingCursor over a CompressedIndex term that decodes one block at a time
+
+    skip_to consults the per-block last doc ids and decodes only the block
+    the target can be in, so WAND skips whole blocks without decoding them.
+    """
+
+    def __init__(self, term_id: int, index: CompressedIndex, bound: float, weight: int):
+        super().__init__(term_id, [], bound, weight)
+        self.index = index
+        self.first_block = int(index.block_offsets[term_id])
+        self.end_block = int(index.block_offsets[term_id + 1])
+        self.count = int(index.offsets[term_id + 1] - index.offsets[term_id])
+        if self.count:
+            self._load(self.first_block)
+
+    def _load(self, block: int):
+        self.block = block
+        self.block_start = (block - self.first_block) * BLOCK_SIZE  # Position of the block's first posting
+        self.block_docs, self.block_tfs = self.index.decode_block(self.term, block)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def doc(self) -> Optional[int]:
+        if self.position < self.count:
+            return int(self.block_docs[self.position - self.block_start])
+        return None
+
+    @property
+    def tf(self) -> int:
+        return int(self.block_tfs[self.position - self.block_start])
+
+    def is_live(self) -> bool:
+        return bool(self.index.live[self.block_docs[self.position - self.block_start]])
+
+    def next(self):
+        self.position += 1
+        if self.position < self.count and self.position - self.block_start >= len(self.block_docs):
+            self._load(self.block + 1)
+
+    def skip_to(self, doc_id: int) -> int:
+        start = self.position
+        if start >= self.count:
+            return 0
+        if self.index.block_last_doc[self.block] < doc_id:
+            last_docs = self.index.block_last_doc[self.block + 1:self.end_block]
+            block = self.block + 1 + int(np.searchsorted(last_docs, doc_id))
+            if block >= self.end_block:
+                self.position = self.count
+                return self.count - start
+            self._load(block)
+        local = int(np.searchsorted(self.block_docs, doc_id))
+        self.position = max(start, self.block_start + local)
+        return self.position - start
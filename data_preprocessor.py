@@ -1,59 +1,163 @@
+import re
+import warnings
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Iterator, List, Optional
+from catalog_cache import read_catalog_cache, write_catalog_cache
+from index_snapshot import file_sha256
+
+# Columns of the Flipkart export, all read as text; cleaning assigns the real types.
+# Explicit dtypes let the C parser skip type inference and keep chunk dtypes consistent.
+FLIPKART_DTYPES = {column: str for column in [
+    'uniq_id', 'crawl_timestamp', 'product_url', 'product_name', 'product_category_tree',
+    'category_hierarchy', 'pid', 'retail_price', 'discounted_price', 'image',
+    'is_FK_Advantage_product', 'description', 'product_rating', 'overall_rating',
+    'brand', 'product_specifications'
+]}
+
+# Message of the parser warning emitted for each malformed row with on_bad_lines='warn'
+BAD_LINE_PATTERN = re.compile(r'Skipping line (\d+): ([^\n]*)')
+# Currency sign and thousands separators in export prices such as "₹1,299"
+PRICE_NOISE = re.compile('[₹,]')
+
+
+def category_list(value) -> List:
+    """A category hierarchy as a list
+
+    Strings are split on ">>", after removing the JSON list brackets and
+    quotes the export's product_category_tree wraps them in; lists are kept
+    and anything else (a missing value) is empty.
+    """
+    if isinstance(value, str):
+        return [item.strip() for item in value.strip('[]"').split('>>') if item.strip()]
+    return value if isinstance(value, list) else []
+
+
+def clean_prices(values: pd.Series) -> pd.Series:
+    """Prices as floats, NaN where missing or unparseable"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(np.float64)
+    return pd.to_numeric(values.astype(str).str.replace(PRICE_NOISE, '', regex=True), errors='coerce')
+
+
+def clean_price(value) -> float:
+    """clean_prices for a single value"""
+    try:
+        return float(PRICE_NOISE.sub('', value) if isinstance(value, str) else value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def discount_percentage(retail_price, discounted_price):
+    """Discount off the retail price in percent, rounded to 2 places; NaN when the retail price is not positive"""
+    retail = np.asarray(retail_price, dtype=np.float64)
+    price = np.asarray(discounted_price, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.round(np.where(retail > 0, (retail - price) / retail * 100, np.nan), 2)
+
+
+def clean_catalog_frame(df: pd.DataFrame, missing_text: str = '') -> pd.DataFrame:
+    """Clean one DataFrame of the Flipkart export (the whole catalog or a chunk of it)
+
+    Shared by FlipkartDataPreprocessor and FlipkartSearchEngine, with
+    clean_catalog_product applying the same rules to a single product.
+    Missing names and brands become missing_text, prices are parsed, the
+    discount percentage is derived from them and the category hierarchy
+    becomes a list, read from product_category_tree when the export has no
+    category_hierarchy column. Each row is handled on its own, so a chunk
+    starting with missing values is cleaned like any other.
+    """
+    for column in ('product_name', 'brand'):
+        df[column] = df[column].fillna(missing_text).astype(str) if column in df.columns else missing_text
+    for column in ('discounted_price', 'retail_price'):
+        df[column] = clean_prices(df[column]) if column in df.columns else np.nan
+    df['discount_percentage'] = discount_percentage(df['retail_price'], df['discounted_price'])
+
+    if 'category_hierarchy' in df.columns:
+        categories = df['category_hierarchy']
+    elif 'product_category_tree' in df.columns:
+        categories = df['product_category_tree']
+    else:
+        categories = pd.Series(None, index=df.index, dtype=object)
+    df['category_hierarchy'] = categories.apply(category_list)
+    return df
+
+
+def clean_catalog_product(product: Dict, missing_text: str = '') -> Dict:
+    """clean_catalog_frame for a single product, given as a dict"""
+    product = dict(product)
+    for column in ('product_name', 'brand'):
+        value = product.get(column)
+        product[column] = missing_text if value is None or pd.isna(value) else str(value)
+    for column in ('discounted_price', 'retail_price'):
+        product[column] = clean_price(product.get(column))
+    product['discount_percentage'] = float(discount_percentage(product['retail_price'],
+                                                               product['discounted_price']))
+    product['category_hierarchy'] = category_list(
+        product['category_hierarchy'] if 'category_hierarchy' in product else product.get('product_category_tree'))
+    return product
+
 
 class FlipkartDataPreprocessor:
-    def __init__(self, data_path: str):
+    def __init__(self, data_path: str, chunk_size: int = 50_000,
+                 on_bad_line: Optional[Callable[[int, str], None]] = None):
         self.data_path = data_path
+        self.chunk_size = chunk_size
+        self.on_bad_line = on_bad_line  # Called with (line number, reason) for each skipped row
+        self.bad_lines = 0
         self.df = None
         self.processed_data = None
 
-    def load_data(self):
-    
+    def _read_csv(self, **kwargs):
+        return pd.read_csv(self.data_path, engine='c', dtype=FLIPKART_DTYPES, on_bad_lines='warn', **kwargs)
+
+    def _report_bad_lines(self, caught):
+        """Pass malformed-row warnings to on_bad_line and re-emit any other warnings"""
+        for warning in caught:
+            bad_lines = BAD_LINE_PATTERN.findall(str(warning.message))
+            if not issubclass(warning.category, pd.errors.ParserWarning) or not bad_lines:
+                warnings.showwarning(warning.message, warning.category, warning.filename, warning.lineno)
+                continue
+            for line, reason in bad_lines:
+                self.bad_lines += 1
+                if self.on_bad_line is not None:
+                    self.on_bad_line(int(line), reason)
+
+    def iter_raw_chunks(self) -> Iterator[pd.DataFrame]:
+        """Stream the CSV in chunks of chunk_size rows, skipping malformed rows"""
         try:
-        # Use error_bad_lines=False to skip bad rows
-            self.df = pd.read_csv(
-                self.data_path,
-                error_bad_lines=False,  # Will skip problematic rows
-                warn_bad_lines=True,    # Show warnings about skipped rows
-                engine='python'         # More flexible parser
-            )
-            print(f"Loaded {len(self.df)} rows (some malformed rows may have been skipped)")
+            reader = self._read_csv(chunksize=self.chunk_size)
         except Exception as e:
             raise ValueError(f"Data loading failed: {str(e)}")
+        with reader:
+            while True:
+                with warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter('always')
+                    chunk = next(reader, None)
+                self._report_bad_lines(caught)
+                if chunk is None:
+                    return
+                yield chunk
+
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        """Stream cleaned chunks; memory stays bounded by the chunk size"""
+        for chunk in self.iter_raw_chunks():
+            yield self.clean_frame(chunk)
+
+    def load_data(self):
+        """Load the whole CSV, skipping malformed rows"""
+        self.df = pd.concat(self.iter_raw_chunks(), ignore_index=True)
+        print(f"Loaded {len(self.df)} rows ({self.bad_lines} malformed rows skipped)")
+
+    def clean_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Clean one DataFrame (the whole catalog or a chunk of it)"""
+        return clean_catalog_frame(df, missing_text='Unknown')
 
     def clean_data(self) -> None:
         """Perform data cleaning operations"""
         if self.df is None:
             raise ValueError("Data not loaded. Call load_data() first")
-
-        # Handle missing values
-        self.df['product_name'] = self.df['product_name'].fillna('Unknown')
-        self.df['brand'] = self.df['brand'].fillna('Unknown')
-        
-        # Convert price columns to numeric
-        self.df['discounted_price'] = pd.to_numeric(
-            self.df['discounted_price'].str.replace('₹', '').str.replace(',', ''),
-            errors='coerce'
-        )
-        self.df['retail_price'] = pd.to_numeric(
-            self.df['retail_price'].str.replace('₹', '').str.replace(',', ''),
-            errors='coerce'
-        )
-
-        # Calculate discount percentage
-        self.df['discount_percentage'] = round(
-            ((self.df['retail_price'] - self.df['discounted_price']) / 
-             self.df['retail_price']) * 100, 2
-        )
-
-        # Clean category hierarchy
-        if 'category_hierarchy' in self.df.columns:
-            self.df['category_hierarchy'] = (
-                self.df['category_hierarchy']
-                .str.split('>>')
-                .apply(lambda x: [item.strip() for item in x] if isinstance(x, list) else [])
-            )
+        self.df = self.clean_frame(self.df)
 
     def preprocess(self) -> Dict[str, Any]:
         """Run full preprocessing pipeline"""
@@ -74,16 +178,32 @@ class FlipkartDataPreprocessor:
         return self.processed_data
 
     def save_clean_data(self, output_path: str) -> None:
-        """Save processed data to CSV"""
+        """Save processed data to CSV, or to a typed catalog cache for a .parquet path"""
         if self.processed_data is None:
             self.preprocess()
             
         clean_df = pd.DataFrame(self.processed_data['products'])
-        clean_df.to_csv(output_path, index=False)
+        if output_path.endswith('.parquet'):
+            write_catalog_cache(clean_df, output_path, file_sha256(self.data_path))
+        else:
+            clean_df.to_csv(output_path, index=False)
         print(f"Clean data saved to {output_path}")
 
+    def load_clean_data(self, cache_path: str) -> pd.DataFrame:
+        """Cleaned catalog from cache_path, re-parsing the CSV only when it has changed"""
+        source_hash = file_sha256(self.data_path)
+        cached = read_catalog_cache(cache_path, source_hash)
+        if cached is not None:
+            self.df = cached
+            return self.df
+        self.load_data()
+        self.clean_data()
+        write_catalog_cache(self.df, cache_path, source_hash)
+        return self.df
+
 # Example usage
 if __name__ == "__main__":
     processor = FlipkartDataPreprocessor("flipkart_com-ecommerce_sample.csv")
     processed_data = processor.preprocess()
-    processor.save_clean_data("cleaned_products.csv")
\ No newline at end of file
+    processor.save_clean_data("cleaned_products.csv")
+    processor.save_clean_data("cleaned_products.parquet")
\ No newline at end of file
@@ -0,0 +1,88 @@
+from array import array
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+
+
+class DocumentStore:
+    """Document texts packed into one UTF-8 buffer, indexed by an offsets array
+
+    Text is decoded only when a document is read. Appends grow the buffer in
+    place; a replaced document's new text goes to a side buffer, and
+    compact() folds it back in place of the bytes it superseded. A store
+    restored from a snapshot views the memory-mapped arrays until its first
+    append copies them.
+    """
+
+    def __init__(self, blob: Optional[np.ndarray] = None, offsets: Optional[np.ndarray] = None):
+        self._data = bytearray() if blob is None else blob
+        self._offsets = array('q', [0]) if offsets is None else offsets  # doc id -> start, plus the end
+        self._replaced = bytearray()
+        self._moved: Dict[int, Tuple[int, int]] = {}  # doc id -> (start, end) of its text in _replaced
+        self.garbage = 0  # Bytes of superseded text
+
+    @classmethod
+    def from_arrays(cls, blob: np.ndarray, offsets: np.ndarray) -> 'DocumentStore':
+        """Store over arrays written by to_arrays, e.g. memory-mapped from a snapshot"""
+        return cls(blob, offsets)
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(UTF-8 blob, int64 offsets) with every document in doc id order"""
+        self.compact()
+        return np.frombuffer(bytes(self._data), dtype=np.uint8), np.asarray(self._offsets, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, doc_id: int) -> str:
+        return bytes(self._raw(doc_id)).decode('utf-8')
+
+    def _raw(self, doc_id: int):
+        """UTF-8 bytes of a document (a slice of one of the buffers)"""
+        if not 0 <= doc_id < len(self):
+            raise IndexError(f"Invalid doc id: {doc_id}")
+        span = self._moved.get(doc_id)
+        if span is not None:
+            return self._replaced[span[0]:span[1]]
+        return self._data[int(self._offsets[doc_id]):int(self._offsets[doc_id + 1])]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the text buffers and offsets"""
+        return len(self._data) + len(self._replaced) + len(self._offsets) * 8
+
+    def _writable(self):
+        """Copy memory-mapped arrays into growable buffers before the first write"""
+        if not isinstance(self._data, bytearray):
+            self._data = bytearray(self._data.tobytes())
+            self._offsets = array('q', np.asarray(self._offsets, dtype=np.int64).tobytes())
+
+    def append(self, text: str) -> int:
+        """Store the text of the next doc id and return that id"""
+        self._writable()
+        self._data += text.encode('utf-8')
+        self._offsets.append(len(self._data))
+        return len(self) - 1
+
+    def extend(self, texts: Iterable[str]):
+        for text in texts:
+            self.append(text)
+
+    def replace(self, doc_id: int, text: str):
+        """Point doc_id at new text; its old bytes are reclaimed by compact()"""
+        self.garbage += len(self._raw(doc_id))
+        position = len(self._replaced)
+        self._replaced += text.encode('utf-8')
+        self._moved[doc_id] = (position, len(self._replaced))
+
+    def compact(self):
+        """Rewrite the buffer in doc id order without superseded text"""
+        if not self._moved:
+            return
+        data, offsets = bytearray(), array('q', [0])
+        for doc_id in range(len(self)):
+            data += self._raw(doc_id)
+            offsets.append(len(data))
+        self._data, self._offsets = data, offsets
+        self._replaced = bytearray()
+        self._moved.clear()
+        self.garbage = 0
@@ -0,0 +1,160 @@
+import bisect
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from columnar_index import ColumnarIndex
+from vocabulary import Vocabulary
+
+
+class FieldIndex:
+    """Per-field postings and length statistics for BM25F scoring of candidate documents
+
+    Like SearchEngineBase with the columnar backend, postings live in frozen
+    ColumnarIndex arrays plus a staging dict for documents added since the last
+    compaction; replaced or deleted documents are masked until then. Terms
+    are keyed by ids from the engine's Vocabulary.
+    """
+
+    def __init__(self, vocabulary: Vocabulary, field_weights: Dict[str, float],
+                 k1: float = 1.5, b: float = 0.75):
+        self.vocabulary = vocabulary
+        self.field_weights = dict(field_weights)
+        self.k1 = k1
+        self.b = b
+        self.frozen: Dict[str, Optional[ColumnarIndex]] = {field: None for field in field_weights}
+        self.staged = {field: defaultdict(list) for field in field_weights}
+        self.lengths: Dict[str, List[int]] = {field: [] for field in field_weights}
+        self.total_lengths = {field: 0 for field in field_weights}
+        self.num_docs = 0
+        self._staged_terms = {}  # doc_id -> {field: term ids} for documents whose postings are staged
+
+    def add(self, doc_id: int, field_terms: Dict[str, List[str]]):
+        """Index the tokenized fields of a document"""
+        staged_terms = {}
+        for field in self.field_weights:
+            terms = self.vocabulary.add_all(field_terms.get(field, []))
+            staged_terms[field] = set(terms)
+            postings = self.staged[field]
+            for term, tf in Counter(terms).items():
+                if not postings[term] or postings[term][-1][0] < doc_id:
+                    postings[term].append((doc_id, tf))
+                else:
+                    bisect.insort(postings[term], (doc_id, tf))
+
+            lengths = self.lengths[field]
+            if doc_id < len(lengths):
+                lengths[doc_id] = len(terms)
+            else:
+                lengths.extend([0] * (doc_id - len(lengths)))
+                lengths.append(len(terms))
+            self.total_lengths[field] += len(terms)
+
+        self._staged_terms[doc_id] = staged_terms
+        self.num_docs += 1
+
+    def remove(self, doc_id: int):
+        """Drop a live document from the statistics and mask its postings"""
+        staged_terms = self._staged_terms.pop(doc_id, None)
+        for field in self.field_weights:
+            self.total_lengths[field] -= self.lengths[field][doc_id]
+            if staged_terms is None:
+                self.frozen[field].retire(doc_id)
+                continue
+            for term in staged_terms[field]:
+                postings = [entry for entry in self.staged[field][term] if entry[0] != doc_id]
+                if postings:
+                    self.staged[field][term] = postings
+                else:
+                    del self.staged[field][term]
+        self.num_docs -= 1
+
+    def compact(self):
+        """Fold staged postings into the frozen arrays"""
+        for field in self.field_weights:
+            frozen, staged = self.frozen[field], self.staged[field]
+            if frozen is None:
+                self.frozen[field] = ColumnarIndex.from_postings(staged, self.lengths[field],
+                                                                 len(self.vocabulary))
+            elif staged or frozen.retired or len(frozen.doc_lengths) != len(self.lengths[field]):
+                self.frozen[field] = frozen.merge(staged, self.lengths[field], set(), len(self.vocabulary))
+            self.staged[field] = defaultdict(list)
+        self._staged_terms.clear()
+
+    def _term_frequencies(self, field: str, term: Optional[int], doc_ids: np.ndarray) -> np.ndarray:
+        """tf of term in the given field of each document"""
+        tfs = np.zeros(len(doc_ids))
+        frozen = self.frozen[field]
+        if frozen is not None:
+            docs, term_tfs = frozen.postings(term)
+            if len(docs):
+                positions = np.minimum(np.searchsorted(docs, doc_ids), len(docs) - 1)
+                found = (docs[positions] == doc_ids) & frozen.live[docs[positions]]
+                tfs[found] = term_tfs[positions[found]]
+        staged = self.staged[field].get(term)
+        if staged:
+            staged = dict(staged)
+            for i, doc_id in enumerate(doc_ids.tolist()):
+                if doc_id in staged:
+                    tfs[i] = staged[doc_id]
+        return tfs
+
+    def scores(self, doc_ids: np.ndarray, query_terms: List[Optional[int]], idfs: List[float]) -> np.ndarray:
+        """BM25F scores of the given documents for query term ids (None for unknown terms)
+
+        Each field's tf is length-normalized against that field's average length
+        and weighted before saturation, so a match in a short, heavily weighted
+        field (the name) counts for more than one buried in a long description.
+        """
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        scores = np.zeros(len(doc_ids))
+        if not len(doc_ids) or not self.num_docs:
+            return scores
+
+        field_norms = {}
+        for field, weight in self.field_weights.items():
+            if not weight:
+                continue
+            avg_length = self.total_lengths[field] / self.num_docs or 1.0
+            lengths = np.fromiter((self.lengths[field][doc_id] for doc_id in doc_ids.tolist()),
+                                  dtype=np.float64, count=len(doc_ids))
+            field_norms[field] = weight / (1 - self.b + self.b * (lengths / avg_length))
+
+        for term, idf in zip(query_terms, idfs):
+            pseudo_tf = np.zeros(len(doc_ids))
+            for field, norm in field_norms.items():
+                pseudo_tf += norm * self._term_frequencies(field, term, doc_ids)
+            scores += idf * pseudo_tf / (self.k1 + pseudo_tf)
+        return scores
+
+    def snapshot_state(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Arrays and metadata for an index snapshot; compacts first"""
+        self.compact()
+        arrays = {}
+        for position, field in enumerate(self.field_weights):
+            frozen = self.frozen[field]
+            key = f"field{position}"
+            arrays[f"{key}_offsets"] = frozen.offsets
+            arrays[f"{key}_doc_ids"] = frozen.doc_ids
+            arrays[f"{key}_tfs"] = frozen.tfs
+            arrays[f"{key}_lengths"] = np.asarray(self.lengths[field], dtype=np.int32)
+        meta = {'fields': list(self.field_weights), 'total_lengths': self.total_lengths,
+                'num_docs': self.num_docs}
+        return arrays, meta
+
+    @classmethod
+    def from_snapshot(cls, arrays: Dict[str, np.ndarray], meta: Dict, vocabulary: Vocabulary,
+                      field_weights: Dict[str, float], k1: float = 1.5, b: float = 0.75) -> 'FieldIndex':
+        """Inverse of snapshot_state; weights come from the caller, not the snapshot"""
+        if list(field_weights) != meta['fields']:
+            raise ValueError(f"Snapshot fields {meta['fields']} do not match {list(field_weights)}")
+        index = cls(vocabulary, field_weights, k1, b)
+        for position, field in enumerate(meta['fields']):
+            key = f"field{position}"
+            index.frozen[field] = ColumnarIndex(
+                arrays[f"{key}_offsets"], arrays[f"{key}_doc_ids"], arrays[f"{key}_tfs"],
+                arrays[f"{key}_lengths"]
+            )
+            index.lengths[field] = arrays[f"{key}_lengths"].tolist()
+        index.total_lengths = dict(meta['total_lengths'])
+        index.num_docs = meta['num_docs']
+        return index
@@ -0,0 +1,216 @@
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+class FilterColumns:
+    """Typed per-document columns that turn extracted query filters into candidate masks
+
+    Brands and categories are stored as integer ids (categories as a padded
+    id matrix, one row per document). Bitsets for individual filter values are
+    built on first use, kept in a small LRU and patched in place when rows change.
+    """
+
+    def __init__(self, max_depth: int = 8, max_bitsets: int = 256):
+        self.size = 0
+        self.max_depth = max_depth
+        self.max_bitsets = max_bitsets
+        self.live = np.zeros(0, dtype=bool)
+        self.blocked = np.zeros(0, dtype=bool)  # Matches a blocklist term in name, brand or categories
+        self.blocked_terms: List[str] = []
+        self.price = np.zeros(0, dtype=np.float64)
+        self.rating = np.zeros(0, dtype=np.float64)  # NaN where the product has no rating
+        self.brand_ids = np.zeros(0, dtype=np.int32)
+        self.category_ids = np.zeros((0, max_depth), dtype=np.int32)
+        self.include_text = np.zeros(0, dtype=object)  # name + categories, lowercased
+        self.exclude_text = np.zeros(0, dtype=object)  # name + description, lowercased
+        self.dup_group = np.zeros(0, dtype=np.int32)  # Same name and brand -> same group
+        self.brand_vocab: Dict[str, int] = {}
+        self.category_vocab: Dict[str, int] = {}
+        self.dup_vocab: Dict[Tuple[str, str], int] = {}
+        self._bitsets = OrderedDict()  # (kind, value) -> bool array
+
+    @staticmethod
+    def _text(value) -> str:
+        """A text field as a string, empty when missing (None or NaN)"""
+        return '' if value is None or (isinstance(value, float) and np.isnan(value)) else str(value)
+
+    @classmethod
+    def _row_values(cls, product) -> Tuple[float, float, str, List[str], str, str, Tuple[str, str]]:
+        name = cls._text(product.get('product_name'))
+        brand = cls._text(product.get('brand'))
+        categories = product.get('category_hierarchy')
+        categories = categories if isinstance(categories, list) else []
+        price = pd.to_numeric(product.get('discounted_price', float('inf')), errors='coerce')
+        rating = pd.to_numeric(product.get('product_rating', float('nan')), errors='coerce')
+        return (
+            float(price),
+            float(rating),
+            brand.strip().lower(),
+            [str(category).lower() for category in categories],
+            f"{name} {' '.join(categories)}".lower(),
+            f"{name} {cls._text(product.get('description'))}".lower(),
+            (name.strip().lower(), brand.strip().lower()),
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, deleted_docs=()) -> 'FilterColumns':
+        columns = cls()
+        columns._reserve(len(df))
+        columns.size = len(df)
+
+        columns.price[:] = pd.to_numeric(df['discounted_price'], errors='coerce').to_numpy(dtype=np.float64)
+        if 'product_rating' in df.columns:
+            columns.rating[:] = pd.to_numeric(df['product_rating'], errors='coerce').to_numpy(dtype=np.float64)
+        # Missing text is empty, as in set_row (astype(str) keeps NaN under pandas 3)
+        names, brands = df['product_name'].fillna('').astype(str), df['brand'].fillna('').astype(str)
+        brand_codes, brand_values = pd.factorize(brands.str.strip().str.lower())
+        columns.brand_ids[:] = brand_codes
+        columns.brand_vocab = {value: code for code, value in enumerate(brand_values)}
+        dup_codes, dup_values = pd.MultiIndex.from_arrays([
+            names.str.strip().str.lower(),
+            brands.str.strip().str.lower(),
+        ]).factorize()
+        columns.dup_group[:] = dup_codes
+        columns.dup_vocab = {value: code for code, value in enumerate(dup_values)}
+
+        hierarchies = df['category_hierarchy'].apply(lambda x: x if isinstance(x, list) else [])
+        columns.category_ids[:] = -1
+        for doc_id, categories in enumerate(hierarchies):
+            columns._set_categories(doc_id, [str(category).lower() for category in categories])
+
+        descriptions = df['description'].fillna('').astype(str)
+        columns.include_text[:] = (names + ' ' + hierarchies.apply(' '.join)).str.lower().to_numpy(dtype=object)
+        columns.exclude_text[:] = (names + ' ' + descriptions).str.lower().to_numpy(dtype=object)
+
+        columns.live[:] = True
+        columns.live[list(deleted_docs)] = False
+        return columns
+
+    def _reserve(self, capacity: int):
+        """Grow the backing arrays geometrically so appends are amortized O(1)"""
+        if capacity <= len(self.price):
+            return
+        capacity = max(capacity, 2 * len(self.price))
+        grow = capacity - len(self.price)
+        self.live = np.concatenate([self.live, np.zeros(grow, dtype=bool)])
+        self.blocked = np.concatenate([self.blocked, np.zeros(grow, dtype=bool)])
+        self.price = np.concatenate([self.price, np.full(grow, np.inf)])
+        self.rating = np.concatenate([self.rating, np.full(grow, np.nan)])
+        self.brand_ids = np.concatenate([self.brand_ids, np.full(grow, -1, dtype=np.int32)])
+        self.dup_group = np.concatenate([self.dup_group, np.full(grow, -1, dtype=np.int32)])
+        self.category_ids = np.concatenate([self.category_ids, np.full((grow, self.max_depth), -1, dtype=np.int32)])
+        self.include_text = np.concatenate([self.include_text, np.full(grow, '', dtype=object)])
+        self.exclude_text = np.concatenate([self.exclude_text, np.full(grow, '', dtype=object)])
+        for key, bitset in self._bitsets.items():
+            self._bitsets[key] = np.concatenate([bitset, np.zeros(grow, dtype=bool)])
+
+    def _set_categories(self, doc_id: int, categories: List[str]):
+        ids = [self.category_vocab.setdefault(category, len(self.category_vocab)) for category in categories]
+        if len(ids) > self.category_ids.shape[1]:
+            extra = len(ids) - self.category_ids.shape[1]
+            self.category_ids = np.hstack([self.category_ids,
+                                           np.full((len(self.category_ids), extra), -1, dtype=np.int32)])
+        self.category_ids[doc_id] = -1
+        self.category_ids[doc_id, :len(ids)] = ids
+
+    def set_row(self, doc_id: int, product):
+        """Insert or overwrite the columns for one document"""
+        self._reserve(doc_id + 1)
+        self.size = max(self.size, doc_id + 1)
+        price, rating, brand, categories, include_text, exclude_text, dup_key = self._row_values(product)
+        self.live[doc_id] = True
+        self.price[doc_id] = price
+        self.rating[doc_id] = rating
+        self.brand_ids[doc_id] = self.brand_vocab.setdefault(brand, len(self.brand_vocab))
+        self.dup_group[doc_id] = self.dup_vocab.setdefault(dup_key, len(self.dup_vocab))
+        self._set_categories(doc_id, categories)
+        self.include_text[doc_id] = include_text
+        self.exclude_text[doc_id] = exclude_text
+        self.blocked[doc_id] = any(term in include_text or term in brand for term in self.blocked_terms)
+        for (kind, value), bitset in self._bitsets.items():
+            bitset[doc_id] = self._matches(kind, value, doc_id)
+
+    def set_blocklist(self, terms: List[str]):
+        """Flag documents whose name, brand or categories contain any of the terms
+
+        Runs one vectorized pass over the stored columns, so the blocklist can be
+        replaced at runtime without reindexing.
+        """
+        self.blocked_terms = [term.lower() for term in terms if term]
+        self.blocked = np.zeros(len(self.price), dtype=bool)
+        if not self.blocked_terms:
+            return
+        pattern = re.compile('|'.join(map(re.escape, self.blocked_terms)))
+        # include_text is name + categories; a term can only match across the joins if it contains a space
+        self.blocked[:self.size] = pd.Series(self.include_text[:self.size], dtype=object).str.contains(
+            pattern, na=False).to_numpy(dtype=bool)
+        blocked_brands = [brand_id for brand, brand_id in self.brand_vocab.items() if pattern.search(brand)]
+        self.blocked |= np.isin(self.brand_ids, blocked_brands)
+
+    def delete(self, doc_id: int):
+        self.live[doc_id] = False
+
+    def _matches(self, kind: str, value: str, doc_id: int) -> bool:
+        if kind == 'brand':
+            return self.brand_ids[doc_id] == self.brand_vocab.get(value, -2)
+        if kind == 'category':
+            return self.category_vocab.get(value, -2) in self.category_ids[doc_id]
+        if kind == 'include':
+            return value in self.include_text[doc_id]
+        return value in self.exclude_text[doc_id]
+
+    def bitset(self, kind: str, value: str) -> np.ndarray:
+        """Documents matching one filter value, as a bool array over all doc ids"""
+        key = (kind, value)
+        bitset = self._bitsets.get(key)
+        if bitset is not None:
+            self._bitsets.move_to_end(key)
+            return bitset
+
+        size = len(self.price)
+        if kind == 'brand':
+            bitset = self.brand_ids == self.brand_vocab.get(value, -2)
+        elif kind == 'category':
+            bitset = (self.category_ids == self.category_vocab.get(value, -2)).any(axis=1)
+        else:
+            texts = self.include_text if kind == 'include' else self.exclude_text
+            bitset = np.zeros(size, dtype=bool)
+            bitset[:self.size] = pd.Series(texts[:self.size], dtype=object).str.contains(
+                value, regex=False, na=False).to_numpy(dtype=bool)
+
+        self._bitsets[key] = bitset
+        while len(self._bitsets) > self.max_bitsets:
+            self._bitsets.popitem(last=False)
+        return bitset
+
+    def mask(self, filters: Dict, size: Optional[int] = None) -> np.ndarray:
+        """Candidate mask for the filters produced by QueryExtractor.process, plus an optional min_rating"""
+        size = self.size if size is None else size
+        mask = self.live[:size] & ~self.blocked[:size]
+
+        max_price = filters['price'].get('max_price')
+        if max_price:
+            mask &= ~(self.price[:size] > max_price)
+        min_price = filters['price'].get('min_price')
+        if min_price:
+            mask &= ~(self.price[:size] < min_price)
+        if filters.get('min_rating'):
+            mask &= self.rating[:size] >= filters['min_rating']  # Unrated products (NaN) fail it
+        if filters.get('brands'):
+            mask &= np.logical_or.reduce([self.bitset('brand', brand.lower())[:size]
+                                          for brand in filters['brands']])
+        if filters.get('categories'):
+            mask &= np.logical_or.reduce([self.bitset('category', category.lower())[:size]
+                                          for category in filters['categories']])
+        for term in filters.get('must_include', []):
+            mask &= self.bitset('include', term)[:size]
+        for term in filters.get('exclude', []):
+            mask &= ~self.bitset('exclude', term)[:size]
+        return mask
+
+    def group_counts(self, mask: np.ndarray) -> np.ndarray:
+        """Number of masked documents in each duplicate group"""
+        return np.bincount(self.dup_group[:len(mask)][mask], minlength=len(self.dup_vocab))
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+SNAPSHOT_MAGIC = b'FYNDIDX1'
+SNAPSHOT_VERSION = 3  # 2: field postings keyed by term id; 3: document text store
+ALIGNMENT = 64
+LIST_SEPARATOR = '\x1f'
+
+# File layout: magic | uint64 header length | JSON header | padding | arrays.
+# Every array starts on an ALIGNMENT boundary so it can be viewed straight
+# out of the memory map without copying.
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Content hash of a file, used to detect stale snapshots"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_snapshot(path: str, arrays: Dict[str, np.ndarray], meta: Dict) -> None:
+    """Write named arrays plus JSON metadata to a single mmap-able file"""
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({'version': SNAPSHOT_VERSION, 'meta': meta, 'arrays': layout}).encode('utf-8')
+    data_start = _align(len(SNAPSHOT_MAGIC) + 8 + len(header))
+
+    # Write to a temporary file first so readers never see a half-written snapshot
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot_header(path: str) -> Dict:
+    """Read only the JSON header of a snapshot"""
+    with open(path, 'rb') as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not an index snapshot: {path}")
+        header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    if header.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {header.get('version')}")
+    header['data_start'] = _align(len(SNAPSHOT_MAGIC) + 8 + header_length)
+    return header
+
+
+def read_snapshot(path: str) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """Memory-map a snapshot and return read-only array views plus metadata"""
+    header = read_snapshot_header(path)
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        start = header['data_start'] + spec['offset']
+        raw = buffer[start:start + count * dtype.itemsize]
+        arrays[name] = raw.view(dtype).reshape(spec['shape'])
+    return arrays, header['meta']
+
+
+def encode_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack strings into a UTF-8 byte blob plus an offsets array"""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def decode_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    """Inverse of encode_strings"""
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[start:end].decode('utf-8') for start, end in zip(bounds, bounds[1:])]
+
+
+def encode_frame(df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], List[Dict]]:
+    """Encode DataFrame columns as arrays; returns (arrays, column specs)"""
+    arrays, columns = {}, []
+    for position, name in enumerate(df.columns):
+        series = df[name]
+        key = f"col{position}"
+        if series.dtype.kind in 'biuf':
+            arrays[key] = series.to_numpy()
+            columns.append({'name': name, 'kind': 'numeric'})
+            continue
+
+        values = series.tolist()
+        if any(isinstance(value, list) for value in values):
+            strings = [LIST_SEPARATOR.join(map(str, value)) if isinstance(value, list) else ''
+                       for value in values]
+            columns.append({'name': name, 'kind': 'list'})
+        else:
+            nulls = series.isna().to_numpy()
+            strings = ['' if null else str(value) for value, null in zip(values, nulls)]
+            arrays[f"{key}_null"] = nulls.astype(np.uint8)
+            columns.append({'name': name, 'kind': 'string'})
+        arrays[f"{key}_blob"], arrays[f"{key}_offsets"] = encode_strings(strings)
+    return arrays, columns
+
+
+def decode_frame(arrays: Dict[str, np.ndarray], columns: List[Dict]) -> pd.DataFrame:
+    """Inverse of encode_frame"""
+    data = {}
+    for position, column in enumerate(columns):
+        key = f"col{position}"
+        if column['kind'] == 'numeric':
+            data[column['name']] = arrays[key]
+            continue
+
+        strings = decode_strings(arrays[f"{key}_blob"], arrays[f"{key}_offsets"])
+        if column['kind'] == 'list':
+            data[column['name']] = [value.split(LIST_SEPARATOR) if value else [] for value in strings]
+        else:
+            nulls = arrays[f"{key}_null"].astype(bool).tolist()
+            data[column['name']] = [None if null else value for value, null in zip(strings, nulls)]
+    return pd.DataFrame(data)
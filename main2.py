@@ -56,8 +56,7 @@ def main():
         return
     
     try:
-        search_engine = FlipkartSearchEngine(data_file)
-        search_engine.build_index()
+        search_engine = FlipkartSearchEngine(data_file)  # Builds the index
     except Exception as e:
         print(f"❌ Failed to load data: {str(e)}")
         return
@@ -0,0 +1,189 @@
+import bisect
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from vocabulary import Vocabulary, tokenize_positions
+
+POSITION_BITS = 16  # A posting key is doc_id << POSITION_BITS | word position
+MAX_POSITION = (1 << POSITION_BITS) - 1  # Later words share this position
+
+
+class PositionalIndex:
+    """Word positions of each term in the name and categories of every document
+
+    A posting is one int64 key per term occurrence, doc_id << POSITION_BITS |
+    position, so a term's keys sort by document and then position. They live
+    in frozen CSR arrays (offsets, keys) plus staged lists for documents added
+    since the last compaction; replaced or deleted documents are masked by
+    `retired` until then. A phrase is matched by shifting each word's keys
+    back by the word's offset in the phrase and intersecting the sorted
+    arrays: the surviving keys are the phrase's start positions. Terms are
+    keyed by ids from the engine's Vocabulary.
+    """
+
+    def __init__(self, vocabulary: Vocabulary):
+        self.vocabulary = vocabulary
+        self.offsets = np.zeros(1, dtype=np.int64)  # Term id -> start of its keys
+        self.keys = np.empty(0, dtype=np.int64)
+        self.retired = np.zeros(0, dtype=bool)  # Doc ids whose frozen keys are stale
+        self.num_retired = 0
+        self.staged: Dict[int, List[int]] = defaultdict(list)  # term id -> sorted keys
+        self._staged_terms: Dict[int, List[int]] = {}  # doc_id -> term ids it has staged keys under
+        self.size = 0  # One past the largest doc id indexed
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str], vocabulary: Vocabulary,
+                   deleted_docs: Iterable[int] = ()) -> 'PositionalIndex':
+        """Index texts[doc_id] for every doc id, leaving out deleted documents"""
+        index = cls(vocabulary)
+        deleted = set(deleted_docs)
+        term_ids, keys = [], []
+        for doc_id, text in enumerate(texts):
+            if doc_id in deleted:
+                continue
+            base = doc_id << POSITION_BITS
+            for word, position in tokenize_positions(text):
+                term_ids.append(vocabulary.add(word))
+                keys.append(base | min(position, MAX_POSITION))
+        index.size = len(texts)
+        index._freeze(np.array(term_ids, dtype=np.int64), np.array(keys, dtype=np.int64))
+        return index
+
+    def _freeze(self, term_ids: np.ndarray, keys: np.ndarray):
+        order = np.lexsort((keys, term_ids))
+        counts = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.keys = keys[order]
+        self.retired = np.zeros(self.size, dtype=bool)
+        self.num_retired = 0
+
+    def add(self, doc_id: int, text: str):
+        """Stage the positions of a new or replaced document; remove the old version first"""
+        base = doc_id << POSITION_BITS
+        term_ids = []
+        for word, position in tokenize_positions(text):
+            term_id = self.vocabulary.add(word)
+            key = base | min(position, MAX_POSITION)
+            postings = self.staged[term_id]
+            if not postings or postings[-1] < key:
+                postings.append(key)
+            else:
+                bisect.insort(postings, key)
+            term_ids.append(term_id)
+        self._staged_terms[doc_id] = list(dict.fromkeys(term_ids))
+        self.size = max(self.size, doc_id + 1)
+
+    def remove(self, doc_id: int):
+        """Drop a document's positions: staged keys now, frozen ones at the next compaction"""
+        staged_terms = self._staged_terms.pop(doc_id, None)
+        if staged_terms is not None:
+            low, high = doc_id << POSITION_BITS, (doc_id + 1) << POSITION_BITS
+            for term_id in staged_terms:
+                postings = [key for key in self.staged[term_id] if not low <= key < high]
+                if postings:
+                    self.staged[term_id] = postings
+                else:
+                    del self.staged[term_id]
+        if doc_id < len(self.retired) and not self.retired[doc_id]:
+            self.retired[doc_id] = True
+            self.num_retired += 1
+
+    def compact(self):
+        """Fold staged keys into the frozen arrays and drop retired ones"""
+        if not self.staged and not self.num_retired:
+            return
+        term_ids = np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int64), np.diff(self.offsets))
+        keys = self.keys
+        if self.num_retired:
+            keep = ~self.retired[keys >> POSITION_BITS]
+            term_ids, keys = term_ids[keep], keys[keep]
+        staged_terms = [np.full(len(postings), term_id, dtype=np.int64)
+                        for term_id, postings in self.staged.items()]
+        staged_keys = [np.array(postings, dtype=np.int64) for postings in self.staged.values()]
+        self._freeze(np.concatenate([term_ids, *staged_terms]), np.concatenate([keys, *staged_keys]))
+        self.staged = defaultdict(list)
+        self._staged_terms.clear()
+
+    def postings(self, term_id: Optional[int]) -> np.ndarray:
+        """Sorted keys of the live occurrences of a term"""
+        if term_id is None:
+            return np.empty(0, dtype=np.int64)
+        if term_id < len(self.offsets) - 1:
+            keys = self.keys[self.offsets[term_id]:self.offsets[term_id + 1]]
+            if self.num_retired and len(keys):
+                keys = keys[~self.retired[keys >> POSITION_BITS]]
+        else:
+            keys = np.empty(0, dtype=np.int64)
+        staged = self.staged.get(term_id)
+        if staged:
+            keys = np.union1d(keys, np.array(staged, dtype=np.int64))
+        return keys
+
+    def phrase_docs(self, phrase: str) -> Optional[np.ndarray]:
+        """Sorted ids of the documents containing phrase; None if it has no indexable words
+
+        Words shorter than the tokenizer's minimum are not indexed, so they only
+        keep their place in the phrase: "t shirt" matches any word before "shirt".
+        """
+        tokens = tokenize_positions(phrase)
+        if not tokens:
+            return None
+        first = tokens[0][1]
+        starts = []  # Per word: keys moved back to where the phrase would start
+        for word, position in tokens:
+            keys = self.postings(self.vocabulary.get(word))
+            shift = position - first
+            if shift:
+                keys = keys[(keys & MAX_POSITION) >= shift] - shift
+            starts.append(keys)
+        starts.sort(key=len)  # Intersect the rarest words first
+        matches = starts[0]
+        for keys in starts[1:]:
+            if not len(matches):
+                break
+            matches = np.intersect1d(matches, keys, assume_unique=True)
+        return np.unique(matches >> POSITION_BITS)
+
+    def proximity(self, doc_ids: np.ndarray, query_terms: List[Optional[int]]) -> np.ndarray:
+        """How close together consecutive query terms occur in each document, from 0 to 1
+
+        Each pair of consecutive distinct query terms adds 1 / distance for the
+        closest occurrence of the two, counting a pair in reverse order one
+        word further apart, so adjacent terms in query order add 1. The sum is
+        divided by the number of pairs.
+        """
+        terms = list(dict.fromkeys(term for term in query_terms if term is not None))
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        scores = np.zeros(len(doc_ids))
+        if len(terms) < 2 or not len(doc_ids):
+            return scores
+
+        lows, highs = doc_ids << POSITION_BITS, (doc_ids + 1) << POSITION_BITS
+        positions = []  # Per term: the term's positions in each document
+        for term in terms:
+            keys = self.postings(term)
+            starts, ends = np.searchsorted(keys, lows), np.searchsorted(keys, highs)
+            positions.append([keys[start:end] & MAX_POSITION
+                              for start, end in zip(starts.tolist(), ends.tolist())])
+        for first, second in zip(positions, positions[1:]):
+            for i, (first_positions, second_positions) in enumerate(zip(first, second)):
+                if len(first_positions) and len(second_positions):
+                    gaps = second_positions[None, :] - first_positions[:, None]
+                    scores[i] += 1.0 / np.where(gaps > 0, gaps, 1 - gaps).min()
+        return scores / (len(terms) - 1)
+
+    def snapshot_state(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Arrays and metadata for an index snapshot; compacts first"""
+        self.compact()
+        return {'positions_offsets': self.offsets, 'positions_keys': self.keys}, {'size': self.size}
+
+    @classmethod
+    def from_snapshot(cls, arrays: Dict[str, np.ndarray], meta: Dict,
+                      vocabulary: Vocabulary) -> 'PositionalIndex':
+        """Inverse of snapshot_state"""
+        index = cls(vocabulary)
+        index.offsets = np.asarray(arrays['positions_offsets'], dtype=np.int64)
+        index.keys = np.asarray(arrays['positions_keys'], dtype=np.int64)
+        index.size = meta['size']
+        index.retired = np.zeros(index.size, dtype=bool)
+        return index
@@ -1,5 +1,84 @@
 import re
-from collections import defaultdict
+from collections import deque, defaultdict
+
+# Words that shape filters rather than describe products; never spelling-corrected
+FILTER_WORDS = frozenset({'under', 'below', 'less', 'than', 'above', 'over', 'more', 'between'})
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+class PhraseMatcher:
+    """Aho-Corasick automaton that finds whole-word phrase mentions in one pass"""
+
+    def __init__(self, phrases):
+        self.goto = [{}]        # state -> {char: next state}
+        self.fail = [0]         # state -> longest proper suffix state
+        self.output = [None]    # state -> phrase ending exactly here
+        self.output_link = [0]  # state -> nearest suffix state with an output
+        self.phrases = {}       # lowercased phrase -> original phrase
+
+        for phrase in phrases:
+            if not isinstance(phrase, str):
+                continue
+            key = phrase.lower().strip()
+            if not key or key in self.phrases:
+                continue
+            self.phrases[key] = phrase
+            state = 0
+            for ch in key:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                    self.output_link.append(0)
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.output[state] = key
+
+        # Breadth-first pass to link every state to its longest suffix state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                suffix = self.fail[child]
+                self.output_link[child] = suffix if self.output[suffix] else self.output_link[suffix]
+
+    def find(self, text):
+        """(start, end, phrase) for every whole-word mention, text matched case-insensitively"""
+        text = text.lower()
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+
+            node = state if self.output[state] else self.output_link[state]
+            while node:
+                key = self.output[node]
+                start, end = i + 1 - len(key), i + 1
+                # Phrases must not start or end inside a word ("hp" in "shampoo")
+                if ((start == 0 or not (_is_word_char(text[start - 1]) and _is_word_char(key[0]))) and
+                        (end == len(text) or not (_is_word_char(text[end]) and _is_word_char(key[-1])))):
+                    matches.append((start, end, self.phrases[key]))
+                node = self.output_link[node]
+        return matches
+
+    def extract(self, query):
+        """Phrases mentioned in the query (first-mention order) and the query without them"""
+        matches = self.find(query)
+        found = list(dict.fromkeys(phrase for _, _, phrase in sorted(matches)))
+
+        removed = [False] * len(query)
+        for start, end, _ in matches:
+            removed[start:end] = [True] * (end - start)
+        clean_query = ''.join(ch for ch, gone in zip(query, removed) if not gone)
+        return found, ' '.join(clean_query.split())
 
 class QueryExtractor:
     def __init__(self, known_brands=None, known_categories=None):
@@ -16,16 +95,60 @@ class QueryExtractor:
             re.IGNORECASE
         )
         self.must_include_pattern = re.compile(r'\"([^\"]+)\"')
+        self.digit_comma_pattern = re.compile(r'(?<=\d),(?=\d)')
+        self.qualified_currency_pattern = re.compile(
+            r'\b(under|below|less\s*than|above|over|more\s*than)\s*(?:₹|rs\.?|inr)\s*(?=\d)'
+        )
+        
+    def normalize(self, query):
+        """Canonical query text: lowercase, single spaces, plain numbers after price words"""
+        query = self.digit_comma_pattern.sub('', query.lower())
+        query = self.qualified_currency_pattern.sub(r'\1 ', query)
+        return ' '.join(query.split())
         
+    @property
+    def known_brands(self):
+        return self._known_brands
+
+    @known_brands.setter
+    def known_brands(self, brands):
+        self._known_brands = brands
+        self._brand_matcher = None  # Recompiled on next use
+
+    @property
+    def known_categories(self):
+        return self._known_categories
+
+    @known_categories.setter
+    def known_categories(self, categories):
+        self._known_categories = categories
+        self._category_matcher = None
+
+    @property
+    def brand_matcher(self):
+        if self._brand_matcher is None:
+            self._brand_matcher = PhraseMatcher(self._known_brands)
+        return self._brand_matcher
+
+    @property
+    def category_matcher(self):
+        if self._category_matcher is None:
+            self._category_matcher = PhraseMatcher(self._known_categories)
+        return self._category_matcher
+
     def _clean_price(self, price_str):
         """Convert price string to float"""
         return float(price_str.replace(',', ''))
     
+    def _find_price_matches(self, query):
+        """Price mentions such as 'under 500' or '₹1,299' in query order"""
+        return list(self.price_pattern.finditer(query))
+
     def extract_price_filters(self, query):
         """Extract price range filters from query"""
         price_filters = {}
         clean_query = query
-        price_matches = self._find_price_matches(query)  # Assuming you have this method
+        price_matches = self._find_price_matches(query)
 
         if price_matches:
             for match in price_matches:
@@ -46,27 +169,11 @@ class QueryExtractor:
 
     def extract_brand_filters(self, query):
         """Extract brand filters from query"""
-        brands_found = []
-        clean_query = query
-
-        for brand in self.known_brands:
-            if isinstance(brand, str) and brand.lower() in query.lower():
-                brands_found.append(brand)
-                clean_query = clean_query.replace(brand, '')
-
-        return brands_found, clean_query.strip()
+        return self.brand_matcher.extract(query)
     
     def extract_category_filters(self, query):
         """Extract category filters from query"""
-        categories_found = []
-        clean_query = query
-        
-        for category in self.known_categories:
-            if isinstance(category, str) and category.lower() in query.lower():
-                categories_found.append(category)
-                clean_query = clean_query.replace(category, '')
-        
-        return categories_found, clean_query.strip()
+        return self.category_matcher.extract(query)
     
     def extract_must_include(self, query):
         """Extract quoted terms that must be included"""
@@ -1,170 +1,1087 @@
-from collections import defaultdict
+from collections import Counter, defaultdict
+import bisect
+import contextlib
+import heapq
 import math
+import os
 import re
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from query_extractor import QueryExtractor
-from typing import List, Dict, Tuple, Optional
+from autocomplete import PrefixSuggester
+from catalog_cache import read_catalog_cache, write_catalog_cache
+from columnar_index import ColumnarIndex, top_n_scores
+from compressed_index import CompressedIndex
+from data_preprocessor import FlipkartDataPreprocessor, clean_catalog_frame, clean_catalog_product
+from document_store import DocumentStore
+from field_index import FieldIndex
+from filter_columns import FilterColumns
+from index_snapshot import (
+    decode_frame, decode_strings, encode_frame, encode_strings,
+    file_sha256, read_snapshot, write_snapshot
+)
+from positional_index import PositionalIndex
+from query_cache import QueryResultCache, freeze
+from query_extractor import FILTER_WORDS, QueryExtractor
+from search_metrics import QueryTrace, SearchMetrics, StageTimer
+from spelling import SymSpellIndex, max_distance_for
+from topk_retrieval import PostingCursor, wand_top_k
+from trending_index import TrendingIndex
+from vocabulary import Vocabulary, tokenize, tokenize_batch, tokenize_query
+from typing import Callable, ContextManager, Iterable, List, Dict, Set, Tuple, Optional
+
+try:
+    import scipy.sparse as sp
+except ImportError:  # search_many needs scipy; everything else works without it
+    sp = None
+
+INDEX_BACKENDS = ('dict', 'columnar', 'compressed')
+RETRIEVAL_MODES = ('exhaustive', 'wand')
+
+
+def tokenize_chunk(texts: List[str], doc_offset: int, binary_tf: bool = False, deleted: Iterable[int] = ()):
+    """Partial index over texts numbered from doc_offset: (postings, doc lengths, term bounds)
+
+    Keyed by term string; the caller maps terms to ids while merging, so ids
+    are assigned in the same order however the rows were split up. Deleted
+    doc ids get a length but no postings or bounds. With binary_tf every
+    posting's tf is 1.
+    """
+    postings = defaultdict(list)
+    bounds = {}
+    lengths = []
+    deleted = set(deleted)
+    for doc_id, terms in enumerate(tokenize_batch(texts), doc_offset):
+        lengths.append(len(terms))
+        if doc_id in deleted:
+            continue
+        for term, count in Counter(terms).items():
+            if binary_tf:
+                count = 1
+            postings[term].append((doc_id, count))
+            bound = bounds.get(term)
+            bounds[term] = (count, len(terms)) if bound is None else (max(bound[0], count), min(bound[1], len(terms)))
+    return dict(postings), lengths, bounds
+
+
+class SearchResults(list):
+    """Ranked results of FlipkartSearchEngine.search, with the spelling corrections applied to the query"""
+
+    def __init__(self, results: Iterable[Tuple] = (), corrections: Optional[Dict[str, str]] = None):
+        super().__init__(results)
+        self.corrections = dict(corrections or {})  # Misspelled query term -> indexed term searched instead
+
 
 class SearchEngineBase:
-    def __init__(self, df: pd.DataFrame = None):
+    k1 = 1.5
+    b = 0.75
+    compaction_threshold = 0.1  # Compact once garbage exceeds this share of live documents
+    parallel_build_min_rows = 10_000  # Smaller frames tokenize faster than a pool starts
+    max_edit_distance = 2  # Spelling correction of unknown query terms; 0 turns it off
+    spelling_penalty = 0.7  # BM25 weight of a corrected query term relative to an exact match
+    # Postings store tf 1 for every matching document, the tf the original bm25_score found for any term
+    # (one posting per document), so rankings match it; False stores the true count
+    binary_tf = True
+
+    def __init__(self, df: pd.DataFrame = None, index_backend: str = 'dict',
+                 retrieval_mode: str = 'exhaustive', build_workers: Optional[int] = 1):
+        if index_backend not in INDEX_BACKENDS:
+            raise ValueError(f"Unknown index backend: {index_backend}")
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {retrieval_mode}")
+        self.index_backend = index_backend
+        self.retrieval_mode = retrieval_mode
+        # Processes tokenizing rows in build_index; None means one per CPU
+        self.build_workers = build_workers or os.cpu_count() or 1
+        self.vocabulary = Vocabulary()  # Term ids; postings and statistics are keyed by id
+        self.spelling: Optional[SymSpellIndex] = None  # Deletes of vocabulary terms, built with the index
         self.index = defaultdict(list)
-        self.documents = []
+        # Frozen postings: a ColumnarIndex with the 'columnar' backend, a CompressedIndex with 'compressed'
+        self.columnar = None
+        self.documents = DocumentStore()  # Indexed text of every doc id, decoded on demand
         self.doc_lengths = []
         self.avg_doc_length = 0
+        # Running statistics over live documents
+        self.num_docs = 0
+        self.total_doc_length = 0
+        self.doc_freqs = defaultdict(int)
+        # term id -> (max tf, min doc length) over its postings, for top-k score upper bounds
+        self.term_bounds = {}
+        # WAND work: documents scored, and postings passed over without scoring (one per term and document)
+        self.pruning_stats = {'queries': 0, 'docs_scored': 0, 'postings_skipped': 0}
+        # Per-stage latency histograms and work counters; None disables the timing hooks
+        self.metrics: Optional[SearchMetrics] = None
+        # Deleted doc ids, and the subset whose postings are still in self.index
+        self.deleted_docs = set()
+        self.tombstones = set()
+        self.pending_changes = 0
+        # Bumped on every index change; derived caches compare against it
+        self.index_version = 0
+        self._matrix_cache = None
         self.df = pd.DataFrame() if df is None else df.copy()
 
     def preprocess_text(self, text: str) -> List[str]:
-        """Normalize and tokenize text for indexing"""
+        """Normalize and tokenize query text, memoized for repeated queries"""
         if not isinstance(text, str):
             return []
-        text = re.sub(r'[^\w\s₹]', '', text.lower())
-        return [word for word in text.split() if len(word) > 2]  # Ignore short words
+        return list(tokenize_query(text))
 
     def add_to_index(self, text: str, doc_id: int):
         """Add document to search index"""
-        terms = self.preprocess_text(text)
+        terms = tokenize(text)
         term_counts = defaultdict(int)
         
-        for term in terms:
-            term_counts[term] += 1
+        for term in self.vocabulary.add_all(terms):
+            term_counts[term] = 1 if self.binary_tf else term_counts[term] + 1
         
+        appending = doc_id >= len(self.doc_lengths)
         for term, count in term_counts.items():
-            self.index[term].append((doc_id, count))
+            postings = self.index[term]
+            if appending or not postings or postings[-1][0] < doc_id:
+                postings.append((doc_id, count))
+            else:
+                bisect.insort(postings, (doc_id, count))  # Keep postings ordered by doc id
+            self.doc_freqs[term] += 1
+            bound = self.term_bounds.get(term)
+            if bound is None:
+                self.term_bounds[term] = (count, len(terms))
+            else:
+                self.term_bounds[term] = (max(bound[0], count), min(bound[1], len(terms)))
         
-        self.documents.append(text)
-        self.doc_lengths.append(len(terms))
-        self.avg_doc_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0
+        if appending:
+            self.documents.append(text)
+            self.doc_lengths.append(len(terms))
+        else:
+            self.documents.replace(doc_id, text)
+            self.doc_lengths[doc_id] = len(terms)
+        self.num_docs += 1
+        self.total_doc_length += len(terms)
+        self.avg_doc_length = self.total_doc_length / self.num_docs
+        self.index_version += 1
+
+    def _document_text(self, row) -> str:
+        """Combine all relevant fields of a product for indexing"""
+        text_parts = [
+            str(row.get('product_name', '')),
+            str(row.get('brand', '')),
+            ' '.join(row['category_hierarchy']) if isinstance(row.get('category_hierarchy'), list) 
+               else str(row.get('category_hierarchy', '')),
+            str(row.get('description', ''))
+        ]
+        return ' '.join(text_parts)
 
     def build_index(self):
-        """Build search index from DataFrame"""
+        """Build search index from DataFrame, replacing any existing index"""
         if self.df.empty:
             raise ValueError("DataFrame is empty")
-            
-        for doc_id, row in self.df.iterrows():
-            # Combine all relevant fields for indexing
-            text_parts = [
-                str(row.get('product_name', '')),
-                str(row.get('brand', '')),
-                ' '.join(row['category_hierarchy']) if isinstance(row.get('category_hierarchy'), list) 
-                   else str(row.get('category_hierarchy', '')),
-                str(row.get('description', ''))
-            ]
-            self.add_to_index(' '.join(text_parts), doc_id)
+
+        self._reset_index()
+        with self._build_pool(len(self.df)) as pool:
+            self.index_frame(self.df, pool=pool)
+        self._finish_build()
+
+    def _reset_index(self):
+        """Drop all postings and statistics; deleted doc ids stay deleted and term ids stay assigned"""
+        self.index = defaultdict(list)
+        self.columnar = None
+        self.documents = DocumentStore()
+        self.doc_lengths = []
+        self.avg_doc_length = 0
+        self.num_docs = 0
+        self.total_doc_length = 0
+        self.doc_freqs = defaultdict(int)
+        self.term_bounds = {}
+        self.tombstones = set()
+        self.pending_changes = 0
+        self._matrix_cache = None
+        self.index_version += 1
+
+    def _build_pool(self, num_rows: int) -> ContextManager[Optional[Executor]]:
+        """Process pool for tokenizing num_rows rows, or None to tokenize in this process"""
+        if self.build_workers > 1 and num_rows >= self.parallel_build_min_rows:
+            return ProcessPoolExecutor(max_workers=self.build_workers)
+        return contextlib.nullcontext()
+
+    def index_frame(self, df: pd.DataFrame, doc_offset: int = 0, pool: Optional[Executor] = None):
+        """Index the rows of df as doc ids doc_offset, doc_offset + 1, ... (e.g. one chunk of a stream)
+
+        Appends to the index, so doc_offset must be the next unused doc id.
+        With a pool the rows are tokenized in parallel chunks whose partial
+        postings are merged in doc id order, giving the same index as a
+        serial build.
+        """
+        if doc_offset != len(self.doc_lengths):
+            raise ValueError(f"Expected doc offset {len(self.doc_lengths)}, got {doc_offset}")
+        texts = [self._document_text(row) for row in df.to_dict('records')]
+        deleted = sorted(doc_id for doc_id in self.deleted_docs if doc_offset <= doc_id < doc_offset + len(texts))
+        if pool is None:
+            self._merge_partial(texts, *tokenize_chunk(texts, doc_offset, self.binary_tf, deleted))
+            return
+        chunk_size = -(-len(texts) // (self.build_workers * 4))
+        starts = range(0, len(texts), chunk_size)
+        partials = pool.map(tokenize_chunk, [texts[start:start + chunk_size] for start in starts],
+                            [doc_offset + start for start in starts], [self.binary_tf] * len(starts),
+                            [deleted[bisect.bisect_left(deleted, doc_offset + start):
+                                     bisect.bisect_left(deleted, doc_offset + start + chunk_size)]
+                             for start in starts])
+        for start, partial in zip(starts, partials):
+            self._merge_partial(texts[start:start + chunk_size], *partial)
+
+    def _merge_partial(self, texts: List[str], postings: Dict[str, List[Tuple[int, int]]],
+                       lengths: List[int], bounds: Dict[str, Tuple[int, int]]):
+        """Append a partial index from tokenize_chunk, whose postings already skip deleted documents"""
+        doc_offset = len(self.doc_lengths)
+        deleted = {doc_id for doc_id in self.deleted_docs if doc_offset <= doc_id < doc_offset + len(texts)}
+        for term, term_postings in postings.items():
+            new_bound = bounds[term]
+            term = self.vocabulary.add(term)
+            self.index[term].extend(term_postings)
+            self.doc_freqs[term] += len(term_postings)
+            bound = self.term_bounds.get(term)
+            self.term_bounds[term] = new_bound if bound is None else (
+                max(bound[0], new_bound[0]), min(bound[1], new_bound[1]))
+
+        self.documents.extend(texts)
+        self.doc_lengths.extend(lengths)
+        self.num_docs += len(lengths) - len(deleted)
+        self.total_doc_length += sum(lengths) - sum(lengths[doc_id - doc_offset] for doc_id in deleted)
+        self.avg_doc_length = self.total_doc_length / self.num_docs if self.num_docs else 0
+        self.index_version += 1
+
+    def _frozen_class(self):
+        return CompressedIndex if self.index_backend == 'compressed' else ColumnarIndex
+
+    def _finish_build(self):
+        """Freeze freshly built postings into the columnar or compressed backend"""
+        if self.index_backend != 'dict':
+            self.columnar = self._frozen_class().from_postings(self.index, self.doc_lengths, len(self.vocabulary))
+            self.index = defaultdict(list)
+        if self.max_edit_distance:
+            self._spelling_index()
+
+    def _postings(self, term: Optional[int]) -> List[Tuple[int, int]]:
+        """Live postings for a term id as (doc_id, tf) pairs, whatever the backend"""
+        postings = self.index.get(term, [])
+        if self.tombstones:
+            postings = [entry for entry in postings if entry[0] not in self.tombstones]
+        if self.columnar is not None:
+            doc_ids, tfs = self.columnar.postings(term)
+            live = self.columnar.live[doc_ids]
+            frozen = list(zip(doc_ids[live].tolist(), tfs[live].tolist()))
+            postings = sorted(frozen + postings) if postings else frozen
+        return postings
+
+    def _doc_freq(self, term: Optional[int]) -> int:
+        return self.doc_freqs.get(term, 0)
+
+    def _idf(self, df: int) -> float:
+        """Inverse document frequency with smoothing"""
+        N = self.num_docs
+        return math.log((N - df + 0.5) / (df + 0.5) + 1)
+
+    def _doc_terms(self, doc_id: int) -> List[int]:
+        """Ids of the terms currently indexed for a document"""
+        return self.vocabulary.lookup(tokenize(self.documents[doc_id]))
+
+    def _store_product(self, doc_id: int, product: Dict):
+        """Write a product into the DataFrame row for doc_id"""
+        if doc_id < len(self.df):
+            for column, value in product.items():
+                self.df.at[doc_id, column] = value
+        else:
+            self.df.loc[doc_id] = pd.Series(product)
+
+    def _purge_postings(self, doc_id: int, terms):
+        """Remove a document's postings from self.index"""
+        for term in terms:
+            postings = [entry for entry in self.index.get(term, []) if entry[0] != doc_id]
+            if postings:
+                self.index[term] = postings
+            else:
+                self.index.pop(term, None)
+
+    def _unindex(self, doc_id: int, lazy: bool):
+        """Drop a live document from the statistics and retire its postings"""
+        terms = self._doc_terms(doc_id)
+        self.index_version += 1
+        self.num_docs -= 1
+        self.total_doc_length -= len(terms)
+        self.avg_doc_length = self.total_doc_length / self.num_docs if self.num_docs else 0
+        for term in set(terms):
+            self.doc_freqs[term] -= 1
+            if not self.doc_freqs[term]:
+                del self.doc_freqs[term]
+
+        if self.columnar is not None and self.columnar.is_live(doc_id):
+            self.columnar.retire(doc_id)  # Frozen postings are masked until compaction
+            self.pending_changes += 1
+        elif lazy:
+            self.tombstones.add(doc_id)
+            self.pending_changes += 1
+        else:
+            self._purge_postings(doc_id, set(terms))
+
+    def upsert_product(self, product: Dict, doc_id: Optional[int] = None) -> int:
+        """Insert a product, or replace the one stored under doc_id, without a rebuild"""
+        if doc_id is None:
+            doc_id = len(self.doc_lengths)
+        elif not 0 <= doc_id <= len(self.doc_lengths):
+            raise ValueError(f"Invalid doc id: {doc_id}")
+
+        if doc_id < len(self.doc_lengths):
+            if doc_id not in self.deleted_docs:
+                self._unindex(doc_id, lazy=False)
+            elif doc_id in self.tombstones:
+                self.tombstones.discard(doc_id)
+                self._purge_postings(doc_id, set(self._doc_terms(doc_id)))
+            self.deleted_docs.discard(doc_id)
+
+        self._store_product(doc_id, product)
+        self.add_to_index(self._document_text(product), doc_id)
+        if self.columnar is not None:
+            self.pending_changes += 1  # Staged in self.index until compaction
+        self._maybe_compact()
+        return doc_id
+
+    def delete_product(self, doc_id: int):
+        """Remove a product from results; its postings go at the next compaction"""
+        if not 0 <= doc_id < len(self.doc_lengths) or doc_id in self.deleted_docs:
+            raise ValueError(f"Invalid doc id: {doc_id}")
+        self._unindex(doc_id, lazy=True)
+        self.deleted_docs.add(doc_id)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self.pending_changes > self.compaction_threshold * max(self.num_docs, 1):
+            self.compact()
+
+    def compact(self):
+        """Purge tombstoned postings and fold staged updates into the frozen index"""
+        if self.documents.garbage > self.compaction_threshold * self.documents.nbytes:
+            self.documents.compact()
+        if self.columnar is not None:
+            self.columnar = self.columnar.merge(self.index, self.doc_lengths, self.tombstones,
+                                                len(self.vocabulary))
+            self.index = defaultdict(list)
+        else:
+            terms = set()
+            for doc_id in self.tombstones:
+                terms.update(self._doc_terms(doc_id))
+            for term in terms:
+                postings = [entry for entry in self.index.get(term, []) if entry[0] not in self.tombstones]
+                if postings:
+                    self.index[term] = postings
+                else:
+                    self.index.pop(term, None)
+        self.tombstones.clear()
+        self.pending_changes = 0
+        self.index_version += 1
+
+    def _term_weight(self, idf: float, tf: int, doc_length: float) -> float:
+        """BM25 term weight"""
+        numerator = tf * (self.k1 + 1)
+        denominator = tf + self.k1 * (1 - self.b + self.b * (doc_length / self.avg_doc_length))
+        return idf * (numerator / denominator)
 
     def bm25_score(self, query_terms: List[str], doc_id: int) -> float:
         """Calculate BM25 relevance score with enhancements"""
-        k1 = 1.5
-        b = 0.75
         score = 0.0
         doc_length = self.doc_lengths[doc_id] if doc_id < len(self.doc_lengths) else self.avg_doc_length
         
-        for term in query_terms:
-            # Term frequency in document
-            tf = sum(1 for entry in self.index.get(term, []) if entry[0] == doc_id)
-            
-            # Document frequency
-            df = len(self.index.get(term, []))
-            if df == 0:
+        for term in self.vocabulary.lookup(query_terms):
+            postings = self._postings(term)
+            if not postings:
                 continue
-                
-            # Inverse document frequency with smoothing
-            N = len(self.documents)
-            idf = math.log((N - df + 0.5) / (df + 0.5) + 1)
-            
-            # BM25 term weight
-            numerator = tf * (k1 + 1)
-            denominator = tf + k1 * (1 - b + b * (doc_length / self.avg_doc_length))
-            score += idf * (numerator / denominator)
+            # Term frequency in document
+            tf = next((count for entry_id, count in postings if entry_id == doc_id), 0)
+            score += self._term_weight(self._idf(self._doc_freq(term)), tf, doc_length)
         
         return score
 
-    def search(self, query: str, top_n: int = 10) -> List[Tuple[int, float]]:
-        """Base search implementation"""
-        query_terms = self.preprocess_text(query)
-        if not query_terms:
+    def search(self, query: str, top_n: int = 10, candidate_mask: Optional[np.ndarray] = None,
+               trace: Optional[QueryTrace] = None,
+               corrections: Optional[Dict[str, str]] = None) -> List[Tuple[int, float]]:
+        """Base search implementation
+
+        A document scores its BM25 sum over the query terms, multiplied by the
+        number of query terms it matches. Ties rank by ascending doc id.
+        When candidate_mask (a bool array over doc ids) is given, only documents
+        it selects are scored. Stage timings go to self.metrics and to trace.
+        Unknown terms are spelling-corrected (see correct_terms) unless
+        corrections, misspelled term -> indexed term, is given.
+        """
+        timer = self._stage_timer(trace)
+        terms = self.preprocess_text(query)
+        if not terms:
             return []
-        
+        if candidate_mask is not None and not candidate_mask.any():
+            return []
+
+        if corrections is None:
+            corrections = self.correct_terms(terms)
+        query_terms, idfs = self._weighted_terms(terms, corrections)
+        if timer:
+            timer.lap('bm25_lookup')
+        if self.retrieval_mode == 'wand':
+            scored, skipped = self.pruning_stats['docs_scored'], self.pruning_stats['postings_skipped']
+            results = self._search_wand(query_terms, idfs, top_n, candidate_mask)
+            if timer:
+                self._count_scoring(timer, set(query_terms), self.pruning_stats['docs_scored'] - scored,
+                                    self.pruning_stats['postings_skipped'] - skipped)
+            return results
+
+        doc_scores = self._score_postings(query_terms, idfs, candidate_mask)
+        if self.columnar is not None:
+            doc_ids, scores = self.columnar.score(
+                query_terms, idfs, self.avg_doc_length, self.k1, self.b, candidate_mask
+            )
+            if doc_scores:
+                # Staged documents never have live frozen postings, so the two sets are disjoint
+                doc_ids = np.concatenate([doc_ids, np.fromiter(doc_scores.keys(), dtype=doc_ids.dtype)])
+                scores = np.concatenate([scores, np.fromiter(doc_scores.values(), dtype=np.float64)])
+            if timer:
+                self._count_scoring(timer, query_terms, len(doc_ids))
+            results = top_n_scores(doc_ids, scores, top_n)
+        else:
+            if timer:
+                self._count_scoring(timer, query_terms, len(doc_scores))
+            results = heapq.nsmallest(top_n, doc_scores.items(), key=lambda x: (-x[1], x[0]))
+        if timer:
+            timer.lap('bm25_top_k')
+        return results
+
+    def _spelling_index(self) -> SymSpellIndex:
+        """SymSpellIndex over the vocabulary, extended with terms added since it was built"""
+        if self.spelling is None:
+            self.spelling = SymSpellIndex.build(self.vocabulary.terms, self.max_edit_distance)
+        elif self.spelling.num_terms < len(self.vocabulary):
+            self.spelling.extend(self.vocabulary.terms)
+        return self.spelling
+
+    def correct_terms(self, terms: List[str]) -> Dict[str, str]:
+        """Corrections for query terms no live document contains: misspelled term -> indexed term
+
+        Words with digits, filter words ('under', 'above', ...) and words
+        shorter than five characters are left alone. The correction is the
+        closest term in use, the most frequent one among equally close terms.
+        """
+        corrections = {}
+        if not self.max_edit_distance:
+            return corrections
+        for term in terms:
+            if term in corrections or not term.isalpha() or term in FILTER_WORDS:
+                continue
+            max_distance = max_distance_for(term, self.max_edit_distance)
+            if not max_distance or self._doc_freq(self.vocabulary.get(term)):
+                continue
+            match = self._spelling_index().lookup(term, self.vocabulary.terms, self._doc_freq, max_distance)
+            if match is not None:
+                corrections[term] = self.vocabulary.term(match[0])
+        return corrections
+
+    def _weighted_terms(self, terms: List[str],
+                        corrections: Dict[str, str]) -> Tuple[List[Optional[int]], List[float]]:
+        """Term ids and idfs of query terms; corrected terms weigh spelling_penalty of an exact match"""
+        query_terms = self.vocabulary.lookup([corrections.get(term, term) for term in terms])
+        idfs = [self._idf(self._doc_freq(term_id)) * (self.spelling_penalty if term in corrections else 1.0)
+                for term, term_id in zip(terms, query_terms)]
+        return query_terms, idfs
+
+    def _stage_timer(self, trace: Optional[QueryTrace]) -> Optional[StageTimer]:
+        """Timer for the stages of one query, or None when nothing would record them"""
+        if self.metrics is None and trace is None:
+            return None
+        return StageTimer(self.metrics, trace)
+
+    def _count_scoring(self, timer: StageTimer, query_terms, documents_scored: int, postings_skipped: int = 0):
+        """Close the scoring stage and count the postings and documents it went through"""
+        timer.lap('bm25_score')
+        postings = sum(len(self.index.get(term, ())) for term in query_terms)
+        if self.columnar is not None:
+            postings += sum(self.columnar.doc_freq(term) for term in query_terms)
+        timer.count('postings_scanned', postings - postings_skipped)
+        timer.count('documents_scored', documents_scored)
+
+    def _live_postings_view(self) -> ColumnarIndex:
+        """All live postings as a ColumnarIndex, leaving the index itself untouched"""
+        num_terms = len(self.vocabulary)
+        if self.columnar is None:
+            view = ColumnarIndex.from_postings(self.index, self.doc_lengths, num_terms)
+            if not self.tombstones:
+                return view
+            for doc_id in self.tombstones:
+                view.retire(doc_id)
+            return view.merge({}, self.doc_lengths, set(), num_terms)
+        if self.index or self.columnar.retired:
+            return self.columnar.merge(self.index, self.doc_lengths, self.tombstones, num_terms)
+        return self.columnar
+
+    def memory_report(self) -> Dict[str, int]:
+        """Bytes taken by the live postings in each representation, plus the document store
+
+        'python_lists' is what the 'dict' backend's lists of (doc_id, tf) tuples
+        take, 'columnar' the int32 arrays of the 'columnar' backend and
+        'compressed' the variable-byte blocks of the 'compressed' backend.
+        """
+        view = self._live_postings_view()
+        if isinstance(view, CompressedIndex):
+            compressed, view = view, ColumnarIndex(view.offsets, view.doc_ids, view.tfs, view.doc_lengths)
+        else:
+            compressed = CompressedIndex.from_columnar(view)
+        sizes = np.diff(view.offsets)
+        # Each posting is a list slot plus a tuple; ints above 256 are separate objects
+        python_lists = (
+            sys.getsizeof([]) * int(np.count_nonzero(sizes))
+            + len(view.doc_ids) * (8 + sys.getsizeof((0, 0)))
+            + sys.getsizeof(1 << 10) * int(np.count_nonzero(view.doc_ids > 256) + np.count_nonzero(view.tfs > 256))
+        )
+        return {
+            'postings': len(view.doc_ids),
+            'python_lists': python_lists,
+            'columnar': view.nbytes,
+            'compressed': compressed.nbytes,
+            'documents': self.documents.nbytes,
+        }
+
+    def _doc_term_matrix(self):
+        """(postings view, sparse doc x term tf matrix), cached per index version"""
+        if self._matrix_cache is None or self._matrix_cache[0] != self.index_version:
+            view = self._live_postings_view()
+            matrix = sp.csc_matrix((view.tfs, view.doc_ids, view.offsets),
+                                   shape=(len(self.doc_lengths), len(view)))
+            self._matrix_cache = (self.index_version, view, matrix)
+        return self._matrix_cache[1], self._matrix_cache[2]
+
+    def search_many(self, queries: List[str], top_n: int = 10,
+                    candidate_masks: Optional[List[Optional[np.ndarray]]] = None,
+                    corrections: Optional[List[Dict[str, str]]] = None) -> List[List[Tuple[int, float]]]:
+        """Score a batch of queries with one sparse matrix multiply
+
+        Every query-term occurrence becomes one column ("slot") of the document
+        matrix, in query order, so each document's BM25 sum accumulates in the
+        same order as search() and the results are identical. candidate_masks
+        and corrections optionally hold one mask (or None) and one spelling
+        correction dict per query, as in search().
+        """
+        if sp is None:
+            raise ImportError("search_many requires scipy")
+        view, matrix = self._doc_term_matrix()
+
+        slot_columns, slot_idfs, slot_queries = [], [], []
+        for query_id, query in enumerate(queries):
+            terms = self.preprocess_text(query)
+            query_corrections = corrections[query_id] if corrections else self.correct_terms(terms)
+            for term, idf in zip(*self._weighted_terms(terms, query_corrections)):
+                if view.doc_freq(term):  # Matrix columns are term ids
+                    slot_columns.append(term)
+                    slot_idfs.append(idf)
+                    slot_queries.append(query_id)
+        if not slot_columns:
+            return [[] for _ in queries]
+
+        weights = matrix[:, slot_columns].astype(np.float64)
+        tf = weights.data
+        idf = np.repeat(slot_idfs, np.diff(weights.indptr))
+        doc_length = view.doc_lengths[weights.indices].astype(np.float64)
+        numerator = tf * (self.k1 + 1)
+        denominator = tf + self.k1 * (1 - self.b + self.b * (doc_length / self.avg_doc_length))
+        weights.data = idf * (numerator / denominator)
+        weights = weights.tocsr()
+        weights.sort_indices()
+        matches = weights.copy()
+        matches.data = np.ones_like(matches.data)
+
+        slots_to_queries = sp.csr_matrix(
+            (np.ones(len(slot_columns)), (np.arange(len(slot_columns)), slot_queries)),
+            shape=(len(slot_columns), len(queries))
+        )
+        bm25 = (weights @ slots_to_queries).tocsc()
+        match_counts = (matches @ slots_to_queries).tocsc()
+        bm25.sort_indices()
+        match_counts.sort_indices()
+
+        results = []
+        for query_id in range(len(queries)):
+            start, end = bm25.indptr[query_id], bm25.indptr[query_id + 1]
+            doc_ids = bm25.indices[start:end]
+            scores = bm25.data[start:end] * match_counts.data[start:end]
+            candidate_mask = candidate_masks[query_id] if candidate_masks else None
+            if candidate_mask is not None:
+                keep = candidate_mask[doc_ids]
+                doc_ids, scores = doc_ids[keep], scores[keep]
+            results.append(top_n_scores(doc_ids, scores, top_n))
+        return results
+
+    def _search_wand(self, query_terms: List[Optional[int]], idfs: List[float], top_n: int,
+                     candidate_mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k retrieval that skips documents whose score bound cannot reach the top k"""
+        term_idfs = list(zip(query_terms, idfs))
+        # Occurrences of a term can weigh differently (a spelling correction is
+        # penalized), so its cursor's bound uses the largest idf among them
+        max_idfs = {}
+        for term, idf in term_idfs:
+            max_idfs[term] = max(idf, max_idfs.get(term, idf))
+        cursors = []
+        for term, weight in Counter(query_terms).items():
+            if term not in self.term_bounds:
+                continue
+            # Weight is increasing in tf and decreasing in doc length
+            bound = self._term_weight(max_idfs[term], *self.term_bounds[term])
+            if self.columnar is not None:
+                cursors.append(self.columnar.cursor(term, bound, weight))
+            if self.index.get(term):
+                cursors.append(PostingCursor(term, self.index[term], bound, weight))
+
+        def score_doc(doc_id: int, tf_by_term: Dict[int, int]) -> Optional[float]:
+            if doc_id in self.tombstones:
+                return None
+            if candidate_mask is not None and not candidate_mask[doc_id]:
+                return None
+            score, matches = 0.0, 0
+            for term, idf in term_idfs:
+                tf = tf_by_term.get(term)
+                if tf is not None:
+                    score += self._term_weight(idf, tf, self.doc_lengths[doc_id])
+                    matches += 1
+            return score * matches
+
+        self.pruning_stats['queries'] += 1
+        return wand_top_k(cursors, score_doc, top_n, self.pruning_stats)
+
+    def _score_postings(self, query_terms: List[Optional[int]], idfs: List[float],
+                        candidate_mask: Optional[np.ndarray] = None) -> Dict[int, float]:
+        """Score the documents in self.index that match the query"""
         doc_scores = defaultdict(float)
-        for term in query_terms:
+        doc_matches = defaultdict(int)
+        for term, idf in zip(query_terms, idfs):
             for doc_id, tf in self.index.get(term, []):
-                doc_scores[doc_id] += self.bm25_score(query_terms, doc_id)
-        
-        return sorted(doc_scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
+                if doc_id in self.tombstones:
+                    continue
+                if candidate_mask is not None and not candidate_mask[doc_id]:
+                    continue
+                doc_scores[doc_id] += self._term_weight(idf, tf, self.doc_lengths[doc_id])
+                doc_matches[doc_id] += 1
+        return {doc_id: score * doc_matches[doc_id] for doc_id, score in doc_scores.items()}
+
+    def _snapshot_state(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Arrays and metadata written by save_index"""
+        if self.tombstones or self.pending_changes:
+            self.compact()
+        columnar = self.columnar or ColumnarIndex.from_postings(self.index, self.doc_lengths,
+                                                                len(self.vocabulary))
+        arrays, columns = encode_frame(self.df)
+        arrays['vocab_blob'], arrays['vocab_offsets'] = encode_strings(self.vocabulary.terms)
+        arrays['postings_offsets'] = columnar.offsets
+        arrays['postings_doc_ids'] = columnar.doc_ids
+        arrays['postings_tfs'] = columnar.tfs
+        arrays['doc_lengths'] = columnar.doc_lengths
+        arrays['documents_blob'], arrays['documents_offsets'] = self.documents.to_arrays()
+        arrays['deleted_docs'] = np.array(sorted(self.deleted_docs), dtype=np.int64)
+        meta = {
+            'avg_doc_length': self.avg_doc_length,
+            'num_docs': self.num_docs,
+            'total_doc_length': self.total_doc_length,
+            'columns': columns
+        }
+        return arrays, meta
+
+    def _restore_snapshot_state(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        """Inverse of _snapshot_state"""
+        self.vocabulary = Vocabulary(decode_strings(arrays['vocab_blob'], arrays['vocab_offsets']))
+        self.spelling = None  # Rebuilt for the restored vocabulary on first use
+        columnar = ColumnarIndex(
+            arrays['postings_offsets'], arrays['postings_doc_ids'],
+            arrays['postings_tfs'], arrays['doc_lengths']
+        )
+        self.df = decode_frame(arrays, meta['columns'])
+        self.avg_doc_length = meta['avg_doc_length']
+        self.num_docs = meta['num_docs']
+        self.total_doc_length = meta['total_doc_length']
+        self.doc_freqs = defaultdict(int, columnar.doc_freqs())
+        self.term_bounds = columnar.term_bounds()
+        self.deleted_docs = set(arrays['deleted_docs'].tolist())
+        self.tombstones = set()
+        self.pending_changes = 0
+        self.index_version += 1
+        self.doc_lengths = columnar.doc_lengths.tolist()
+        # Text stays memory-mapped until a document is replaced
+        self.documents = DocumentStore.from_arrays(arrays['documents_blob'], arrays['documents_offsets'])
+        self.index = defaultdict(list)
+
+        if self.index_backend == 'columnar':
+            # Postings stay memory-mapped and are shared with other processes
+            self.columnar = columnar
+        elif self.index_backend == 'compressed':
+            self.columnar = CompressedIndex.from_columnar(columnar)  # Snapshots hold uncompressed arrays
+        else:
+            self.columnar = None
+            for term in self.doc_freqs:
+                doc_ids, tfs = columnar.postings(term)
+                self.index[term] = list(zip(doc_ids.tolist(), tfs.tolist()))
+
+    def save_index(self, path: str):
+        """Write postings, doc lengths, vocabulary and product columns to a snapshot file"""
+        arrays, meta = self._snapshot_state()
+        write_snapshot(path, arrays, meta)
+
+    def load_index(self, path: str):
+        """Load a snapshot written by save_index, memory-mapping its arrays"""
+        arrays, meta = read_snapshot(path)
+        self._restore_snapshot_state(arrays, meta)
 
 class FlipkartSearchEngine(SearchEngineBase):
-    def __init__(self, data_file: str):
-        super().__init__()
+    # BM25F weights: matches in the name count most, then category, then description
+    field_weights = {'product_name': 3.0, 'category_hierarchy': 2.0, 'description': 1.0}
+    proximity_weight = 0.2  # Boost for query terms next to each other in the name or categories
+
+    def __init__(self, data_file: str, index_backend: str = 'dict',
+                 snapshot_path: Optional[str] = None, retrieval_mode: str = 'exhaustive',
+                 cache_size: int = 1024, cache_ttl: float = 300.0,
+                 field_weights: Optional[Dict[str, float]] = None, chunk_size: Optional[int] = None,
+                 on_bad_line: Optional[Callable[[int, str], None]] = None,
+                 catalog_cache: Optional[str] = None, build_workers: Optional[int] = None,
+                 metrics: Optional[SearchMetrics] = None, positional_index: bool = False):
+        super().__init__(index_backend=index_backend, retrieval_mode=retrieval_mode,
+                         build_workers=build_workers)
+        self.metrics = metrics
+        # Word positions in name and categories: quoted phrases match by posting
+        # intersection and adjacent query terms get a ranking boost
+        self.positional_index = positional_index
+        self.positions: Optional[PositionalIndex] = None
+        self.catalog_cache = catalog_cache  # Parquet file holding the cleaned catalog
+        self.chunk_size = chunk_size  # Stream the CSV in chunks of this many rows when set
+        self.on_bad_line = on_bad_line
+        if field_weights is not None:
+            unknown = set(field_weights) - set(self.field_weights)
+            if unknown:
+                raise ValueError(f"Unknown BM25F fields: {sorted(unknown)}")
+            self.field_weights = {**self.field_weights, **field_weights}
+        self.data_file = data_file
+        self.result_cache = QueryResultCache(max_size=cache_size, ttl=cache_ttl)
         self.blocked_terms = [
             'bra', 'brassiere', 'lingerie', 'bikini', 'panty',
             'underwear', 'intimate', 'innerwear', 'brief'
         ]
+        self.blocklist_version = 0
+        self._suggester = None  # (blocklist version, PrefixSuggester), updated in place by catalog changes
         
         try:
-            # Load and clean data
-            self.df = pd.read_csv(data_file)
-            self._clean_data()
-            self._remove_blocked_items
-            self.build_index()
-            
-            # Initialize query extractor with proper known values
-            self.extractor = QueryExtractor(
-                known_brands=self._get_unique_brands(),
-                known_categories=self._get_unique_categories()
-            )
+            if snapshot_path and os.path.exists(snapshot_path):
+                self.load_index(snapshot_path)
+            else:
+                self._build_from_source()
+                if snapshot_path:
+                    self.save_index(snapshot_path)
         except Exception as e:
             raise ValueError(f"Search engine initialization failed: {str(e)}")
-        
-    def _remove_blocked_items(self):
-        """Remove blocked items before indexing"""
-        self.df = self.df[~self.df.apply(self.blocker.should_block, axis=1)]
 
-    def _is_blocked_product(self, product):
-        """Check if product should be blocked from results"""
-        name = str(product.get('product_name', '')).lower()
-        brand = str(product.get('brand', '')).lower()
+    def _build_from_source(self):
+        """Load, clean and index the source CSV"""
+        self.source_hash = file_sha256(self.data_file)
+        cached = read_catalog_cache(self.catalog_cache, self.source_hash) if self.catalog_cache else None
+        if cached is not None:
+            # Already cleaned; _clean_data only fills in anything the cache writer did not
+            self.df = cached
+            self._clean_data()
+            self.build_index()
+        elif self.chunk_size:
+            self._stream_from_source()
+        else:
+            self.df = pd.read_csv(self.data_file)
+            self._clean_data()
+            self.build_index()
+        if self.catalog_cache and cached is None:
+            write_catalog_cache(self.df, self.catalog_cache, self.source_hash)
+        self._build_field_index()
+        self._build_positional_index()
+        self._build_filter_columns()
         
-        # Handle categories (works with both list and string formats)
-        categories = []
-        if isinstance(product.get('category_hierarchy'), list):
-            categories = [str(c).lower() for c in product['category_hierarchy']]
-        elif pd.notna(product.get('category_hierarchy')):
-            categories = [str(product['category_hierarchy']).lower()]
+        # Initialize query extractor with proper known values
+        self.extractor = QueryExtractor(
+            known_brands=self._get_unique_brands(),
+            known_categories=self._get_unique_categories()
+        )
+        self._count_vocabulary()
+
+    def _stream_from_source(self):
+        """Parse, clean and index the CSV chunk by chunk
+
+        Only one raw chunk is alive at a time; the cleaned chunks are kept and
+        concatenated once at the end to form the catalog DataFrame.
+        """
+        preprocessor = FlipkartDataPreprocessor(self.data_file, chunk_size=self.chunk_size,
+                                                on_bad_line=self.on_bad_line)
+        chunks, num_rows = [], 0
+        self._reset_index()
+        with self._build_pool(self.chunk_size) as pool:
+            for chunk in preprocessor.iter_raw_chunks():
+                chunk = self._clean_frame(chunk.reset_index(drop=True))
+                self.index_frame(chunk, num_rows, pool=pool)
+                num_rows += len(chunk)
+                chunks.append(chunk)
+        if not num_rows:
+            raise ValueError("DataFrame is empty")
+        if preprocessor.bad_lines:
+            print(f"Skipped {preprocessor.bad_lines} malformed rows in {self.data_file}")
+        self.df = pd.concat(chunks, ignore_index=True)
+        self._finish_build()
+
+    def _snapshot_state(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        arrays, meta = super()._snapshot_state()
+        arrays['brands_blob'], arrays['brands_offsets'] = encode_strings(
+            [str(brand) for brand in self.extractor.known_brands])
+        arrays['categories_blob'], arrays['categories_offsets'] = encode_strings(
+            [str(category) for category in self.extractor.known_categories])
+        field_arrays, meta['field_index'] = self.field_index.snapshot_state()
+        arrays.update(field_arrays)
+        if self.positions is not None:
+            position_arrays, meta['positional_index'] = self.positions.snapshot_state()
+            arrays.update(position_arrays)
+        meta['source_hash'] = self.source_hash
+        return arrays, meta
+
+    def _restore_snapshot_state(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        super()._restore_snapshot_state(arrays, meta)
+        self.extractor = QueryExtractor(
+            known_brands=decode_strings(arrays['brands_blob'], arrays['brands_offsets']),
+            known_categories=decode_strings(arrays['categories_blob'], arrays['categories_offsets'])
+        )
+        self.field_index = FieldIndex.from_snapshot(arrays, meta['field_index'], self.vocabulary,
+                                                    self.field_weights, self.k1, self.b)
+        if self.positional_index and 'positional_index' in meta:
+            self.positions = PositionalIndex.from_snapshot(arrays, meta['positional_index'], self.vocabulary)
+        else:
+            self._build_positional_index()  # Not in the snapshot; None unless enabled
+        self._build_filter_columns()
+        self._count_vocabulary()
+
+    def load_index(self, path: str):
+        """Load a snapshot, rebuilding it when the source CSV has changed since it was written"""
+        try:
+            arrays, meta = read_snapshot(path)
+        except ValueError as e:  # E.g. written in an older snapshot format
+            print(f"Cannot read index snapshot {path} ({e})")
+            arrays, meta = None, {}
+        if meta.get('source_hash') != file_sha256(self.data_file) or 'field_index' not in meta:
+            print(f"Index snapshot {path} is stale, rebuilding from {self.data_file}")
+            self._build_from_source()
+            self.save_index(path)
+            return
+        self.source_hash = meta['source_hash']
+        self._restore_snapshot_state(arrays, meta)
         
-        # Check all relevant fields for blocked terms
-        for term in self.blocked_terms:
-            if (term in name or 
-                term in brand or 
-                any(term in cat for cat in categories)):
-                return True
-        return False
+    @staticmethod
+    def _field_texts(products: List[Dict]) -> Dict[str, List[str]]:
+        """Text of each BM25F field, per product"""
+        return {
+            'product_name': [str(product.get('product_name', '')) for product in products],
+            'category_hierarchy': [' '.join(product['category_hierarchy'])
+                                   if isinstance(product.get('category_hierarchy'), list) else ''
+                                   for product in products],
+            'description': [str(product.get('description', '')) for product in products],
+        }
+
+    def _field_terms(self, product) -> Dict[str, List[str]]:
+        """Tokens of each BM25F field of a product"""
+        return {field: tokenize(texts[0]) for field, texts in self._field_texts([product]).items()}
+
+    def _build_field_index(self):
+        self.field_index = FieldIndex(self.vocabulary, self.field_weights, self.k1, self.b)
+        field_tokens = {field: tokenize_batch(texts) for field, texts
+                        in self._field_texts(self.df[list(self.field_weights)].to_dict('records')).items()}
+        for doc_id in range(len(self.df)):
+            self.field_index.add(doc_id, {field: tokens[doc_id] for field, tokens in field_tokens.items()})
+        self.field_index.compact()
+
+    @classmethod
+    def _phrase_texts(cls, products: List[Dict]) -> List[str]:
+        """Name and categories of each product, the text quoted phrases must appear in"""
+        texts = cls._field_texts(products)
+        return [f"{name} {categories}" for name, categories in zip(texts['product_name'], texts['category_hierarchy'])]
+
+    def _build_positional_index(self):
+        self.positions = None
+        if self.positional_index:
+            texts = self._phrase_texts(self.df[['product_name', 'category_hierarchy']].to_dict('records'))
+            self.positions = PositionalIndex.from_texts(texts, self.vocabulary, self.deleted_docs)
+
+    def compact(self):
+        super().compact()
+        self.field_index.compact()
+        if self.positions is not None:
+            self.positions.compact()
+
+    def _count_vocabulary(self):
+        """Count live products per brand and category so updates can keep the extractor in sync"""
+        self._suggester = None
+        self.brand_counts = Counter()
+        self.category_counts = Counter()
+        for doc_id, (brand, categories) in enumerate(zip(self.df['brand'], self.df['category_hierarchy'])):
+            if doc_id not in self.deleted_docs:
+                self._count_product({'brand': brand, 'category_hierarchy': categories}, 1)
+
+    def _count_product(self, product, delta: int):
+        brand = str(product.get('brand', '')).lower()
+        categories = product.get('category_hierarchy')
+        categories = {str(c).lower() for c in categories} if isinstance(categories, list) else set()
+        for counts, keys in ((self.brand_counts, [brand]), (self.category_counts, categories)):
+            for key in keys:
+                if key not in counts:
+                    self._vocabulary_changed = True
+                counts[key] += delta
+                if counts[key] <= 0:
+                    del counts[key]
+                    self._vocabulary_changed = True
+        self._update_suggester('brand', [brand], delta)
+        self._update_suggester('category', categories, delta)
+
+    def _sync_extractor(self):
+        # Reassigning the lists recompiles the extractor's matchers, so only do it on change
+        if getattr(self, '_vocabulary_changed', True):
+            self.extractor.known_brands = list(self.brand_counts)
+            self.extractor.known_categories = list(self.category_counts)
+            self._vocabulary_changed = False
+
+    def _clean_product(self, product: Dict) -> Dict:
+        """Apply the _clean_data rules to a single product"""
+        product = clean_catalog_product(product)
+        product.setdefault('description', '')
+        if pd.isna(product['discounted_price']):
+            product['discounted_price'] = float('inf')
+        return product
+
+    def upsert_product(self, product: Dict, doc_id: Optional[int] = None) -> int:
+        """Insert or update a product, keeping the DataFrame and query extractor in sync"""
+        product = self._clean_product(product)
+        old_terms = set() if doc_id is None else self._suggester_terms(doc_id)
+        if doc_id is not None and doc_id < len(self.df) and doc_id not in self.deleted_docs:
+            self._count_product(self.df.iloc[doc_id], -1)
+            self.field_index.remove(doc_id)
+            self.trending.remove(doc_id)
+            if self.positions is not None:
+                self.positions.remove(doc_id)
+        doc_id = super().upsert_product(product, doc_id)
+        self.field_index.add(doc_id, self._field_terms(product))
+        if self.positions is not None:
+            self.positions.add(doc_id, self._phrase_texts([product])[0])
+        self.filter_columns.set_row(doc_id, product)
+        self.trending.set_row(doc_id, product)
+        self._count_product(product, 1)
+        new_terms = self._suggester_terms(doc_id)
+        terms = self.vocabulary.terms
+        self._update_suggester('term', [terms[term] for term in new_terms - old_terms], 1)
+        self._update_suggester('term', [terms[term] for term in old_terms - new_terms], -1)
+        self._sync_extractor()
+        return doc_id
+
+    def delete_product(self, doc_id: int):
+        """Delete a product, keeping the query extractor in sync"""
+        old_terms = self._suggester_terms(doc_id)
+        super().delete_product(doc_id)
+        terms = self.vocabulary.terms
+        self._update_suggester('term', [terms[term] for term in old_terms], -1)
+        self.field_index.remove(doc_id)
+        self.trending.remove(doc_id)
+        if self.positions is not None:
+            self.positions.remove(doc_id)
+        self.filter_columns.delete(doc_id)
+        self._count_product(self.df.iloc[doc_id], -1)
+        self._sync_extractor()
+
+    def _build_filter_columns(self):
+        self.filter_columns = FilterColumns.from_frame(self.df, self.deleted_docs)
+        self.filter_columns.set_blocklist(self.blocked_terms)
+        self.trending = TrendingIndex.from_frame(self.df, self.filter_columns)
+
+    def reload_blocklist(self, blocked_terms: List[str]):
+        """Replace the blocked terms; takes effect on the next query without reindexing"""
+        self.blocked_terms = list(blocked_terms)
+        self.filter_columns.set_blocklist(self.blocked_terms)
+        self.trending.rebuild()
+        self.blocklist_version += 1
+
+    def _prefix_suggester(self) -> PrefixSuggester:
+        """Suggester over live terms, brands and categories, rebuilt when the blocklist changed"""
+        if self._suggester is None or self._suggester[0] != self.blocklist_version:
+            terms = self.vocabulary.terms
+            counts = [{text: count for text, count in items if not self._suggestion_blocked(text)}
+                      for items in ([(terms[term], df) for term, df in self.doc_freqs.items()],
+                                    self.brand_counts.items(), self.category_counts.items())]
+            self._suggester = (self.blocklist_version, PrefixSuggester.from_counts(*counts))
+        return self._suggester[1]
+
+    def _suggestion_blocked(self, text: str) -> bool:
+        # Substring match, as FilterColumns blocks products, so no suggestion leads to hidden products
+        return not text or any(term.lower() in text for term in self.blocked_terms if term)
+
+    def _update_suggester(self, kind: str, texts: Iterable[str], delta: int):
+        """Apply a catalog change to the suggester, unless it is due for a rebuild anyway"""
+        if self._suggester is None or self._suggester[0] != self.blocklist_version:
+            return
+        for text in texts:
+            if not self._suggestion_blocked(text):
+                self._suggester[1].update(text, delta, kind)
+
+    def _suggester_terms(self, doc_id: int) -> Set[int]:
+        """Term ids of a live document, when the suggester needs its document frequency changes"""
+        if self._suggester is None or doc_id >= len(self.doc_lengths) or doc_id in self.deleted_docs:
+            return set()
+        return set(self._doc_terms(doc_id))
+
+    def suggest(self, text: str, limit: int = 10) -> List[Tuple[str, int, str]]:
+        """Type-ahead completions of the text typed so far, as (suggestion, weight, kind)
+
+        kind is 'brand', 'category' or 'term'; weight is the number of live
+        products with that brand or category, or containing that term.
+        Completions of the whole text come first; for several words, the last
+        one is then completed as well, keeping the words before it. After a
+        trailing space only longer brands and categories are suggested.
+        """
+        suggester = self._prefix_suggester()
+        words = text.lower().split()
+        if not words:
+            return []
+        results = suggester.complete(text, limit)
+        if len(words) > 1 and not text[-1].isspace() and len(results) < limit:
+            head = ' '.join(words[:-1])
+            seen = {suggestion for suggestion, _, _ in results}
+            for suggestion, weight, kind in suggester.complete(words[-1], limit):
+                suggestion = f"{head} {suggestion}"
+                if suggestion not in seen and len(results) < limit:
+                    results.append((suggestion, weight, kind))
+        return results
+
+    def trending_products(self, category: Optional[str] = None, limit: int = 10,
+                          metric: str = 'discount') -> List[Tuple[int, float]]:
+        """(doc_id, value) of the top products by 'discount', 'rating' or 'score'
+
+        category matches any level of a product's hierarchy; without it the
+        whole catalog is ranked. Deleted and blocklisted products are left out.
+        """
+        return self.trending.top(metric, category, limit)
+
+    @property
+    def _cache_version(self) -> Tuple[int, int]:
+        """Cached results are valid for one index version and one blocklist"""
+        return (self.index_version, self.blocklist_version)
     
     def _clean_data(self):
         """Ensure data consistency and handle missing values"""
-        # Create missing columns with empty defaults
-        for col in ['product_name', 'brand', 'category_hierarchy', 'discounted_price', 'description']:
-            if col not in self.df.columns:
-                self.df[col] = '' if col != 'discounted_price' else float('inf')
-        
-        # Clean text fields
-        self.df['product_name'] = self.df['product_name'].astype(str)
-        self.df['brand'] = self.df['brand'].astype(str).replace('nan', '')
-        
-        # Handle category hierarchy
-        if 'category_hierarchy' in self.df.columns:
-            if isinstance(self.df['category_hierarchy'].iloc[0], str):
-                self.df['category_hierarchy'] = (
-                    self.df['category_hierarchy']
-                    .str.split('>>')
-                    .apply(lambda x: [item.strip() for item in x] if isinstance(x, list) else [])
-                )
-            elif not isinstance(self.df['category_hierarchy'].iloc[0], list):
-                self.df['category_hierarchy'] = [[] for _ in range(len(self.df))]
-        
-        # Clean numeric fields
-        self.df['discounted_price'] = (
-            pd.to_numeric(self.df['discounted_price'], errors='coerce')
-            .fillna(float('inf'))
-        )
+        self.df = self._clean_frame(self.df)
+
+    def _clean_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """_clean_data rules applied to one DataFrame (the whole catalog or a chunk of it)
+
+        The export's own cleaning (clean_catalog_frame, shared with
+        FlipkartDataPreprocessor), plus what indexing needs: a description
+        column and an infinite price where the price is unknown.
+        """
+        df = clean_catalog_frame(df)
+        if 'description' not in df.columns:
+            df['description'] = ''
+        df['discounted_price'] = df['discounted_price'].fillna(float('inf'))
+        return df
 
     def _get_unique_brands(self) -> List[str]:
         """Get unique brand names"""
@@ -202,104 +1119,208 @@ class FlipkartSearchEngine(SearchEngineBase):
         
         return filters
 
-    def _calculate_relevance(self, product: pd.Series, query_terms: List[str]) -> float:
-        """Calculate custom relevance score"""
-        # Base score components
-        name = product.get('product_name', '').lower()
-        categories = ' '.join(product.get('category_hierarchy', [])).lower()
-        description = product.get('description', '').lower()
-        
-        # Term presence boosts
-        name_matches = sum(1 for term in query_terms if term in name)
-        category_matches = sum(1 for term in query_terms if term in categories)
+    def _merge_filters(self, filters: Dict, extra: Dict) -> Dict:
+        """Narrow extracted filters with explicit ones given in the same shape"""
+        price = extra.get('price', {})
+        if price.get('max_price') is not None:
+            current = filters['price'].get('max_price')
+            filters['price']['max_price'] = min(current, price['max_price']) if current else price['max_price']
+        if price.get('min_price') is not None:
+            filters['price']['min_price'] = max(filters['price'].get('min_price') or 0, price['min_price'])
+        if extra.get('min_rating') is not None:
+            filters['min_rating'] = max(filters.get('min_rating') or 0, extra['min_rating'])
+        for key in ('brands', 'categories', 'must_include', 'exclude'):
+            for value in extra.get(key, []):
+                if value not in filters.setdefault(key, []):
+                    filters[key].append(value)
+        return filters
+
+    def _candidate_mask(self, filters: Dict) -> np.ndarray:
+        """Filters as a bool mask over doc ids, applied before BM25 scoring
+
+        With the positional index, quoted phrases match whole words in order,
+        found by intersecting position postings; otherwise, and for phrases
+        with no indexable words, they match as substrings.
+        """
+        size = len(self.doc_lengths)
+        if self.positions is None or not filters.get('must_include'):
+            return self.filter_columns.mask(filters, size)
+        substrings, phrase_docs = [], []
+        for phrase in filters['must_include']:
+            docs = self.positions.phrase_docs(phrase)
+            if docs is None:
+                substrings.append(phrase)
+            else:
+                phrase_docs.append(docs)
+        mask = self.filter_columns.mask({**filters, 'must_include': substrings}, size)
+        for docs in phrase_docs:
+            selected = np.zeros(size, dtype=bool)
+            selected[docs[docs < size]] = True
+            mask &= selected
+        return mask
+
+    def _retrieve(self, query: str, top_n: int, candidate_mask: np.ndarray,
+                  trace: Optional[QueryTrace] = None,
+                  corrections: Optional[Dict[str, str]] = None) -> List[Tuple[int, float]]:
+        """BM25 top-n among the candidates; overridden by engines that score elsewhere"""
+        return SearchEngineBase.search(self, query, top_n, candidate_mask, trace, corrections)
+
+    def _retrieve_many(self, queries: List[str], top_n: int, candidate_masks: List[np.ndarray],
+                       corrections: Optional[List[Dict[str, str]]] = None) -> List[List[Tuple[int, float]]]:
+        return SearchEngineBase.search_many(self, queries, top_n, candidate_masks, corrections)
+
+    def _rank_candidates(self, base_results: List[Tuple[int, float]], query_terms: List[str], top_n: int,
+                         candidate_mask: np.ndarray, collapse: bool = False,
+                         timer: Optional[StageTimer] = None,
+                         corrections: Optional[Dict[str, str]] = None) -> List[Tuple]:
+        """Re-rank and deduplicate base BM25 results, which already satisfy the filters"""
+        doc_ids = np.fromiter((doc_id for doc_id, _ in base_results), dtype=np.int64, count=len(base_results))
+        term_ids, idfs = self._weighted_terms(query_terms, corrections or {})
+        # Field-aware relevance: name/category/description matches weighted per field_weights
+        field_scores = self.field_index.scores(doc_ids, term_ids, idfs)
+        boosts = 1 + field_scores * 0.1
+        if self.positions is not None and self.proximity_weight:
+            boosts *= 1 + self.proximity_weight * self.positions.proximity(doc_ids, term_ids)
+        results = [(doc_id, bm25_score * boost)  # Combine scores
+                   for (doc_id, bm25_score), boost in zip(base_results, boosts.tolist())]
+        if timer:
+            timer.lap('rank')
         
-        # Positional boosts
-        name_boost = 3.0  # Highest priority - matches in product name
-        category_boost = 2.0  # Medium priority - matches in category
-        desc_boost = 1.0  # Lower priority - matches in description
+        dup_group = self.filter_columns.dup_group
+        if collapse:
+            # Best-scoring member per duplicate group, plus how many other members passed the filters
+            best = {}
+            for doc_id, score in results:
+                group = dup_group[doc_id]
+                if group not in best or score > best[group][1]:
+                    best[group] = (doc_id, score)
+            group_counts = self.filter_columns.group_counts(candidate_mask)
+            final_results = [(doc_id, score, int(group_counts[dup_group[doc_id]]) - 1)
+                             for doc_id, score in best.values()]
+        else:
+            # Deduplicate results
+            seen = set()
+            final_results = []
+            for doc_id, score in results:
+                group = dup_group[doc_id]
+                if group not in seen:
+                    seen.add(group)
+                    final_results.append((doc_id, score))
         
-        return (
-            (name_matches * name_boost) + 
-            (category_matches * category_boost) +
-            (sum(1 for term in query_terms if term in description) * desc_boost)
-        )
+        # Sort by final score and return top results
+        final_results.sort(key=lambda x: x[1], reverse=True)
+        if timer:
+            timer.lap('dedup')
+        return final_results[:top_n]
+
+    def search_many(self, queries: List[str], top_n: int = 10, collapse: bool = False) -> List[SearchResults]:
+        """Batch search: one sparse multiply for retrieval, a candidate mask per query
+
+        Cached queries are answered from the result cache and the rest are
+        cached afterwards, so this also serves to warm the cache.
+        """
+        results = [SearchResults() for _ in queries]
+        pending = []  # (position, normalized query, candidate mask, query terms, cache key, corrections)
+        for position, query in enumerate(queries):
+            try:
+                query = self.extractor.normalize(query)
+                filters = self._extract_filters(query)
+                query_terms = self.preprocess_text(query)
+                if not query_terms:
+                    continue
+                key = self._cache_key(query_terms, filters, top_n, collapse)
+                cached = self.result_cache.get(key, self._cache_version)
+                if cached is not None:
+                    results[position] = SearchResults(*cached)
+                else:
+                    pending.append((position, query, self._candidate_mask(filters), query_terms, key,
+                                    self.correct_terms(query_terms)))
+            except Exception as e:
+                print(f"Search error: {str(e)}")
+
+        base_batch = self._retrieve_many(
+            [entry[1] for entry in pending], top_n * 2,
+            [entry[2] for entry in pending],
+            [entry[5] for entry in pending]
+        ) if pending else []
+        for (position, _, candidate_mask, query_terms, key, corrections), base_results in zip(pending, base_batch):
+            try:
+                results[position] = SearchResults(self._rank_candidates(
+                    base_results, query_terms, top_n, candidate_mask, collapse, corrections=corrections), corrections)
+                self.result_cache.put(key, self._cache_version, (tuple(results[position]), corrections))
+            except Exception as e:
+                print(f"Search error: {str(e)}")
+        return results
 
-    def search(self, query: str, top_n: int = 10) -> List[Tuple[int, float]]:
-        """Precision search with intelligent filtering"""
+    def _cache_key(self, query_terms: List[str], filters: Dict, top_n: int, collapse: bool):
+        """Results depend only on the query terms, the extracted filters, top_n and collapse"""
+        return (tuple(query_terms), freeze(filters), top_n, collapse)
+
+    def search(self, query: str, top_n: int = 10, collapse: bool = False,
+               filters: Optional[Dict] = None, trace: Optional[QueryTrace] = None) -> SearchResults:
+        """Precision search with intelligent filtering
+
+        Returns (doc_id, score) pairs, one per duplicate group (same name and
+        brand). With collapse=True each group is represented by its best-scoring
+        member and results are (doc_id, score, hidden_variants) triples.
+        filters, shaped like QueryExtractor output, narrows the extracted ones.
+        Query terms no product contains are matched to their closest indexed
+        spelling (see correct_terms), at a lower weight; the results'
+        corrections attribute maps each such term to the term searched instead.
+        Each stage is timed into self.metrics, when set, and into trace.
+        """
+        timer = self._stage_timer(trace)
         try:
+            if timer:
+                timer.count('queries', 1)
             # Process query and extract filters
+            query = self.extractor.normalize(query)
+            extra_filters = filters
             filters = self._extract_filters(query)
-            query_terms = self.preprocess_text(query.lower())
+            if extra_filters:
+                self._merge_filters(filters, extra_filters)
+            query_terms = self.preprocess_text(query)
+            if timer:
+                timer.lap('extract_filters')
             
             if not query_terms:
-                return []
-            
-            # Get base results
-            base_results = super().search(query, top_n * 2)
-            
-            # Apply strict filtering and custom relevance
-            seen=set()
-            final_results = []
-            for doc_id, bm25_score in base_results:
-                product = self.df.iloc[doc_id]
-                
-                # Skip blocked products
-                if self._is_blocked_product(product):
-                    continue
-                
-                key = (
-                    product['product_name'].strip().lower(),
-                    product['brand'].strip().lower()
-                )
-                
-                if key in seen:
-                    continue
-                seen.add(key)
-                   
-            results = []
-            for doc_id, bm25_score in base_results:
-                product = self.df.iloc[doc_id]
-                
-                # Price filter
-                price = product.get('discounted_price', float('inf'))
-                if filters['price'].get('max_price') and price > filters['price']['max_price']:
-                    continue
-                
-                # Must-include terms filter
-                if filters['must_include']:
-                    product_text = f"{product['product_name']} {' '.join(product.get('category_hierarchy', []))}".lower()
-                    if not all(term in product_text for term in filters['must_include']):
-                        continue
-                
-                # Exclude terms filter
-                if filters['exclude']:
-                    product_text = f"{product['product_name']} {product.get('description', '')}".lower()
-                    if any(term in product_text for term in filters['exclude']):
-                        continue
-                
-                # Calculate custom relevance score
-                custom_score = self._calculate_relevance(product, query_terms)
-                final_score = bm25_score * (1 + custom_score * 0.1)  # Combine scores
-                
-                results.append((doc_id, final_score))
+                return SearchResults()
+
+            key = self._cache_key(query_terms, filters, top_n, collapse)
+            cached = self.result_cache.get(key, self._cache_version)
+            if timer:
+                timer.lap('cache_lookup')
+            if cached is not None:
+                if timer:
+                    timer.count('cache_hits', 1)
+                results = SearchResults(*cached)
+                if trace is not None:
+                    trace.corrections = results.corrections
+                return results
             
-            # Deduplicate results
-            seen = set()
-            final_results = []
-            for doc_id, score in results:
-                product = self.df.iloc[doc_id]
-                key = (
-                    product['product_name'].strip().lower(),
-                    product['brand'].strip().lower()
-                )
-                if key not in seen:
-                    seen.add(key)
-                    final_results.append((doc_id, score))
+            corrections = self.correct_terms(query_terms)
+            if trace is not None:
+                trace.corrections = corrections
+            if timer:
+                timer.lap('spelling')
+
+            # Get base results among the documents that pass the filters and the blocklist
+            candidate_mask = self._candidate_mask(filters)
+            if timer:
+                timer.lap('filter')
+                timer.count('candidates_filtered', self.num_docs - int(np.count_nonzero(candidate_mask)))
+            base_results = self._retrieve(query, top_n * 2, candidate_mask, trace, corrections)
+            if timer:
+                timer.lap('retrieve')
             
-            # Sort by final score and return top results
-            final_results.sort(key=lambda x: x[1], reverse=True)
-            return final_results[:top_n]
+            # Apply custom relevance
+            results = self._rank_candidates(base_results, query_terms, top_n, candidate_mask, collapse, timer,
+                                            corrections)
+            self.result_cache.put(key, self._cache_version, (tuple(results), corrections))
+            return SearchResults(results, corrections)
             
         except Exception as e:
             print(f"Search error: {str(e)}")
-            return []
\ No newline at end of file
+            if timer:
+                timer.count('errors', 1)
+            return SearchResults()
@@ -0,0 +1,155 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNTER_HELP = {
+    'queries': "Queries searched",
+    'cache_hits': "Queries answered from the result cache",
+    'postings_scanned': "Postings read while scoring queries",
+    'documents_scored': "Documents given a BM25 score",
+    'candidates_filtered': "Live documents removed by query filters and the blocklist before scoring",
+    'errors': "Searches that failed with an error",
+}
+
+
+class Histogram:
+    """Bucket counts, sum and count of observed values, as a Prometheus histogram holds them"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is the +Inf bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile: the upper bound of the bucket holding it"""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class QueryTrace:
+    """Stage timings and counters of one search, filled in when passed to search()
+
+    Stages are listed in the order they finished; base retrieval stages
+    ('bm25_*') finish inside the engine's 'retrieve' stage.
+    """
+
+    def __init__(self, query: str = ''):
+        self.query = query
+        self.stages: List[Tuple[str, float]] = []  # (stage, seconds)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.corrections: Dict[str, str] = {}  # Misspelled query term -> indexed term searched instead
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(seconds for stage, seconds in self.stages if not stage.startswith('bm25_'))
+
+    def as_dict(self) -> Dict:
+        return {
+            'query': self.query,
+            'stages': [{'stage': stage, 'ms': round(seconds * 1000, 4)} for stage, seconds in self.stages],
+            'counters': dict(self.counters),
+            'corrections': dict(self.corrections),
+            'total_ms': round(self.total_seconds * 1000, 4),
+        }
+
+
+class SearchMetrics:
+    """Per-stage latency histograms and work counters shared by every query of an engine
+
+    Thread-safe; to_prometheus() renders them in the Prometheus text format.
+    """
+
+    def __init__(self, namespace: str = 'fynd_search'):
+        self.namespace = namespace
+        self.stages: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, mean and approximate p50/p95/p99 milliseconds of each stage"""
+        with self._lock:
+            return {stage: {
+                'count': histogram.count,
+                'mean_ms': round(histogram.sum / histogram.count * 1000, 4) if histogram.count else 0.0,
+                **{f"p{int(q * 100)}_ms": histogram.quantile(q) * 1000 for q in (0.5, 0.95, 0.99)},
+            } for stage, histogram in self.stages.items()}
+
+    def to_prometheus(self) -> str:
+        """Histograms and counters in the Prometheus text exposition format"""
+        name = f"{self.namespace}_stage_seconds"
+        lines = [f"# HELP {name} Time spent in each stage of a search",
+                 f"# TYPE {name} histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum!r}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            for counter in sorted(set(COUNTER_HELP) | set(self.counters)):
+                counter_name = f"{self.namespace}_{counter}_total"
+                lines.append(f"# HELP {counter_name} {COUNTER_HELP.get(counter, counter)}")
+                lines.append(f"# TYPE {counter_name} counter")
+                lines.append(f"{counter_name} {self.counters.get(counter, 0)}")
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """Times consecutive stages of one query into SearchMetrics and/or a QueryTrace
+
+    Engines create one only when metrics are enabled or a trace was passed,
+    so disabled instrumentation costs a None check per stage.
+    """
+    __slots__ = ('metrics', 'trace', 'last')
+
+    def __init__(self, metrics: Optional[SearchMetrics], trace: Optional[QueryTrace]):
+        self.metrics = metrics
+        self.trace = trace
+        self.last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Record the time since the previous lap (or creation) as stage"""
+        now = time.perf_counter()
+        seconds, self.last = now - self.last, now
+        if self.metrics is not None:
+            self.metrics.observe(stage, seconds)
+        if self.trace is not None:
+            self.trace.stages.append((stage, seconds))
+
+    def count(self, name: str, value: int):
+        if self.metrics is not None:
+            self.metrics.increment(name, value)
+        if self.trace is not None:
+            self.trace.counters[name] += value
@@ -0,0 +1,326 @@
+import heapq
+import math
+import os
+import weakref
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+import pandas as pd
+from document_store import DocumentStore
+from search_engine import FlipkartSearchEngine, SearchEngineBase
+from search_metrics import QueryTrace
+from vocabulary import tokenize
+
+# The shard held by the current worker process
+_shard = None
+
+
+class ShardIndex(SearchEngineBase):
+    """Index over one contiguous range of doc ids, scored with corpus-wide statistics"""
+    max_edit_distance = 0  # The coordinator corrects spelling against the whole vocabulary
+
+    def __init__(self, df: pd.DataFrame, offset: int, index_backend: str = 'dict',
+                 retrieval_mode: str = 'exhaustive'):
+        super().__init__(df.reset_index(drop=True), index_backend=index_backend, retrieval_mode=retrieval_mode)
+        self.offset = offset  # Global doc id of local doc 0
+        self.global_doc_freqs = {}
+        self.global_num_docs = 0
+
+    def set_global_stats(self, doc_freqs: Dict[str, int], num_docs: int, avg_doc_length: float):
+        """Score with the whole corpus' df, N and average length, as an unsharded index would"""
+        self.global_doc_freqs = {}
+        self.update_global_stats(doc_freqs, num_docs, avg_doc_length)
+
+    def update_global_stats(self, doc_freqs: Dict[str, int], num_docs: int, avg_doc_length: float):
+        """Take the corpus-wide df of the terms a catalog update changed, and the new N and average length"""
+        # Keyed by this shard's term ids; terms it has never seen match nothing here anyway
+        for term, df in doc_freqs.items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            if df:
+                self.global_doc_freqs[term_id] = df
+            else:
+                self.global_doc_freqs.pop(term_id, None)
+        self.global_num_docs = num_docs
+        self.avg_doc_length = avg_doc_length
+
+    def _doc_freq(self, term: Optional[int]) -> int:
+        return self.global_doc_freqs.get(term, 0)
+
+    def _idf(self, df: int) -> float:
+        N = self.global_num_docs
+        return math.log((N - df + 0.5) / (df + 0.5) + 1)
+
+    def _local_mask(self, packed_mask: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if packed_mask is None:
+            return None
+        return np.unpackbits(packed_mask, count=len(self.doc_lengths)).astype(bool)
+
+    def _to_global(self, results: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+        return [(doc_id + self.offset, score) for doc_id, score in results]
+
+
+def _init_shard(df: pd.DataFrame, offset: int, index_backend: str, retrieval_mode: str):
+    global _shard
+    _shard = ShardIndex(df, offset, index_backend, retrieval_mode)
+    _shard.build_index()
+
+
+def _load_shard(path: str, offset: int, index_backend: str, retrieval_mode: str):
+    global _shard
+    _shard = ShardIndex(pd.DataFrame(), offset, index_backend, retrieval_mode)
+    _shard.load_index(path)
+
+
+def _shard_save(path: str):
+    _shard.save_index(path)
+
+
+def _shard_stats() -> Tuple[Dict[str, int], List[int]]:
+    """Document frequencies by term string, since term ids are local to each shard"""
+    terms = _shard.vocabulary.terms
+    return {terms[term_id]: df for term_id, df in _shard.doc_freqs.items()}, list(_shard.doc_lengths)
+
+
+def _shard_set_global_stats(doc_freqs: Dict[str, int], num_docs: int, avg_doc_length: float):
+    _shard.set_global_stats(doc_freqs, num_docs, avg_doc_length)
+
+
+def _shard_update_global_stats(doc_freqs: Dict[str, int], num_docs: int, avg_doc_length: float):
+    _shard.update_global_stats(doc_freqs, num_docs, avg_doc_length)
+
+
+def _shard_upsert(product: Dict, doc_id: int):
+    _shard.upsert_product(product, doc_id)
+
+
+def _shard_delete(doc_id: int):
+    _shard.delete_product(doc_id)
+
+
+def _shutdown_shards(shards: List[ProcessPoolExecutor]):
+    for shard in shards:
+        shard.shutdown(cancel_futures=True)
+
+
+def _shard_search(query: str, top_n: int, packed_mask: Optional[np.ndarray],
+                  corrections: Optional[Dict[str, str]] = None) -> List[Tuple[int, float]]:
+    return _shard._to_global(_shard.search(query, top_n, _shard._local_mask(packed_mask), corrections=corrections))
+
+
+def _shard_search_many(queries: List[str], top_n: int, packed_masks: List[Optional[np.ndarray]],
+                       corrections: Optional[List[Dict[str, str]]] = None) -> List[List[Tuple[int, float]]]:
+    masks = [_shard._local_mask(packed_mask) for packed_mask in packed_masks]
+    return [_shard._to_global(results) for results in _shard.search_many(queries, top_n, masks, corrections)]
+
+
+def _merge_top_n(shard_results: List[List[Tuple[int, float]]], top_n: int) -> List[Tuple[int, float]]:
+    """Merge per-shard rankings (each best first) into the global top n, ties by doc id"""
+    merged = heapq.merge(*shard_results, key=lambda x: (-x[1], x[0]))
+    return [(int(doc_id), float(score)) for doc_id, score in islice(merged, top_n)]
+
+
+class ShardedSearchEngine(FlipkartSearchEngine):
+    """FlipkartSearchEngine whose BM25 index is partitioned by doc id across worker processes
+
+    Each shard process holds the inverted index for one contiguous range of doc
+    ids and scores with corpus-wide df, N and average length, so the merged
+    top-k equals that of a single index. The coordinator keeps the catalog,
+    filter columns and field index: it turns filters into a candidate mask,
+    scatters the query and mask to every shard, heap-merges the shard top-k
+    lists, then re-ranks and deduplicates as FlipkartSearchEngine does.
+    Upserts and deletes go to the shard owning the doc id (new products to
+    the last shard), after which every shard gets the changed df, N and
+    average length. save_index writes the coordinator's snapshot (catalog,
+    filters and global statistics) to the given path and each shard's
+    postings next to it, with a ".shard<n>" suffix. The workers are shut
+    down by close(), on leaving a with block, or when the engine is garbage
+    collected.
+    """
+
+    def __init__(self, data_file: str, num_shards: Optional[int] = None, index_backend: str = 'dict',
+                 retrieval_mode: str = 'exhaustive', cache_size: int = 1024, cache_ttl: float = 300.0,
+                 field_weights: Optional[Dict[str, float]] = None, positional_index: bool = False,
+                 snapshot_path: Optional[str] = None):
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.shards: List[ProcessPoolExecutor] = []
+        self.shard_offsets: List[int] = []
+        self._finalizer = None
+        super().__init__(data_file, index_backend=index_backend, retrieval_mode=retrieval_mode,
+                         cache_size=cache_size, cache_ttl=cache_ttl, field_weights=field_weights,
+                         positional_index=positional_index, snapshot_path=snapshot_path)
+
+    def build_index(self):
+        """Start one worker per shard, build the shard indexes and share global statistics"""
+        if self.df.empty:
+            raise ValueError("DataFrame is empty")
+
+        bounds = np.linspace(0, len(self.df), min(self.num_shards, len(self.df)) + 1).astype(int).tolist()
+        self.shard_offsets = bounds[:-1]
+        self._start_shards(_init_shard, [(self.df.iloc[start:end], start) for start, end in zip(bounds, bounds[1:])])
+
+        doc_freqs = Counter()
+        self.doc_lengths = []
+        for shard_doc_freqs, shard_doc_lengths in self._gather(_shard_stats):
+            doc_freqs.update(shard_doc_freqs)
+            self.doc_lengths.extend(shard_doc_lengths)
+        self.doc_freqs = defaultdict(int, {self.vocabulary.add(term): df for term, df in doc_freqs.items()})
+        self.num_docs = len(self.doc_lengths)
+        self.total_doc_length = sum(self.doc_lengths)
+        self.avg_doc_length = self.total_doc_length / self.num_docs
+        self.documents = DocumentStore()  # Document text lives in the shards
+        self.index_version += 1
+        self._gather(_shard_set_global_stats, dict(doc_freqs), self.num_docs, self.avg_doc_length)
+
+    def _start_shards(self, initializer, shard_args: List[tuple]):
+        """Replace the workers with one per shard, each set up by initializer(*args, backend, mode)"""
+        self.close()
+        self.shards = [ProcessPoolExecutor(max_workers=1, initializer=initializer,
+                                           initargs=(*args, self.index_backend, self.retrieval_mode))
+                       for args in shard_args]
+        self._finalizer = weakref.finalize(self, _shutdown_shards, list(self.shards))
+
+    def _gather(self, task, *args) -> list:
+        """Run task on every shard in parallel and return the results in shard order"""
+        futures = [shard.submit(task, *args) for shard in self.shards]
+        return [future.result() for future in futures]
+
+    def _shard_masks(self, candidate_mask: Optional[np.ndarray]) -> List[Optional[np.ndarray]]:
+        """Per-shard slices of a candidate mask, bit-packed to keep the IPC payload small"""
+        if candidate_mask is None:
+            return [None] * len(self.shards)
+        bounds = self.shard_offsets + [len(self.doc_lengths)]
+        return [np.packbits(candidate_mask[start:end]) for start, end in zip(bounds, bounds[1:])]
+
+    def _retrieve(self, query: str, top_n: int, candidate_mask: np.ndarray,
+                  trace: Optional[QueryTrace] = None,
+                  corrections: Optional[Dict[str, str]] = None) -> List[Tuple[int, float]]:
+        # Shards score in other processes, so their bm25_* stages are not traced
+        if not candidate_mask.any():
+            return []
+        if corrections is None:
+            corrections = self.correct_terms(self.preprocess_text(query))
+        futures = [shard.submit(_shard_search, query, top_n, packed_mask, corrections)
+                   for shard, packed_mask in zip(self.shards, self._shard_masks(candidate_mask))]
+        return _merge_top_n([future.result() for future in futures], top_n)
+
+    def _retrieve_many(self, queries: List[str], top_n: int, candidate_masks: List[np.ndarray],
+                       corrections: Optional[List[Dict[str, str]]] = None) -> List[List[Tuple[int, float]]]:
+        per_query = [self._shard_masks(candidate_mask) for candidate_mask in candidate_masks]
+        if corrections is None:
+            corrections = [self.correct_terms(self.preprocess_text(query)) for query in queries]
+        futures = [shard.submit(_shard_search_many, queries, top_n, [masks[i] for masks in per_query], corrections)
+                   for i, shard in enumerate(self.shards)]
+        shard_batches = [future.result() for future in futures]
+        return [_merge_top_n([batch[query_id] for batch in shard_batches], top_n)
+                for query_id in range(len(queries))]
+
+    def _doc_terms(self, doc_id: int) -> List[int]:
+        # The coordinator keeps no document text, so tokenize the catalog row
+        return self.vocabulary.lookup(tokenize(self._document_text(self.df.iloc[doc_id])))
+
+    def add_to_index(self, text: str, doc_id: int):
+        """Count a document in the global statistics; its shard holds the postings"""
+        terms = tokenize(text)
+        for term in set(self.vocabulary.add_all(terms)):
+            self.doc_freqs[term] += 1
+        if doc_id >= len(self.doc_lengths):
+            self.doc_lengths.append(len(terms))
+        else:
+            self.doc_lengths[doc_id] = len(terms)
+        self.num_docs += 1
+        self.total_doc_length += len(terms)
+        self.avg_doc_length = self.total_doc_length / self.num_docs
+        self.pending_changes += 1  # Still compacts the field and positional indexes now and then
+        self.index_version += 1
+
+    def _unindex(self, doc_id: int, lazy: bool):
+        # Only the statistics change here: there are no postings to tombstone
+        super()._unindex(doc_id, lazy=False)
+        self.pending_changes += 1
+
+    def _owning_shard(self, doc_id: int) -> Tuple[ProcessPoolExecutor, int]:
+        """The shard holding a doc id, and the doc id local to that shard"""
+        shard = bisect_right(self.shard_offsets, doc_id) - 1
+        return self.shards[shard], doc_id - self.shard_offsets[shard]
+
+    def _share_doc_freqs(self, terms: Set[int]):
+        """Send every shard the new df of the given term ids, and the new N and average length"""
+        vocabulary = self.vocabulary.terms
+        doc_freqs = {vocabulary[term]: self.doc_freqs.get(term, 0) for term in terms}
+        self._gather(_shard_update_global_stats, doc_freqs, self.num_docs, self.avg_doc_length)
+
+    def upsert_product(self, product: Dict, doc_id: Optional[int] = None) -> int:
+        """Insert or update a product on the coordinator and in the shard that owns its doc id"""
+        live = doc_id is not None and doc_id < len(self.doc_lengths) and doc_id not in self.deleted_docs
+        old_terms = set(self._doc_terms(doc_id)) if live else set()
+        doc_id = super().upsert_product(product, doc_id)
+        shard, local_id = self._owning_shard(doc_id)
+        shard.submit(_shard_upsert, self.df.iloc[doc_id].to_dict(), local_id).result()
+        self._share_doc_freqs(old_terms | set(self._doc_terms(doc_id)))
+        return doc_id
+
+    def delete_product(self, doc_id: int):
+        """Delete a product on the coordinator and in the shard that owns its doc id"""
+        super().delete_product(doc_id)
+        shard, local_id = self._owning_shard(doc_id)
+        shard.submit(_shard_delete, local_id).result()
+        self._share_doc_freqs(set(self._doc_terms(doc_id)))
+
+    @staticmethod
+    def _shard_path(path: str, shard: int) -> str:
+        return f"{path}.shard{shard}"
+
+    def _snapshot_state(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        arrays, meta = super()._snapshot_state()
+        # The coordinator has no postings to derive the corpus-wide df from, so it is stored by term id
+        doc_freqs = np.zeros(len(self.vocabulary), dtype=np.int64)
+        doc_freqs[list(self.doc_freqs)] = list(self.doc_freqs.values())
+        arrays['global_doc_freqs'] = doc_freqs
+        meta['shard_offsets'] = self.shard_offsets
+        return arrays, meta
+
+    def _restore_snapshot_state(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        if 'shard_offsets' not in meta:
+            raise ValueError("Not a ShardedSearchEngine snapshot")
+        self.close()  # load_index starts the shards from their own snapshots
+        super()._restore_snapshot_state(arrays, meta)
+        self.doc_freqs = defaultdict(int, {term: df for term, df in enumerate(arrays['global_doc_freqs'].tolist())
+                                           if df})
+        self.columnar = None
+        self.shard_offsets = list(meta['shard_offsets'])
+        self.num_shards = len(self.shard_offsets)
+
+    def save_index(self, path: str):
+        """Write each shard's snapshot to path.shard<n>, then the coordinator's to path"""
+        futures = [shard.submit(_shard_save, self._shard_path(path, i)) for i, shard in enumerate(self.shards)]
+        for future in futures:
+            future.result()
+        super().save_index(path)
+
+    def load_index(self, path: str):
+        """Load a snapshot written by save_index, rebuilding it when the source CSV has changed"""
+        super().load_index(path)
+        if self.shards:
+            return  # The snapshot was stale and build_index started fresh shards
+        self._start_shards(_load_shard, [(self._shard_path(path, i), offset)
+                                         for i, offset in enumerate(self.shard_offsets)])
+        terms = self.vocabulary.terms
+        self._gather(_shard_set_global_stats, {terms[term]: df for term, df in self.doc_freqs.items()},
+                     self.num_docs, self.avg_doc_length)
+
+    def close(self):
+        """Shut down the shard worker processes"""
+        if self._finalizer is not None:
+            self._finalizer()
+        self.shards = []
+
+    def __enter__(self) -> 'ShardedSearchEngine':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
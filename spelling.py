@@ -0,0 +1,112 @@
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+
+
+def deletes(word: str, max_distance: int, prefix_length: int) -> Set[str]:
+    """The word's prefix and every string obtained by deleting up to max_distance characters from it"""
+    word = word[:prefix_length]
+    result = frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))} - result
+        result = result | frontier
+    return result
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance (transpositions count as one edit), capped at max_distance + 1"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+    return min(current[-1], max_distance + 1)
+
+
+def max_distance_for(word: str, limit: int) -> int:
+    """Edits allowed when correcting word: none for short words, whose neighbours are mostly other words"""
+    if len(word) < 5:
+        return 0
+    return min(limit, 1 if len(word) < 9 else 2)
+
+
+class SymSpellIndex:
+    """Symmetric-delete index from misspellings to vocabulary term ids
+
+    Every term is stored under each string obtained by deleting up to
+    max_distance characters from its first prefix_length characters. A word
+    within max_distance edits of a term shares at least one such delete with
+    it, so looking up the word's own deletes yields every candidate in a
+    number of probes that depends on the word length, not the vocabulary
+    size; candidates are then checked with the real edit distance. Deletes
+    are stored as sorted hash and term id arrays, so the index takes about
+    12 bytes per delete. Terms added to the vocabulary later go to a small dict.
+    """
+
+    def __init__(self, max_distance: int = 2, prefix_length: int = 7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.hashes = np.empty(0, dtype=np.int64)   # Sorted hashes of deletes
+        self.term_ids = np.empty(0, dtype=np.int32)  # Term id of each hash
+        self.recent: Dict[str, List[int]] = defaultdict(list)  # delete -> ids of terms added after the build
+        self.num_terms = 0  # Vocabulary ids below this are indexed
+
+    @classmethod
+    def build(cls, terms: Sequence[str], max_distance: int = 2, prefix_length: int = 7) -> 'SymSpellIndex':
+        index = cls(max_distance, prefix_length)
+        hashes, term_ids = [], []
+        for term_id, term in enumerate(terms):
+            for delete in deletes(term, max_distance, prefix_length):
+                hashes.append(hash(delete))
+                term_ids.append(term_id)
+        hashes = np.array(hashes, dtype=np.int64)
+        order = np.argsort(hashes, kind='stable')
+        index.hashes, index.term_ids = hashes[order], np.array(term_ids, dtype=np.int32)[order]
+        index.num_terms = len(terms)
+        return index
+
+    def extend(self, terms: Sequence[str]):
+        """Index the terms with ids from num_terms on (added to the vocabulary since the build)"""
+        for term_id in range(self.num_terms, len(terms)):
+            for delete in deletes(terms[term_id], self.max_distance, self.prefix_length):
+                self.recent[delete].append(term_id)
+        self.num_terms = len(terms)
+
+    def candidates(self, word: str, max_distance: int) -> Set[int]:
+        """Ids of terms that may be within max_distance edits of word (a superset)"""
+        probes = deletes(word, max_distance, self.prefix_length)
+        hashes = np.fromiter((hash(probe) for probe in probes), dtype=np.int64, count=len(probes))
+        starts = np.searchsorted(self.hashes, hashes, side='left')
+        ends = np.searchsorted(self.hashes, hashes, side='right')
+        found = set()
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if start < end:
+                found.update(self.term_ids[start:end].tolist())
+        for probe in probes:
+            found.update(self.recent.get(probe, ()))
+        return found
+
+    def lookup(self, word: str, terms: Sequence[str], frequency: Callable[[int], int],
+               max_distance: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        """(term id, distance) of the closest term in use, the most frequent among equally close ones
+
+        frequency(term_id) is the term's document frequency; unused terms
+        (frequency 0) are never suggested.
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        best = None  # (distance, -frequency, term id)
+        for term_id in self.candidates(word, max_distance):
+            distance = edit_distance(word, terms[term_id], max_distance)
+            if distance > max_distance:
+                continue
+            count = frequency(term_id)
+            if count and (best is None or (distance, -count, term_id) < best):
+                best = (distance, -count, term_id)
+        return None if best is None else (best[2], best[0])
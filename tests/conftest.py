@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+sys.path.insert(0, ROOT)
+
+from synthetic_catalog import make_catalog
+
+
+@pytest.fixture(scope='session')
+def catalog_csv(tmp_path_factory) -> str:
+    """A small synthetic catalog, shared by every test of the session"""
+    path = tmp_path_factory.mktemp('catalog') / 'catalog.csv'
+    make_catalog(1500, seed=7, tail_words=400).to_csv(path, index=False)
+    return str(path)
@@ -0,0 +1,30 @@
+from search_engine import FlipkartSearchEngine
+from autocomplete import PrefixSuggester
+
+PREFIXES = ['c', 'co', 'cot', 's', 'sa', 'sl', 'w', 'wa', 'zz', 'q', 'qw']
+
+
+def rebuilt_suggester(engine):
+    terms = engine.vocabulary.terms
+    counts = [{text: count for text, count in items if not engine._suggestion_blocked(text)}
+              for items in ([(terms[term], df) for term, df in engine.doc_freqs.items()],
+                            engine.brand_counts.items(), engine.category_counts.items())]
+    return PrefixSuggester.from_counts(*counts)
+
+
+def test_updates_keep_the_suggester_equal_to_a_rebuild(catalog_csv):
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+    suggester = engine._prefix_suggester()
+    for doc_id in range(0, 40, 4):
+        product = engine.df.iloc[doc_id].to_dict()
+        engine.upsert_product(dict(product, brand='Qwerty', product_name=f"{product['product_name']} qwertz"))
+        engine.upsert_product(dict(product, product_name='Walnut Cotton Shirt'), doc_id + 1)
+        engine.delete_product(doc_id + 2)
+
+    assert engine._prefix_suggester() is suggester  # Updated in place, not rebuilt
+    expected = rebuilt_suggester(engine)
+    assert suggester.texts == expected.texts
+    for prefix in PREFIXES:
+        for limit in (5, 20, 40):
+            assert suggester.complete(prefix, limit) == expected.complete(prefix, limit), (prefix, limit)
+    assert ('qwerty', 10, 'brand') in engine.suggest('qw')
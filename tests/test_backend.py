@@ -0,0 +1,43 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'FYND-Combined', 'backend')
+
+
+@pytest.fixture(scope='module')
+def client(catalog_csv, tmp_path_factory):
+    """Test client of the backend app, loaded over the synthetic catalog"""
+    os.environ['FYND_DATA_FILE'] = catalog_csv
+    os.environ['FYND_INDEX_SNAPSHOT'] = str(tmp_path_factory.mktemp('snapshot') / 'catalog.fyndidx')
+    sys.path.insert(0, BACKEND_DIR)
+    try:
+        app_module = importlib.import_module('app')
+    finally:
+        sys.path.remove(BACKEND_DIR)
+        os.environ.pop('FYND_DATA_FILE')
+        os.environ.pop('FYND_INDEX_SNAPSHOT')
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize('body', [b'[1, 2]', b'"cotton"', b'3'])
+def test_search_rejects_json_that_is_not_an_object(client, body):
+    response = client.post('/api/search', data=body)
+    assert response.status_code == 400
+
+
+def test_min_rating_is_applied_before_the_limit(client):
+    response = client.post('/api/search', json={'query': 'cotton shirt', 'limit': 20, 'min_rating': 4.0})
+    products = response.get_json()['products']
+    assert len(products) == 20
+    assert all(product['rating'] >= 4.0 for product in products)
+
+
+def test_search_reports_corrections(client):
+    response = client.post('/api/search', json={'query': 'leather lether wallet'})
+    assert response.get_json()['corrections'] == {'lether': 'leather'}
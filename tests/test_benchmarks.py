@@ -0,0 +1,45 @@
+import json
+import os
+
+from run_benchmarks import DEFAULT_SIZES, METRICS, compare, latency_percentiles, metric
+from synthetic_catalog import catalog_csv, make_catalog, make_queries
+
+BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'baseline.json')
+
+
+def report(search_p95, build_seconds=2.0):
+    return {'settings': {'seed': 0}, 'environment': {'python': '3'},
+            'results': {'10000': {'build_seconds': build_seconds, 'search_ms': {'p95': search_p95}}}}
+
+
+def test_catalog_and_queries_are_deterministic(tmp_path):
+    assert make_catalog(200, seed=4, tail_words=200).equals(make_catalog(200, seed=4, tail_words=200))
+    assert not make_catalog(200, seed=4, tail_words=200).equals(make_catalog(200, seed=5, tail_words=200))
+    assert make_queries(50, seed=4) == make_queries(50, seed=4)
+
+    path = catalog_csv(50, str(tmp_path), seed=4)
+    modified = os.path.getmtime(path)
+    assert catalog_csv(50, str(tmp_path), seed=4) == path and os.path.getmtime(path) == modified
+
+
+def test_compare_needs_both_relative_and_absolute_change():
+    baseline = report(search_p95=1.0)
+    assert compare(report(search_p95=1.05), baseline, tolerance=0.1) == []      # Within tolerance
+    assert compare(report(search_p95=1.09, build_seconds=2.19), report(1.0, 2.1), tolerance=0.01) == []  # Noise
+    regressions = compare(report(search_p95=1.5), baseline, tolerance=0.1)
+    assert len(regressions) == 1 and 'search_ms.p95' in regressions[0]
+    assert compare(report(search_p95=0.5), baseline, tolerance=0.1) == []       # Faster is fine
+
+
+def test_metric_helpers():
+    assert latency_percentiles([0.001] * 99 + [0.101]) == {'p50': 1.0, 'p95': 1.0, 'p99': 2.0}
+    assert metric({'search_ms': {'p50': 1.5}}, 'search_ms.p50') == 1.5
+    assert metric({'search_ms': None}, 'search_ms.p50') is None
+
+
+def test_baseline_covers_the_default_sizes():
+    with open(BASELINE) as f:
+        baseline = json.load(f)
+    assert sorted(int(size) for size in baseline['results']) == sorted(DEFAULT_SIZES)
+    for result in baseline['results'].values():
+        assert all(metric(result, name) is not None for name in METRICS)
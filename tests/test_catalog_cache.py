@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.parquet as pq
+
+from catalog_cache import read_catalog_cache, write_catalog_cache
+from data_preprocessor import FlipkartDataPreprocessor
+from search_engine import FlipkartSearchEngine
+
+
+def cleaned_frame():
+    return pd.DataFrame({
+        'product_name': ['Linen Shirt', 'Cotton Kurta', None],
+        'brand': ['Acme', 'Acme', 'Other'],
+        'category_hierarchy': [['Clothing', 'Shirts'], [], ['Clothing']],
+        'retail_price': [999.0, 1299.0, None],
+        'discounted_price': [499.0, 899.0, 199.0],
+    })
+
+
+def no_csv(*args, **kwargs):
+    raise AssertionError('CSV parsed despite a fresh cache')
+
+
+def test_round_trip_keeps_types(tmp_path):
+    path = str(tmp_path / 'catalog.parquet')
+    write_catalog_cache(cleaned_frame(), path, 'abc')
+
+    schema = pq.read_schema(path)
+    assert pa.types.is_list(schema.field('category_hierarchy').type)
+    assert pa.types.is_float64(schema.field('retail_price').type)
+    assert pa.types.is_dictionary(schema.field('brand').type)
+
+    cached = read_catalog_cache(path, 'abc')
+    assert cached['category_hierarchy'].tolist() == [['Clothing', 'Shirts'], [], ['Clothing']]
+    assert cached['brand'].tolist() == ['Acme', 'Acme', 'Other']
+    assert cached['retail_price'].isna().tolist() == [False, False, True]
+    assert cached['discounted_price'].tolist() == [499.0, 899.0, 199.0]
+
+
+def test_missing_or_stale_cache_is_ignored(tmp_path):
+    path = str(tmp_path / 'catalog.parquet')
+    assert read_catalog_cache(path, 'abc') is None
+    write_catalog_cache(cleaned_frame(), path, 'abc')
+    assert read_catalog_cache(path, 'def') is None
+
+
+def test_engine_skips_csv_parsing_while_the_source_is_unchanged(tmp_path, catalog_csv, monkeypatch):
+    source = tmp_path / 'catalog.csv'
+    source.write_bytes(open(catalog_csv, 'rb').read())
+    cache = str(tmp_path / 'catalog.parquet')
+    built = FlipkartSearchEngine(str(source), cache_size=0, build_workers=1, catalog_cache=cache)
+
+    read_csv = pd.read_csv
+    monkeypatch.setattr(pd, 'read_csv', no_csv)
+    cached = FlipkartSearchEngine(str(source), cache_size=0, build_workers=1, catalog_cache=cache)
+    assert cached.search('cotton shirt') == built.search('cotton shirt')
+    assert cached.df['category_hierarchy'].tolist() == built.df['category_hierarchy'].tolist()
+
+    monkeypatch.setattr(pd, 'read_csv', read_csv)
+    pd.read_csv(source).head(100).to_csv(source, index=False)
+    changed = FlipkartSearchEngine(str(source), cache_size=0, build_workers=1, catalog_cache=cache)
+    assert len(changed.df) == 100
+    assert len(read_catalog_cache(cache, changed.source_hash)) == 100
+
+
+def test_preprocessor_reuses_the_cache(tmp_path, catalog_csv, monkeypatch):
+    cache = str(tmp_path / 'catalog.parquet')
+    first = FlipkartDataPreprocessor(catalog_csv).load_clean_data(cache)
+    monkeypatch.setattr(pd, 'read_csv', no_csv)
+    second = FlipkartDataPreprocessor(catalog_csv).load_clean_data(cache)
+    assert second['category_hierarchy'].tolist() == first['category_hierarchy'].tolist()
+    assert second['discounted_price'].tolist() == first['discounted_price'].tolist()
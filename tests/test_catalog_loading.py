@@ -0,0 +1,55 @@
+import numpy as np
+
+from data_preprocessor import FlipkartDataPreprocessor
+from search_engine import FlipkartSearchEngine
+from synthetic_catalog import make_catalog
+
+
+def test_chunked_load_keeps_categories_after_missing_values(tmp_path):
+    df = make_catalog(500, seed=3, tail_words=200)
+    df.loc[df.index % 100 == 0, 'category_hierarchy'] = np.nan  # Every chunk starts with a missing value
+    path = tmp_path / 'catalog.csv'
+    df.to_csv(path, index=False)
+
+    whole = FlipkartSearchEngine(str(path), cache_size=0, build_workers=1)
+    chunked = FlipkartSearchEngine(str(path), cache_size=0, build_workers=1, chunk_size=100)
+    assert chunked.df['category_hierarchy'].tolist() == whole.df['category_hierarchy'].tolist()
+    assert sum(not categories for categories in chunked.df['category_hierarchy']) == 5
+
+
+def export_rows(df):
+    """The catalog in the Flipkart export's shape: a JSON-wrapped product_category_tree and rupee prices"""
+    export = df.drop(columns=['category_hierarchy'])
+    export['product_category_tree'] = [f'["{path}"]' for path in df['category_hierarchy']]
+    for column in ('retail_price', 'discounted_price'):
+        export[column] = [f"₹{price:,.0f}" for price in df[column]]
+    return export
+
+
+def test_export_category_tree_and_discount_are_cleaned_in_every_path(tmp_path):
+    df = make_catalog(300, seed=5, tail_words=100)
+    path = tmp_path / 'export.csv'
+    export_rows(df).to_csv(path, index=False)
+    expected_categories = [[item.strip() for item in path.split('>>')] for path in df['category_hierarchy']]
+    expected_discounts = np.round((df['retail_price'] - df['discounted_price']) / df['retail_price'] * 100, 2)
+
+    preprocessor = FlipkartDataPreprocessor(str(path))
+    preprocessor.load_data()
+    preprocessor.clean_data()
+    engines = [FlipkartSearchEngine(str(path), cache_size=0, build_workers=1),
+               FlipkartSearchEngine(str(path), cache_size=0, build_workers=1, chunk_size=64)]
+    for frame in [preprocessor.df] + [engine.df for engine in engines]:
+        assert frame['category_hierarchy'].tolist() == expected_categories
+        assert frame['discounted_price'].tolist() == df['discounted_price'].tolist()
+        assert np.allclose(frame['discount_percentage'], expected_discounts)
+
+    engine = engines[0]
+    category = expected_categories[0][-1].lower()
+    assert category in engine.category_counts
+    assert engine.trending_products(category)
+    assert any(kind == 'category' for _, _, kind in engine.suggest(category[:4]))
+
+    product = export_rows(df.iloc[[0]]).iloc[0].to_dict()  # An upsert in the export's shape is cleaned alike
+    doc_id = engine.upsert_product(dict(product, retail_price='₹2,000', discounted_price='₹1,500'))
+    assert engine.df.at[doc_id, 'category_hierarchy'] == expected_categories[0]
+    assert engine.df.at[doc_id, 'discount_percentage'] == 25.0
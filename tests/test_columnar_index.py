@@ -0,0 +1,67 @@
+import math
+import re
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from columnar_index import top_n_scores
+from search_engine import INDEX_BACKENDS, RETRIEVAL_MODES, SearchEngineBase
+from synthetic_catalog import make_catalog, make_queries
+
+
+def baseline_search(texts, query, top_n):
+    """The original SearchEngineBase.search, with score ties ordered by doc id
+
+    bm25_score found a term's tf by counting the term's postings for the
+    document, which is 1 for any term the document contains.
+    """
+    def tokenize(text):
+        return [word for word in re.sub(r'[^\w\s₹]', '', text.lower()).split() if len(word) > 2]
+
+    index, doc_lengths = defaultdict(list), []
+    for doc_id, text in enumerate(texts):
+        terms = tokenize(text)
+        for term in dict.fromkeys(terms):
+            index[term].append((doc_id, terms.count(term)))
+        doc_lengths.append(len(terms))
+    avg_doc_length = sum(doc_lengths) / len(doc_lengths)
+
+    def bm25_score(query_terms, doc_id):
+        score = 0.0
+        for term in query_terms:
+            tf = sum(1 for entry in index.get(term, []) if entry[0] == doc_id)
+            df = len(index.get(term, []))
+            if df == 0:
+                continue
+            idf = math.log((len(texts) - df + 0.5) / (df + 0.5) + 1)
+            score += idf * (tf * 2.5) / (tf + 1.5 * (0.25 + 0.75 * doc_lengths[doc_id] / avg_doc_length))
+        return score
+
+    query_terms = tokenize(query)
+    doc_scores = defaultdict(float)
+    for term in query_terms:
+        for doc_id, _ in index.get(term, []):
+            doc_scores[doc_id] += bm25_score(query_terms, doc_id)
+    return sorted(doc_scores.items(), key=lambda x: (-x[1], x[0]))[:top_n]
+
+
+@pytest.mark.parametrize('backend', INDEX_BACKENDS)
+@pytest.mark.parametrize('retrieval_mode', RETRIEVAL_MODES)
+def test_ranking_matches_the_original_scoring(backend, retrieval_mode):
+    df = make_catalog(400, seed=2, tail_words=150)
+    engine = SearchEngineBase(df, index_backend=backend, retrieval_mode=retrieval_mode)
+    engine.max_edit_distance = 0  # The original matched query terms exactly
+    engine.build_index()
+    texts = [engine._document_text(row) for row in df.to_dict('records')]
+    for query in make_queries(40, seed=4) + ['cotton cotton shirt', 'slim fit slim']:
+        expected = baseline_search(texts, query, 20)
+        actual = engine.search(query, 20)
+        assert [doc_id for doc_id, _ in actual] == [doc_id for doc_id, _ in expected], query
+        assert [score for _, score in actual] == pytest.approx([score for _, score in expected]), query
+
+
+def test_top_n_scores_with_no_room_is_empty():
+    doc_ids, scores = np.arange(5), np.array([0.5, 2.0, 1.0, 2.0, 0.1])
+    assert top_n_scores(doc_ids, scores, 0) == []
+    assert top_n_scores(doc_ids, scores, 2) == [(1, 2.0), (3, 2.0)]
@@ -0,0 +1,69 @@
+import numpy as np
+
+from columnar_index import ColumnarIndex
+from compressed_index import BLOCK_SIZE, CompressedIndex, varbyte_decode, varbyte_encode
+from search_engine import SearchEngineBase
+from synthetic_catalog import make_catalog
+
+
+def sample_postings(seed=5, num_docs=5000):
+    """Term id -> postings, with an empty term, a one-posting term and lists spanning several blocks"""
+    rng = np.random.default_rng(seed)
+    index = {0: [], 1: [(num_docs - 1, 1)]}
+    for term_id, size in enumerate([3, BLOCK_SIZE, BLOCK_SIZE + 1, 3 * BLOCK_SIZE + 17, 2000], 2):
+        docs = np.sort(rng.choice(num_docs, size, replace=False))
+        tfs = rng.integers(1, 300, size)
+        index[term_id] = list(zip(docs.tolist(), tfs.tolist()))
+    return index, rng.integers(1, 50, num_docs).tolist()
+
+
+def test_varbyte_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 16383, 16384, 2 ** 21, 2 ** 28 + 5, 2 ** 31 - 1])
+    data, lengths = varbyte_encode(values)
+    assert lengths.tolist() == [1, 1, 1, 2, 2, 2, 3, 4, 5, 5]
+    assert varbyte_decode(data).tolist() == values.tolist()
+    assert varbyte_decode(varbyte_encode(np.array([3, 0, 127]))[0]).tolist() == [3, 0, 127]
+    assert len(varbyte_encode(np.array([], dtype=np.int64))[0]) == 0
+
+
+def test_decoded_postings_match_columnar():
+    index, doc_lengths = sample_postings()
+    columnar = ColumnarIndex.from_postings(index, doc_lengths, num_terms=9)
+    compressed = CompressedIndex.from_columnar(columnar)
+    for term_id in range(9):
+        for expected, actual in zip(columnar.postings(term_id), compressed.postings(term_id)):
+            assert actual.tolist() == expected.tolist()
+    assert compressed.doc_ids.tolist() == columnar.doc_ids.tolist()
+    assert compressed.tfs.tolist() == columnar.tfs.tolist()
+    assert compressed.nbytes < columnar.nbytes
+
+    columnar.retire(int(columnar.postings(6)[0][0]))
+    recompressed = CompressedIndex.from_columnar(columnar)
+    assert recompressed.postings(6)[0].tolist() == columnar.postings(6)[0][1:].tolist()
+
+
+def test_block_cursor_skips_like_the_array_cursor():
+    index, doc_lengths = sample_postings()
+    columnar = ColumnarIndex.from_postings(index, doc_lengths)
+    compressed = CompressedIndex.from_columnar(columnar)
+    targets = [0, 40, 41, 900, 901, 2500, 2501, 4990, 6000]
+    for term_id in range(len(columnar)):
+        expected, actual = columnar.cursor(term_id, 1.0, 1), compressed.cursor(term_id, 1.0, 1)
+        assert len(actual) == len(expected)
+        for target in targets:
+            assert actual.skip_to(target) == expected.skip_to(target)
+            assert actual.doc == expected.doc
+            if actual.doc is not None:
+                assert actual.tf == expected.tf
+                actual.next()
+                expected.next()
+                assert actual.doc == expected.doc
+
+
+def test_memory_report_ranks_the_representations():
+    engine = SearchEngineBase(make_catalog(400, seed=2, tail_words=100), index_backend='compressed')
+    engine.build_index()
+    report = engine.memory_report()
+    assert report['postings'] == sum(len(engine._postings(term)) for term in range(len(engine.vocabulary)))
+    assert report['compressed'] < report['columnar'] < report['python_lists']
+    assert report['documents'] == engine.documents.nbytes
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from document_store import DocumentStore
+
+TEXTS = ['cotton shirt', '', 'kurta ₹499 naïve', 'linen saree']
+
+
+def test_append_and_read_back():
+    store = DocumentStore()
+    assert [store.append(text) for text in TEXTS] == [0, 1, 2, 3]
+    assert [store[doc_id] for doc_id in range(len(store))] == TEXTS
+    with pytest.raises(IndexError):
+        store[4]
+
+
+def test_replace_then_compact():
+    store = DocumentStore()
+    store.extend(TEXTS)
+    store.replace(2, 'silk kurta')
+    store.replace(2, 'silk kurta set')
+    store.replace(0, '')
+    assert store.garbage == len('cotton shirt') + len('kurta ₹499 naïve'.encode('utf-8')) + len('silk kurta')
+    expected = ['', '', 'silk kurta set', 'linen saree']
+    assert [store[doc_id] for doc_id in range(4)] == expected
+
+    store.compact()
+    assert [store[doc_id] for doc_id in range(4)] == expected
+    assert store.garbage == 0 and store.nbytes == len(''.join(expected)) + 5 * 8
+
+
+def test_array_round_trip_copies_before_writing():
+    store = DocumentStore()
+    store.extend(TEXTS)
+    store.replace(1, 'denim jacket')
+    blob, offsets = store.to_arrays()
+    blob.flags.writeable = offsets.flags.writeable = False  # As when memory-mapped read-only
+
+    restored = DocumentStore.from_arrays(blob, offsets)
+    assert [restored[doc_id] for doc_id in range(4)] == [TEXTS[0], 'denim jacket', *TEXTS[2:]]
+    restored.replace(0, 'polo shirt')
+    assert restored.append('wool scarf') == 4
+    restored.compact()
+    assert [restored[doc_id] for doc_id in range(5)] == ['polo shirt', 'denim jacket', *TEXTS[2:], 'wool scarf']
+    assert bytes(blob).decode('utf-8') == ''.join([TEXTS[0], 'denim jacket', *TEXTS[2:]])
+    assert isinstance(offsets, np.ndarray) and offsets.tolist()[-1] == len(blob)
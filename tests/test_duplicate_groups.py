@@ -0,0 +1,64 @@
+import pandas as pd
+
+from filter_columns import FilterColumns
+from search_engine import FlipkartSearchEngine
+
+
+def shirt(name, brand, price):
+    return {'product_name': name, 'brand': brand, 'category_hierarchy': 'Clothing >> Shirts',
+            'description': 'cotton shirt', 'retail_price': 999.0, 'discounted_price': price, 'product_rating': 4.0}
+
+
+def unblocked_product(engine):
+    doc_id = next(doc_id for doc_id in range(len(engine.df)) if not engine.filter_columns.blocked[doc_id])
+    return engine.df.iloc[doc_id].to_dict()
+
+
+def partition(groups):
+    """Documents grouped together, independent of the group ids"""
+    members = {}
+    for doc_id, group in enumerate(groups.tolist()):
+        members.setdefault(group, []).append(doc_id)
+    return sorted(members.values())
+
+
+def test_groups_ignore_case_and_whitespace(tmp_path):
+    path = tmp_path / 'catalog.csv'
+    pd.DataFrame([shirt('Oxford Shirt', 'Acme', 499.0), shirt(' oxford shirt', 'ACME ', 450.0),
+                  shirt('Oxford Shirt', 'Other', 480.0)]).to_csv(path, index=False)
+    engine = FlipkartSearchEngine(str(path), cache_size=0, build_workers=1)
+    assert partition(engine.filter_columns.dup_group[:3]) == [[0, 1], [2]]
+
+
+def test_groups_after_upserts_match_a_rebuild(catalog_csv):
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+    product = engine.df.iloc[0].to_dict()
+    first = engine.upsert_product(dict(product, product_name='Zephyr Oxford Shirt'))
+    engine.upsert_product(dict(product, product_name='ZEPHYR OXFORD SHIRT '))
+    engine.upsert_product(dict(product, product_name='Zephyr Oxford Shirt'), 5)
+    engine.upsert_product(dict(product, product_name='Zephyr Linen Shirt'), first)
+
+    size = len(engine.df)
+    rebuilt = FilterColumns.from_frame(engine.df, engine.deleted_docs)
+    assert partition(engine.filter_columns.dup_group[:size]) == partition(rebuilt.dup_group[:size])
+
+
+def test_search_returns_one_product_per_group(catalog_csv):
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+    product = unblocked_product(engine)
+    copies = [engine.upsert_product(dict(product, product_name='Zephyr Oxford Shirt', discounted_price=price))
+              for price in (400.0, 450.0, 500.0)]
+    groups = engine.filter_columns.dup_group
+
+    results = engine.search('zephyr oxford shirt', top_n=20)
+    assert len({groups[doc_id] for doc_id, _ in results}) == len(results)
+    assert sum(doc_id in copies for doc_id, _ in results) == 1
+
+    collapsed = engine.search('zephyr oxford shirt', top_n=20, collapse=True)
+    assert [doc_id for doc_id, *_ in collapsed] == [doc_id for doc_id, _ in results]
+    hidden = {doc_id: variants for doc_id, _, variants in collapsed}
+    assert [hidden[doc_id] for doc_id in hidden if doc_id in copies] == [2]
+
+    engine.delete_product(copies[0])
+    collapsed = engine.search('zephyr oxford shirt', top_n=20, collapse=True)
+    assert [variants for doc_id, _, variants in collapsed if doc_id in copies] == [1]
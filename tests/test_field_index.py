@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from field_index import FieldIndex
+from search_engine import FlipkartSearchEngine
+from vocabulary import Vocabulary
+
+WEIGHTS = {'product_name': 3.0, 'category_hierarchy': 2.0, 'description': 1.0}
+
+
+def field_index(docs, weights=WEIGHTS):
+    index = FieldIndex(Vocabulary(), weights)
+    for doc_id, fields in enumerate(docs):
+        index.add(doc_id, {field: text.split() for field, text in fields.items()})
+    index.compact()
+    return index
+
+
+def test_name_match_outranks_description_match():
+    docs = [{'product_name': 'linen shirt', 'category_hierarchy': 'clothing', 'description': 'soft fabric'},
+            {'product_name': 'cotton shirt', 'category_hierarchy': 'clothing', 'description': 'linen blend'}]
+    index = field_index(docs)
+    scores = index.scores(np.array([0, 1]), [index.vocabulary.get('linen')], [1.0])
+    assert scores[0] > scores[1] > 0
+
+    index = field_index(docs, {**WEIGHTS, 'product_name': 0.0})
+    scores = index.scores(np.array([0, 1]), [index.vocabulary.get('linen')], [1.0])
+    assert scores[0] == 0 and scores[1] > 0
+
+
+def test_unknown_field_weight_is_rejected(catalog_csv):
+    with pytest.raises(ValueError, match='Unknown BM25F fields'):
+        FlipkartSearchEngine(catalog_csv, field_weights={'brand': 2.0})
+
+
+def test_scores_after_updates_match_a_rebuild(catalog_csv):
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+    product = engine.df.iloc[0].to_dict()
+    added = engine.upsert_product(dict(product, product_name='Linen Kurta', description='breezy linen kurta'))
+    engine.upsert_product(dict(product, product_name='Cotton Kurta'), 4)
+    engine.upsert_product(dict(product, description='linen'), added)
+    engine.delete_product(9)
+
+    live = [doc_id for doc_id in range(len(engine.df)) if doc_id not in engine.deleted_docs]
+    query = engine.vocabulary.lookup(['linen', 'kurta', 'cotton', 'unseen'])
+    idfs = [1.0, 0.5, 2.0, 1.0]
+
+    def rebuilt_scores():
+        rebuilt = FieldIndex(engine.vocabulary, engine.field_weights)
+        for doc_id in live:
+            rebuilt.add(doc_id, engine._field_terms(engine.df.iloc[doc_id].to_dict()))
+        rebuilt.compact()
+        return rebuilt.scores(np.array(live), query, idfs)
+
+    expected = rebuilt_scores()
+    assert np.allclose(engine.field_index.scores(np.array(live), query, idfs), expected)
+    engine.compact()
+    assert np.allclose(engine.field_index.scores(np.array(live), query, idfs), expected)
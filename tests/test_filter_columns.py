@@ -0,0 +1,78 @@
+import pandas as pd
+
+from filter_columns import FilterColumns
+from search_engine import FlipkartSearchEngine
+
+
+def write_catalog(tmp_path, rows) -> str:
+    path = tmp_path / 'catalog.csv'
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+def shirt(name, description):
+    return {'product_name': name, 'brand': 'Acme', 'category_hierarchy': 'Clothing >> Shirts',
+            'description': description, 'retail_price': 999.0, 'discounted_price': 499.0, 'product_rating': 4.0}
+
+
+def result_ids(engine, query):
+    return sorted(doc_id for doc_id, *_ in engine.search(query))
+
+
+def test_exclusion_keeps_products_without_description(tmp_path):
+    path = write_catalog(tmp_path, [shirt('Cotton Shirt', 'printed cotton shirt'),
+                                    shirt('Cotton Shirt Slim', None),
+                                    shirt('Cotton Shirt Printed', 'plain')])
+    engine = FlipkartSearchEngine(path, cache_size=0, build_workers=1)
+    assert result_ids(engine, 'cotton shirt') == [0, 1, 2]
+    assert result_ids(engine, 'cotton shirt -printed') == [1]
+
+    engine.upsert_product(engine.df.iloc[1].to_dict(), 1)  # The live path must build the same row
+    assert engine.filter_columns.exclude_text[1] == 'cotton shirt slim '
+    assert result_ids(engine, 'cotton shirt -printed') == [1]
+
+
+def test_filter_masks_after_upserts_match_a_rebuild(catalog_csv):
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+    for doc_id in range(0, 200, 9):
+        product = engine.df.iloc[doc_id].to_dict()
+        engine.upsert_product(dict(product, brand='Puma', discounted_price=350.0, description=None), doc_id + 1)
+        engine.upsert_product(dict(product, category_hierarchy='Footwear >> Sports Shoes'))
+    for doc_id in range(300, 600, 11):
+        engine.delete_product(doc_id)
+
+    rebuilt = FilterColumns.from_frame(engine.df, engine.deleted_docs)
+    rebuilt.set_blocklist(engine.blocked_terms)
+    filter_sets = [
+        {'price': {'max_price': 500}},
+        {'price': {'min_price': 1000}, 'min_rating': 4.0},
+        {'price': {}, 'brands': ['puma', 'nike']},
+        {'price': {}, 'categories': ['sports shoes']},
+        {'price': {}, 'must_include': ['cotton'], 'exclude': ['printed']},
+    ]
+    for filters in filter_sets:
+        rebuilt_mask = rebuilt.mask(filters)
+        assert rebuilt_mask.any(), filters
+        assert (engine.filter_columns.mask(filters, len(engine.df)) == rebuilt_mask).all(), filters
+
+
+def test_blocklist_mask_follows_upserts_and_reloads(catalog_csv):
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+    clean = next(doc_id for doc_id in range(len(engine.df)) if not engine.filter_columns.blocked[doc_id])
+    product = engine.df.iloc[clean].to_dict()
+    lingerie = engine.upsert_product(dict(product, product_name='Cotton Lingerie Set'))
+    briefs = engine.upsert_product(dict(product, brand='Briefly'), 3)  # Blocked by brand
+    cleared = engine.upsert_product(dict(product, product_name='Cotton Shirt'), lingerie)
+    engine.upsert_product(dict(product, product_name='Cotton Lingerie Set'))
+
+    blocked = engine.filter_columns.blocked[:len(engine.df)].copy()
+    rebuilt = FilterColumns.from_frame(engine.df, engine.deleted_docs)
+    rebuilt.set_blocklist(engine.blocked_terms)
+    assert (blocked == rebuilt.blocked[:len(engine.df)]).all()
+    assert blocked[briefs] and not blocked[cleared] and blocked[len(engine.df) - 1]
+    assert not any(blocked[doc_id] for doc_id, *_ in engine.search('cotton lingerie set', top_n=50))
+
+    engine.reload_blocklist(['shirt'])
+    assert not engine.filter_columns.blocked[len(engine.df) - 1]
+    assert engine.filter_columns.blocked[cleared]
+    assert cleared not in [doc_id for doc_id, *_ in engine.search('cotton shirt', top_n=50)]
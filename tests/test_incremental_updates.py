@@ -0,0 +1,54 @@
+import pytest
+
+from search_engine import INDEX_BACKENDS, SearchEngineBase
+from synthetic_catalog import make_catalog, make_queries
+
+QUERIES = make_queries(40, seed=19)
+
+
+def texts_of(engine, queries):
+    return [' '.join(engine.preprocess_text(query)) for query in queries]
+
+
+def term_doc_freqs(engine):
+    return {engine.vocabulary.term(term): df for term, df in engine.doc_freqs.items() if df}
+
+
+def rebuilt(engine):
+    """A fresh index over the engine's current catalog, with the same documents deleted"""
+    fresh = SearchEngineBase(engine.df, index_backend=engine.index_backend)
+    fresh.deleted_docs = set(engine.deleted_docs)
+    fresh.build_index()
+    return fresh
+
+
+@pytest.mark.parametrize('backend', INDEX_BACKENDS)
+def test_updates_match_a_rebuild(backend):
+    df = make_catalog(600, seed=8, tail_words=200)
+    engine = SearchEngineBase(df, index_backend=backend)
+    engine.compaction_threshold = 1.0  # Keep the changes staged and tombstoned until compact()
+    engine.build_index()
+
+    for doc_id in range(0, 90, 3):
+        product = engine.df.iloc[doc_id].to_dict()
+        engine.upsert_product(dict(product, product_name=f"{product['product_name']} linen kurta"))
+        engine.upsert_product(dict(product, description='handloom linen'), doc_id + 1)
+    for doc_id in list(range(100, 300, 7)) + [600, 603]:  # Including appended products
+        engine.delete_product(doc_id)
+    engine.upsert_product(engine.df.iloc[5].to_dict(), 107)  # Bring a deleted product back
+    with pytest.raises(ValueError):
+        engine.delete_product(114)  # Already deleted
+
+    fresh = rebuilt(engine)
+    queries = texts_of(engine, QUERIES) + ['linen kurta', 'handloom linen']
+    for compacted in (False, True):
+        if compacted:
+            engine.compact()
+            assert not engine.tombstones and not engine.pending_changes
+        assert engine.num_docs == fresh.num_docs
+        assert engine.avg_doc_length == pytest.approx(fresh.avg_doc_length)
+        assert term_doc_freqs(engine) == term_doc_freqs(fresh)
+        for query in queries:
+            expected, actual = fresh.search(query, 20), engine.search(query, 20)
+            assert [doc_id for doc_id, _ in actual] == [doc_id for doc_id, _ in expected], query
+            assert [score for _, score in actual] == pytest.approx([score for _, score in expected]), query
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from index_snapshot import read_snapshot, write_snapshot
+from search_engine import INDEX_BACKENDS, FlipkartSearchEngine
+from synthetic_catalog import make_queries
+
+QUERIES = make_queries(40, seed=17)
+
+
+def test_arrays_round_trip_memory_mapped(tmp_path):
+    path = str(tmp_path / 'arrays.fyndidx')
+    arrays = {'ints': np.arange(10, dtype=np.int32), 'floats': np.linspace(0, 1, 7),
+              'matrix': np.arange(12, dtype=np.int64).reshape(3, 4), 'empty': np.zeros(0, dtype=np.uint8)}
+    write_snapshot(path, arrays, {'answer': 42})
+    loaded, meta = read_snapshot(path)
+    assert meta == {'answer': 42}
+    for name, array in arrays.items():
+        assert loaded[name].dtype == array.dtype and np.array_equal(loaded[name], array)
+        assert not loaded[name].flags.writeable
+
+
+@pytest.mark.parametrize('backend', INDEX_BACKENDS)
+def test_engine_round_trip(catalog_csv, tmp_path, backend):
+    path = str(tmp_path / 'catalog.fyndidx')
+    built = FlipkartSearchEngine(catalog_csv, index_backend=backend, snapshot_path=path,
+                                 cache_size=0, build_workers=1)
+    for doc_id in range(0, 40, 4):
+        built.upsert_product(dict(built.df.iloc[doc_id].to_dict(), description='linen blend'), doc_id)
+    for doc_id in range(200, 260, 6):
+        built.delete_product(doc_id)
+    built.save_index(path)
+
+    loaded = FlipkartSearchEngine(catalog_csv, index_backend=backend, snapshot_path=path,
+                                  cache_size=0, build_workers=1)
+    assert loaded.deleted_docs == built.deleted_docs
+    assert loaded.num_docs == built.num_docs
+    pd.testing.assert_series_equal(loaded.df['product_name'], built.df['product_name'], check_dtype=False)
+    for query in QUERIES + ['linen blend']:
+        assert loaded.search(query, top_n=15) == built.search(query, top_n=15), query
+
+
+def test_stale_snapshot_is_rebuilt(catalog_csv, tmp_path):
+    csv_path = tmp_path / 'catalog.csv'
+    df = pd.read_csv(catalog_csv)
+    df.to_csv(csv_path, index=False)
+    path = str(tmp_path / 'catalog.fyndidx')
+    FlipkartSearchEngine(str(csv_path), snapshot_path=path, build_workers=1)
+
+    df.iloc[:1000].to_csv(csv_path, index=False)  # The catalog changed after the snapshot was written
+    engine = FlipkartSearchEngine(str(csv_path), snapshot_path=path, build_workers=1)
+    assert engine.num_docs == 1000
+    assert FlipkartSearchEngine(str(csv_path), snapshot_path=path, build_workers=1).num_docs == 1000
@@ -0,0 +1,59 @@
+import pytest
+
+from search_engine import INDEX_BACKENDS, SearchEngineBase, tokenize_chunk
+from synthetic_catalog import make_catalog, make_queries
+
+CATALOG = make_catalog(800, seed=12, tail_words=200)
+
+
+def index_state(engine):
+    """Everything a build produces, keyed by term string"""
+    terms = engine.vocabulary.terms
+    return {
+        'terms': list(terms),
+        'postings': {terms[term]: list(engine._postings(term)) for term in range(len(terms))},
+        'doc_lengths': list(engine.doc_lengths),
+        'num_docs': engine.num_docs,
+        'total_doc_length': engine.total_doc_length,
+        'bounds': {terms[term]: bound for term, bound in engine.term_bounds.items()},
+    }
+
+
+def built(backend, workers, deleted=()):
+    engine = SearchEngineBase(CATALOG, index_backend=backend, build_workers=workers)
+    engine.parallel_build_min_rows = 0
+    engine.deleted_docs = set(deleted)
+    engine.build_index()
+    return engine
+
+
+def test_chunked_tokenization_matches_one_chunk():
+    texts = [f"cotton shirt {word} {word}" for word in ('linen', 'slim', 'cotton', 'linen')]
+    postings, lengths, bounds = tokenize_chunk(texts, 10)
+    first, second = tokenize_chunk(texts[:2], 10), tokenize_chunk(texts[2:], 12)
+    assert lengths == first[1] + second[1]
+    for term, term_postings in postings.items():
+        assert term_postings == first[0].get(term, []) + second[0].get(term, [])
+    assert bounds['linen'] == (2, 4) and bounds['cotton'] == (3, 4)
+    assert tokenize_chunk(texts, 10, binary_tf=True)[0]['linen'] == [(10, 1), (13, 1)]
+
+    postings, lengths, bounds = tokenize_chunk(texts, 10, deleted=[11, 13])
+    assert lengths == [4, 4, 4, 4]  # Deleted documents keep their length
+    assert postings['linen'] == [(10, 2)] and 'slim' not in postings and 'slim' not in bounds
+
+
+@pytest.mark.parametrize('backend', INDEX_BACKENDS)
+def test_parallel_build_matches_serial_build(backend):
+    deleted = range(3, 800, 11)
+    parallel, serial = built(backend, 2, deleted), built(backend, 1, deleted)
+    assert index_state(parallel) == index_state(serial)
+    for query in make_queries(20, seed=4):
+        assert parallel.search(query) == serial.search(query)
+
+
+def test_repeated_builds_do_not_duplicate_postings():
+    engine = built('columnar', 1)
+    state = index_state(engine)
+    engine.build_index()
+    engine.build_index()
+    assert index_state(engine) == state
@@ -0,0 +1,85 @@
+import numpy as np
+
+from positional_index import PositionalIndex
+from search_engine import FlipkartSearchEngine
+from vocabulary import Vocabulary, tokenize_positions
+
+WORDS = ['cotton', 'shirt', 'slim', 'linen', 'kurta', 'pack', 'of', 'printed']
+
+
+def contains_phrase(text, phrase):
+    """Brute force: some start position has every indexable phrase word at its offset"""
+    words = set(tokenize_positions(text))
+    tokens = tokenize_positions(phrase)
+    first = tokens[0][1]
+    return any(all((word, start + position - first) in words for word, position in tokens)
+               for _, start in words)
+
+
+def random_texts(rng, count):
+    return [' '.join(rng.choice(WORDS, int(rng.integers(1, 8)))) for _ in range(count)]
+
+
+def test_phrase_docs_match_brute_force_through_updates():
+    rng = np.random.default_rng(3)
+    texts = random_texts(rng, 300)
+    index = PositionalIndex.from_texts(texts, Vocabulary(), deleted_docs=[5, 6])
+    live = set(range(len(texts))) - {5, 6}
+
+    for doc_id, text in zip(range(0, 120, 2), random_texts(rng, 60)):
+        index.remove(doc_id)
+        index.add(doc_id, text)
+        texts[doc_id] = text
+        live.add(doc_id)  # Including the deleted 6, brought back
+    for doc_id in range(300, 320):
+        texts.append(random_texts(rng, 1)[0])
+        index.add(doc_id, texts[doc_id])
+        live.add(doc_id)
+    for doc_id in range(130, 200, 5):
+        index.remove(doc_id)
+        live.discard(doc_id)
+
+    phrases = ['cotton shirt', 'slim cotton shirt', 'pack of cotton', 'shirt shirt', 'linen']
+    for compacted in (False, True):
+        if compacted:
+            index.compact()
+        for phrase in phrases:
+            expected = [doc_id for doc_id in sorted(live) if contains_phrase(texts[doc_id], phrase)]
+            assert index.phrase_docs(phrase).tolist() == expected, (phrase, compacted)
+    assert index.phrase_docs('of a') is None
+
+
+def test_proximity_rewards_adjacent_terms():
+    vocabulary = Vocabulary()
+    index = PositionalIndex.from_texts(['slim cotton shirt', 'cotton slim shirt', 'slim printed linen shirt'],
+                                       vocabulary)
+    scores = index.proximity(np.arange(3), vocabulary.lookup(['slim', 'shirt']))
+    assert scores.tolist() == [0.5, 1.0, 1 / 3]
+
+
+def test_quoted_phrases_match_whole_words_and_survive_snapshots(catalog_csv, tmp_path):
+    path = str(tmp_path / 'catalog.fyndidx')
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1, positional_index=True,
+                                  snapshot_path=path)
+    substring = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+    product = next(engine.df.iloc[doc_id].to_dict() for doc_id in range(len(engine.df))
+                   if not engine.filter_columns.blocked[doc_id])
+    names = ['Zephyr Slim Fit Shirt', 'Zephyr Slim Fitted Shirt', 'Zephyr Fit Slim Shirt']
+    added = []
+    for name in names:
+        added.append(engine.upsert_product(dict(product, product_name=name)))
+        substring.upsert_product(dict(product, product_name=name))
+    engine.delete_product(3)
+
+    def matches(engine):
+        return sorted(doc_id for doc_id, _ in engine.search('"slim fit" zephyr shirt', top_n=20) if doc_id in added)
+
+    assert matches(engine) == added[:1]
+    assert matches(substring) == added[:2]  # Without positions the phrase is a substring
+
+    engine.save_index(path)
+    loaded = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1, positional_index=True,
+                                  snapshot_path=path)
+    assert loaded.positions is not None and matches(loaded) == added[:1]
+    for query in ['"cotton shirt"', '"slim fit" shirt', 'zephyr "fit slim"']:
+        assert loaded.search(query, top_n=15) == engine.search(query, top_n=15), query
@@ -0,0 +1,43 @@
+import time
+
+from query_cache import QueryResultCache, freeze
+from search_engine import FlipkartSearchEngine
+
+
+def test_lru_eviction_ttl_and_version_invalidation():
+    cache = QueryResultCache(max_size=2, ttl=60.0)
+    cache.put('a', 1, 'A')
+    cache.put('b', 1, 'B')
+    assert cache.get('a', 1) == 'A'  # 'a' is now the most recently used
+    cache.put('c', 1, 'C')
+    assert cache.get('b', 1) is None and cache.evictions == 1
+    assert cache.get('c', 1) == 'C'
+
+    assert cache.get('a', 2) is None  # A new index version drops every entry
+    assert len(cache) == 0 and cache.invalidations == 2
+
+    cache.ttl = 0.01
+    cache.put('a', 2, 'A')
+    time.sleep(0.02)
+    assert cache.get('a', 2) is None and cache.expirations == 1
+
+
+def test_freeze_is_order_independent():
+    assert freeze({'price': {'max_price': 500}, 'brands': ['nike']}) == \
+        freeze({'brands': ['nike'], 'price': {'max_price': 500}})
+
+
+def test_engine_cache_normalizes_queries_and_follows_updates(catalog_csv):
+    engine = FlipkartSearchEngine(catalog_csv, build_workers=1)
+    results = engine.search('cotton shirt under 2000')
+    assert results
+    assert engine.search('  Cotton   SHIRT under ₹2,000 ') == results
+    assert engine.result_cache.hits == 1
+
+    doc_id = results[0][0]
+    engine.delete_product(doc_id)  # Bumps the index version, so the cached page is not served
+    assert doc_id not in [result[0] for result in engine.search('cotton shirt under 2000')]
+    results = engine.search('cotton shirt under 2000')
+    brand = engine.df.at[results[0][0], 'brand'].lower()
+    engine.reload_blocklist([brand])  # Bumps the blocklist version
+    assert all(engine.df.at[result[0], 'brand'].lower() != brand for result in engine.search('cotton shirt under 2000'))
@@ -0,0 +1,40 @@
+import re
+
+from query_extractor import PhraseMatcher, QueryExtractor
+from synthetic_catalog import BRANDS, CATEGORIES
+
+
+def naive_mentions(phrases, text):
+    """Whole-word mentions found with one regex per phrase"""
+    text = text.lower()
+    return sorted((match.start(), match.start() + len(phrase), phrase) for phrase in phrases
+                  for match in re.finditer(rf'(?<!\w)(?={re.escape(phrase)}(?!\w))', text))
+
+
+def test_matcher_finds_the_same_mentions_as_a_scan_per_phrase():
+    phrases = ['hp', 'apple', 'apple watch', 'watch', "levi's", 'mobile cover', 'cover']
+    matcher = PhraseMatcher(phrases)
+    for text in ['apple watch strap', 'shampoo for hp laptop', "levi's jeans and an apple",
+                 'mobile covers', 'watch, apple watch', 'hp']:
+        assert sorted(matcher.find(text)) == naive_mentions(phrases, text), text
+
+
+def test_extracts_brands_and_categories_in_one_pass():
+    categories = sorted({item.strip().lower() for path in CATEGORIES for item in path.split('>>')})
+    extractor = QueryExtractor(known_brands=BRANDS, known_categories=categories)
+    brand, category = BRANDS[0], categories[0]
+    result = extractor.process(f'{brand.lower()} {category} under 500 "slim fit" -printed')
+    assert result['filters']['brands'] == [brand]
+    assert result['filters']['categories'] == [category]
+    assert result['filters']['price'] == {'max_price': 500.0}
+    assert result['filters']['must_include'] == ['slim fit']
+    assert result['filters']['exclude'] == ['printed']
+    assert result['clean_query'] == ''
+
+
+def test_vocabulary_changes_recompile_the_matcher():
+    extractor = QueryExtractor(known_brands=['puma'])
+    assert extractor.extract_brand_filters('puma shoes')[0] == ['puma']
+    extractor.known_brands = ['nike']
+    assert extractor.extract_brand_filters('puma shoes') == ([], 'puma shoes')
+    assert extractor.extract_brand_filters('nike shoes') == (['nike'], 'shoes')
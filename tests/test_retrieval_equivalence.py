@@ -0,0 +1,75 @@
+import pytest
+
+from search_engine import FlipkartSearchEngine, INDEX_BACKENDS, SearchEngineBase, sp
+from synthetic_catalog import make_queries
+
+QUERIES = make_queries(60, seed=11)
+
+
+def build(catalog_csv, backend, retrieval_mode='exhaustive'):
+    return FlipkartSearchEngine(catalog_csv, index_backend=backend, retrieval_mode=retrieval_mode,
+                                cache_size=0, build_workers=1)
+
+
+def apply_updates(engine):
+    """Append, replace and delete products, leaving some changes staged and uncompacted"""
+    for doc_id in range(0, 60, 3):
+        product = engine.df.iloc[doc_id].to_dict()
+        product['product_name'] = f"{product['product_name']} cotton shirt"
+        engine.upsert_product(product)
+        engine.upsert_product(dict(product, description='slim fit printed cotton'), doc_id + 1)
+    for doc_id in range(100, 400, 7):
+        engine.delete_product(doc_id)
+
+
+def assert_same_results(actual, expected, query):
+    assert [doc_id for doc_id, *_ in actual] == [doc_id for doc_id, *_ in expected], query
+    assert [score for _, score, *_ in actual] == pytest.approx([score for _, score, *_ in expected]), query
+
+
+def retrieval_text(engine, query):
+    """What the base index scores for a query: its terms, without the extracted filters"""
+    return ' '.join(engine.preprocess_text(engine.extractor.normalize(query)))
+
+
+@pytest.mark.parametrize('backend', INDEX_BACKENDS)
+@pytest.mark.parametrize('updated', [False, True])
+def test_wand_matches_exhaustive(catalog_csv, backend, updated):
+    exhaustive, wand = build(catalog_csv, backend), build(catalog_csv, backend, 'wand')
+    if updated:
+        apply_updates(exhaustive)
+        apply_updates(wand)
+    for query in QUERIES:
+        assert_same_results(wand.search(query, top_n=15), exhaustive.search(query, top_n=15), query)
+        text = retrieval_text(exhaustive, query)
+        assert_same_results(SearchEngineBase.search(wand, text, 25), SearchEngineBase.search(exhaustive, text, 25),
+                            text)
+
+
+@pytest.mark.skipif(sp is None, reason="search_many needs scipy")
+@pytest.mark.parametrize('backend', INDEX_BACKENDS)
+@pytest.mark.parametrize('updated', [False, True])
+def test_search_many_matches_search(catalog_csv, backend, updated):
+    engine = build(catalog_csv, backend)
+    if updated:
+        apply_updates(engine)
+    for query, batched in zip(QUERIES, engine.search_many(QUERIES, top_n=15)):
+        assert batched == engine.search(query, top_n=15), query
+    texts = [retrieval_text(engine, query) for query in QUERIES]
+    for text, batched in zip(texts, SearchEngineBase.search_many(engine, texts, 25)):
+        assert batched == SearchEngineBase.search(engine, text, 25), text
+
+
+def test_wand_counts_skipped_postings(catalog_csv):
+    engine = build(catalog_csv, 'columnar', 'wand')
+    for query in QUERIES:
+        text = retrieval_text(engine, query)
+        before = dict(engine.pruning_stats)
+        SearchEngineBase.search(engine, text, 5)
+        term_ids = engine.vocabulary.lookup(engine.preprocess_text(text))
+        postings = sum(engine.doc_freqs.get(term, 0) for term in set(term_ids))
+        scored = engine.pruning_stats['docs_scored'] - before['docs_scored']
+        skipped = engine.pruning_stats['postings_skipped'] - before['postings_skipped']
+        # A scored document uses at least one of the postings; every other posting is skipped or scored
+        assert scored + skipped <= postings, text
+    assert engine.pruning_stats['postings_skipped'] > 0
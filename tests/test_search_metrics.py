@@ -0,0 +1,64 @@
+import pytest
+
+from search_engine import FlipkartSearchEngine
+from search_metrics import Histogram, QueryTrace, SearchMetrics, StageTimer
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram((0.001, 0.01, 0.1))
+    for seconds in (0.0005, 0.001, 0.002, 0.05, 3.0):
+        histogram.observe(seconds)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.count == 5 and histogram.sum == pytest.approx(3.0535)
+    assert histogram.quantile(0.4) == 0.001 and histogram.quantile(0.8) == 0.1
+    assert histogram.quantile(1.0) == float('inf')
+
+
+def test_prometheus_text():
+    metrics = SearchMetrics(namespace='test')
+    metrics.observe('retrieve', 0.0003)
+    metrics.observe('retrieve', 7.0)
+    metrics.increment('queries', 2)
+    lines = metrics.to_prometheus().splitlines()
+
+    assert '# TYPE test_stage_seconds histogram' in lines
+    assert 'test_stage_seconds_bucket{stage="retrieve",le="0.0005"} 1' in lines
+    assert 'test_stage_seconds_bucket{stage="retrieve",le="2.5"} 1' in lines
+    assert 'test_stage_seconds_bucket{stage="retrieve",le="+Inf"} 2' in lines
+    assert 'test_stage_seconds_count{stage="retrieve"} 2' in lines
+    assert 'test_queries_total 2' in lines and 'test_cache_hits_total 0' in lines  # Known counters always listed
+
+    metrics.reset()
+    assert metrics.summary() == {} and 'test_queries_total 0' in metrics.to_prometheus()
+
+
+def test_timer_feeds_metrics_and_trace():
+    metrics, trace = SearchMetrics(), QueryTrace('cotton shirt')
+    timer = StageTimer(metrics, trace)
+    timer.lap('spelling')
+    timer.count('documents_scored', 3)
+    assert [stage for stage, _ in trace.stages] == ['spelling'] and trace.counters == {'documents_scored': 3}
+    assert metrics.summary()['spelling']['count'] == 1 and metrics.counters['documents_scored'] == 3
+    assert trace.as_dict()['stages'][0]['stage'] == 'spelling'
+
+
+def test_engine_records_every_stage(catalog_csv):
+    metrics = SearchMetrics()
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=16, build_workers=1, metrics=metrics)
+    plain = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+
+    trace = QueryTrace('cotton shirt under 5000')
+    results = engine.search('cotton shirt under 5000', trace=trace)
+    assert results == plain.search('cotton shirt under 5000')
+    stages = [stage for stage, _ in trace.stages]
+    assert stages[:4] == ['extract_filters', 'cache_lookup', 'spelling', 'filter']
+    assert stages[-3:] == ['retrieve', 'rank', 'dedup']
+    assert any(stage.startswith('bm25_') for stage in stages[4:-3])
+    assert trace.counters['queries'] == 1 and trace.counters['postings_scanned'] > 0
+    assert trace.counters['candidates_filtered'] > 0 and trace.counters['documents_scored'] > 0
+
+    cached = QueryTrace('cotton shirt under 5000')
+    assert engine.search('cotton shirt under 5000', trace=cached) == results
+    assert [stage for stage, _ in cached.stages] == ['extract_filters', 'cache_lookup']
+    assert metrics.counters['queries'] == 2 and metrics.counters['cache_hits'] == 1
+    assert metrics.summary()['extract_filters']['count'] == 2 and metrics.summary()['rank']['count'] == 1
@@ -0,0 +1,56 @@
+import pytest
+
+from search_engine import FlipkartSearchEngine
+from sharded_engine import ShardedSearchEngine
+from synthetic_catalog import make_queries
+
+QUERIES = make_queries(40, seed=13)
+
+
+def apply_updates(engine):
+    """Append products to the last shard, replace products in the first and delete across all shards"""
+    for doc_id in range(0, 30, 3):
+        product = engine.df.iloc[doc_id].to_dict()
+        engine.upsert_product(dict(product, product_name=f"{product['product_name']} cotton shirt"))
+        engine.upsert_product(dict(product, description='slim fit printed cotton'), doc_id + 1)
+    for doc_id in range(50, 1500, 97):
+        engine.delete_product(doc_id)
+    engine.upsert_product(engine.df.iloc[2].to_dict(), 147)  # Bring a deleted product back
+
+
+@pytest.mark.parametrize('updated', [False, True])
+def test_sharded_matches_unsharded(catalog_csv, updated):
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+    with ShardedSearchEngine(catalog_csv, num_shards=3, cache_size=0) as sharded:
+        if updated:
+            apply_updates(engine)
+            apply_updates(sharded)
+        assert sharded.num_docs == engine.num_docs
+        for query in QUERIES:
+            expected, actual = engine.search(query, top_n=15), sharded.search(query, top_n=15)
+            assert [doc_id for doc_id, *_ in actual] == [doc_id for doc_id, *_ in expected], query
+            assert [score for _, score, *_ in actual] == pytest.approx([score for _, score, *_ in expected]), query
+
+
+def test_workers_shut_down(catalog_csv):
+    with ShardedSearchEngine(catalog_csv, num_shards=2, cache_size=0) as sharded:
+        finalizer = sharded._finalizer
+        assert finalizer.alive
+    assert not finalizer.alive and not sharded.shards
+
+    sharded = ShardedSearchEngine(catalog_csv, num_shards=2, cache_size=0)
+    finalizer = sharded._finalizer
+    del sharded
+    assert not finalizer.alive
+
+
+def test_snapshot_round_trip_keeps_updates(catalog_csv, tmp_path):
+    path = str(tmp_path / 'catalog.fyndidx')
+    with ShardedSearchEngine(catalog_csv, num_shards=3, cache_size=0, snapshot_path=path) as sharded:
+        apply_updates(sharded)
+        sharded.save_index(path)
+        expected = [sharded.search(query, top_n=15) for query in QUERIES]
+    with ShardedSearchEngine(catalog_csv, num_shards=2, cache_size=0, snapshot_path=path) as loaded:
+        assert loaded.num_shards == 3  # Sharded as when it was saved
+        for query, results in zip(QUERIES, expected):
+            assert loaded.search(query, top_n=15) == results, query
@@ -0,0 +1,27 @@
+import pytest
+
+from search_engine import FlipkartSearchEngine, INDEX_BACKENDS
+
+MISSPELLED_QUERIES = ['cotton cototn', 'cotton cotton octton', 'shirt shrit', 'leather lether wallet']
+
+
+@pytest.mark.parametrize('backend', INDEX_BACKENDS)
+def test_wand_matches_exhaustive_with_corrected_terms(catalog_csv, backend):
+    exhaustive = FlipkartSearchEngine(catalog_csv, index_backend=backend, cache_size=0, build_workers=1)
+    wand = FlipkartSearchEngine(catalog_csv, index_backend=backend, retrieval_mode='wand',
+                                cache_size=0, build_workers=1)
+    for query in MISSPELLED_QUERIES:
+        expected = exhaustive.search(query, top_n=20)
+        assert expected.corrections, query
+        actual = wand.search(query, top_n=20)
+        assert [doc_id for doc_id, _ in actual] == [doc_id for doc_id, _ in expected], query
+        assert [score for _, score in actual] == pytest.approx([score for _, score in expected])
+
+
+def test_search_returns_corrections(catalog_csv):
+    engine = FlipkartSearchEngine(catalog_csv, build_workers=1)
+    results = engine.search('leather lether wallet')
+    assert results.corrections == {'lether': 'leather'}
+    assert engine.search('leather lether wallet').corrections == results.corrections  # From the result cache
+    assert engine.search_many(['shirt shrit', 'cotton shirt'])[0].corrections == {'shrit': 'shirt'}
+    assert engine.search('cotton shirt').corrections == {}
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from search_engine import FlipkartSearchEngine
+from trending_index import TRENDING_METRICS, TrendingIndex, trending_values
+
+
+def unblocked_product(engine):
+    doc_id = next(doc_id for doc_id in range(len(engine.df)) if not engine.filter_columns.blocked[doc_id])
+    return engine.df.iloc[doc_id].to_dict()
+
+
+def assert_matches_rebuild(engine):
+    rebuilt = TrendingIndex.from_frame(engine.df, engine.filter_columns, capacity=5)
+    for metric in TRENDING_METRICS:
+        for category in [None] + sorted(engine.filter_columns.category_vocab)[:20]:
+            assert engine.trending_products(category, 5, metric) == rebuilt.top(metric, category, 5)
+
+
+def test_trending_values():
+    discount, rating, score = trending_values([1000.0, 0.0, None], [250.0, 10.0, 5.0], [4.0, 'No rating', 3.0])
+    assert discount[0] == 75.0 and np.isnan(discount[1:]).all()
+    assert rating[0] == 4.0 and np.isnan(rating[1]) and rating[2] == 3.0
+    assert score.tolist() == pytest.approx([1 + 0.75 + 0.8, 1.0, 1.6])
+
+
+def test_trending_after_updates_matches_a_rebuild(catalog_csv):
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+    engine.trending = TrendingIndex.from_frame(engine.df, engine.filter_columns, capacity=5)  # Exercise refills
+    product = unblocked_product(engine)
+
+    for price in (10.0, 20.0, 30.0):
+        engine.upsert_product(dict(product, retail_price=10_000.0, discounted_price=price, product_rating=5.0))
+    for doc_id, _ in engine.trending_products(limit=4):
+        engine.delete_product(doc_id)  # Drain the whole-catalog heaps below their capacity
+    for doc_id, _ in engine.trending_products(limit=3, metric='rating'):
+        engine.upsert_product(dict(product, product_rating=1.0), doc_id)
+    engine.upsert_product(dict(product, brand='Briefly', retail_price=10_000.0, discounted_price=1.0), 11)
+    assert_matches_rebuild(engine)
+
+    engine.reload_blocklist(engine.blocked_terms + ['shirt'])
+    assert_matches_rebuild(engine)
+
+
+def test_trending_matches_a_full_sort(catalog_csv):
+    engine = FlipkartSearchEngine(catalog_csv, cache_size=0, build_workers=1)
+    for doc_id in range(0, 300, 3):
+        engine.delete_product(doc_id)
+    discount, _, _ = trending_values(engine.df['retail_price'], engine.df['discounted_price'],
+                                     engine.df['product_rating'])
+    eligible = [doc_id for doc_id in range(len(engine.df))
+                if doc_id not in engine.deleted_docs and not engine.filter_columns.blocked[doc_id]
+                and np.isfinite(discount[doc_id])]
+    expected = sorted(eligible, key=lambda doc_id: (-discount[doc_id], doc_id))[:10]
+    assert [doc_id for doc_id, _ in engine.trending_products(limit=10)] == expected
+    with pytest.raises(ValueError):
+        engine.trending_products(metric='popularity')
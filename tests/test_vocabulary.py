@@ -0,0 +1,54 @@
+import math
+
+from search_engine import SearchEngineBase
+from synthetic_catalog import make_catalog
+from vocabulary import BATCH_SEPARATOR, Vocabulary, tokenize, tokenize_batch, tokenize_positions, tokenize_query
+
+TEXTS = [
+    'Printed Cotton Shirt (Pack of 2)',
+    "Men's slim-fit JEANS, ₹1,299 only",
+    '',
+    'Ärmel İstanbul straße naïve',
+    'a an the of',
+    '  tabs\tand\nnewlines  ',
+]
+
+
+def test_batch_tokenization_matches_per_text():
+    assert tokenize_batch(TEXTS) == [tokenize(text) for text in TEXTS]
+    assert tokenize(TEXTS[1]) == ['mens', 'slimfit', 'jeans', '₹1299', 'only']
+    assert tokenize_batch([]) == []
+
+
+def test_batch_tokenization_falls_back_for_awkward_texts():
+    texts = [f'cotton{BATCH_SEPARATOR}shirt', 'linen kurta', None, math.nan]
+    assert tokenize_batch(texts) == [['cotton', 'shirt'], ['linen', 'kurta'], [], []]
+    assert tokenize_batch(texts[:2]) == [['cotton', 'shirt'], ['linen', 'kurta']]
+
+
+def test_positions_count_dropped_words():
+    assert tokenize_positions('pack of 2 cotton shirts') == [('pack', 0), ('cotton', 3), ('shirts', 4)]
+    assert tokenize_query('Cotton  SHIRT') == ('cotton', 'shirt')
+
+
+def test_ids_are_dense_and_first_seen():
+    vocabulary = Vocabulary(['shirt', 'cotton'])
+    assert vocabulary.add_all(['cotton', 'linen', 'shirt']) == [1, 2, 0]
+    assert vocabulary.lookup(['linen', 'denim']) == [2, None]
+    assert vocabulary.term(2) == 'linen' and 'denim' not in vocabulary and len(vocabulary) == 3
+
+
+def test_term_ids_survive_updates():
+    engine = SearchEngineBase(make_catalog(300, seed=3, tail_words=100), build_workers=1)
+    engine.build_index()
+    ids = dict(engine.vocabulary.ids)
+
+    product = engine.df.iloc[0].to_dict()
+    engine.upsert_product(dict(product, description='zanzibar weave'), 0)
+    for doc_id in range(1, 40):
+        engine.delete_product(doc_id)
+    engine.compact()
+    engine.build_index()
+
+    assert {term: engine.vocabulary.get(term) for term in ids} == ids
+    assert engine.vocabulary.get('zanzibar') == len(ids)
@@ -0,0 +1,134 @@
+import heapq
+from bisect import bisect_left
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+_doc_of = itemgetter(0)
+
+
+class PostingCursor:
+    """Forward-only cursor over a [(doc_id, tf)] posting list sorted by doc id"""
+
+    def __init__(self, term: str, postings: List[Tuple[int, int]], bound: float, weight: int):
+        self.term = term
+        self.postings = postings
+        self.bound = bound    # Upper bound of this term's BM25 weight in any document
+        self.weight = weight  # Occurrences of the term in the query
+        self.position = 0
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    @property
+    def doc(self) -> Optional[int]:
+        if self.position < len(self.postings):
+            return self.postings[self.position][0]
+        return None
+
+    @property
+    def tf(self) -> int:
+        return self.postings[self.position][1]
+
+    def is_live(self) -> bool:
+        return True
+
+    def next(self):
+        self.position += 1
+
+    def skip_to(self, doc_id: int) -> int:
+        """Advance to the first posting >= doc_id; returns the number of postings passed over"""
+        target = bisect_left(self.postings, doc_id, lo=self.position, key=_doc_of)
+        skipped = target - self.position
+        self.position = target
+        return skipped
+
+
+class ArrayPostingCursor(PostingCursor):
+    """PostingCursor over the doc id / tf arrays of a ColumnarIndex"""
+
+    def __init__(self, term: str, doc_ids: np.ndarray, tfs: np.ndarray, live: np.ndarray,
+                 bound: float, weight: int):
+        super().__init__(term, doc_ids, bound, weight)
+        self.tfs = tfs
+        self.live = live  # ColumnarIndex.live; retired documents are passed over
+
+    @property
+    def doc(self) -> Optional[int]:
+        if self.position < len(self.postings):
+            return int(self.postings[self.position])
+        return None
+
+    @property
+    def tf(self) -> int:
+        return int(self.tfs[self.position])
+
+    def is_live(self) -> bool:
+        return bool(self.live[self.postings[self.position]])
+
+    def skip_to(self, doc_id: int) -> int:
+        target = self.position + int(np.searchsorted(self.postings[self.position:], doc_id))
+        skipped = target - self.position
+        self.position = target
+        return skipped
+
+
+def wand_top_k(cursors: List[PostingCursor], score_doc: Callable[[int, Dict[str, int]], Optional[float]],
+               top_n: int, stats: Dict[str, int]) -> List[Tuple[int, float]]:
+    """Exact top-k with WAND pivoting
+
+    score_doc(doc_id, tf_by_term) returns the document score, or None when the
+    document must be ignored. A document matching the query-term set T scores at
+    most (sum of weights in T) * (sum of weight * bound in T), which is what the
+    pivot search accumulates. Results match exhaustive scoring with ties ranked
+    by ascending doc id: documents are visited in doc id order, so a later
+    document can only displace the current k-th result with a strictly higher score.
+    """
+    if top_n <= 0:
+        return []
+    heap = []  # (score, -doc_id) min-heap holding the current top_n
+    cursors = [cursor for cursor in cursors if len(cursor)]
+
+    while cursors:
+        cursors.sort(key=lambda cursor: cursor.doc)
+        threshold = heap[0][0] if len(heap) >= top_n else None
+
+        # Find the first cursor at which the accumulated bound can beat the threshold
+        pivot = None
+        weight_sum = bound_sum = 0.0
+        for i, cursor in enumerate(cursors):
+            weight_sum += cursor.weight
+            bound_sum += cursor.weight * cursor.bound
+            if threshold is None or weight_sum * bound_sum * (1 + 1e-9) > threshold:
+                pivot = i
+                break
+        if pivot is None:
+            stats['postings_skipped'] += sum(len(cursor) - cursor.position for cursor in cursors)
+            break
+
+        pivot_doc = cursors[pivot].doc
+        if cursors[0].doc == pivot_doc:
+            tf_by_term = {}
+            for cursor in cursors:
+                if cursor.doc != pivot_doc:
+                    break
+                if cursor.is_live():
+                    tf_by_term.setdefault(cursor.term, cursor.tf)
+                cursor.next()
+
+            score = score_doc(pivot_doc, tf_by_term) if tf_by_term else None
+            if score is not None:
+                stats['docs_scored'] += 1
+                entry = (score, -pivot_doc)
+                if len(heap) < top_n:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+        else:
+            # Documents before the pivot cannot make the top k on their own terms
+            for cursor in cursors[:pivot]:
+                stats['postings_skipped'] += cursor.skip_to(pivot_doc)
+
+        cursors = [cursor for cursor in cursors if cursor.doc is not None]
+
+    return [(-neg_doc, score) for score, neg_doc in sorted(heap, reverse=True)]
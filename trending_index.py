@@ -0,0 +1,176 @@
+import heapq
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from filter_columns import FilterColumns
+
+TRENDING_METRICS = ('discount', 'rating', 'score')
+ALL_CATEGORIES = -1  # Heap key of the whole catalog
+
+
+def trending_values(retail_price, discounted_price, rating) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(discount percentage, rating, combined score) arrays; NaN where a value is unknown
+
+    The combined score is the discount and rating boost the e-commerce ranking
+    has always used: 1 + discount% * 0.01 + rating * 0.2.
+    """
+    retail = pd.to_numeric(pd.Series(retail_price), errors='coerce').to_numpy(dtype=np.float64)
+    price = pd.to_numeric(pd.Series(discounted_price), errors='coerce').to_numpy(dtype=np.float64)
+    rating = np.array(pd.to_numeric(pd.Series(rating), errors='coerce'), dtype=np.float64)  # Writable copy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discount = np.where((retail > 0) & np.isfinite(price), (retail - price) / retail * 100, np.nan)
+    score = 1 + np.nan_to_num(discount, nan=0.0) * 0.01 + np.nan_to_num(rating, nan=0.0) * 0.2
+    return discount, rating, score
+
+
+class TrendingIndex:
+    """Per-category top-K heaps of products by discount, rating and combined score
+
+    Each (metric, category) heap holds the best up to `capacity` live,
+    unblocked products as (value, -doc_id) entries, so ties rank by ascending
+    doc id. `floors` records the best entry ever left out of a heap: every
+    product outside the heap ranks at or below it. Updates only touch the
+    heaps of the product's categories, and a lookup reads one heap, so
+    trending queries cost O(K) whatever the catalog size. A heap emptied by
+    removals below the requested limit is refilled from the columns.
+    """
+
+    def __init__(self, columns: FilterColumns, capacity: int = 200):
+        self.columns = columns  # Categories, liveness and blocklist flags per doc id
+        self.capacity = capacity
+        self.values = {metric: np.full(0, np.nan) for metric in TRENDING_METRICS}
+        self.heaps: Dict[Tuple[str, int], List[Tuple[float, int]]] = {}
+        self.floors: Dict[Tuple[str, int], Tuple[float, int]] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: FilterColumns, capacity: int = 200) -> 'TrendingIndex':
+        trending = cls(columns, capacity)
+        retail = df['retail_price'] if 'retail_price' in df.columns else np.full(len(df), np.nan)
+        rating = df['product_rating'] if 'product_rating' in df.columns else np.full(len(df), np.nan)
+        for metric, values in zip(TRENDING_METRICS, trending_values(retail, df['discounted_price'], rating)):
+            trending.values[metric] = values
+        trending.rebuild()
+        return trending
+
+    def rebuild(self):
+        """Refill every heap from the columns, e.g. after the blocklist changed"""
+        for metric in TRENDING_METRICS:
+            self._fill(metric)
+
+    def _eligible(self, size: int) -> np.ndarray:
+        return self.columns.live[:size] & ~self.columns.blocked[:size]
+
+    def _categories(self, doc_id: int) -> List[int]:
+        """Heap keys a product belongs to: the whole catalog and every level of its hierarchy"""
+        return [ALL_CATEGORIES] + list(dict.fromkeys(int(c) for c in self.columns.category_ids[doc_id] if c >= 0))
+
+    def _fill(self, metric: str, category: Optional[int] = None):
+        """Rebuild the heaps of one metric (of one category, when given) from the columns"""
+        values = self.values[metric]
+        size = min(len(values), self.columns.size)
+        eligible = self._eligible(size) & np.isfinite(values[:size])
+        category_ids = self.columns.category_ids[:size]
+        if category is None or category == ALL_CATEGORIES:
+            docs = [np.flatnonzero(eligible)]
+            cats = [np.full(len(docs[0]), ALL_CATEGORIES, dtype=np.int64)]
+        else:
+            docs, cats = [], []
+        if category is None:
+            # (doc, category) pairs, once per pair even if a category repeats in a hierarchy
+            pair_docs, levels = np.nonzero((category_ids >= 0) & eligible[:, None])
+            pairs = np.unique(category_ids[pair_docs, levels].astype(np.int64) * (size + 1) + pair_docs)
+            docs.append(pairs % (size + 1))
+            cats.append(pairs // (size + 1))
+        elif category != ALL_CATEGORIES:
+            docs.append(np.flatnonzero(eligible & (category_ids == category).any(axis=1)))
+            cats.append(np.full(len(docs[-1]), category, dtype=np.int64))
+        docs, cats = np.concatenate(docs), np.concatenate(cats)
+
+        order = np.lexsort((docs, -values[docs], cats))
+        docs, cats = docs[order], cats[order]
+        starts = np.flatnonzero(np.r_[True, cats[1:] != cats[:-1]]) if len(cats) else np.empty(0, dtype=np.int64)
+        ends = np.r_[starts[1:], len(cats)].astype(np.int64)
+        if category is None:
+            self.heaps = {key: heap for key, heap in self.heaps.items() if key[0] != metric}
+            self.floors = {key: floor for key, floor in self.floors.items() if key[0] != metric}
+        else:
+            self.heaps[(metric, category)] = []
+            self.floors.pop((metric, category), None)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            key = (metric, int(cats[start]))
+            top = docs[start:min(end, start + self.capacity)]
+            heap = list(zip(values[top].tolist(), (-top).tolist()))
+            heapq.heapify(heap)
+            self.heaps[key] = heap
+            if end - start > self.capacity:
+                left_out = int(docs[start + self.capacity])
+                self.floors[key] = (float(values[left_out]), -left_out)
+
+    def _reserve(self, capacity: int):
+        for metric, values in self.values.items():
+            if capacity > len(values):
+                grow = max(capacity, 2 * len(values)) - len(values)
+                self.values[metric] = np.concatenate([values, np.full(grow, np.nan)])
+
+    def remove(self, doc_id: int):
+        """Take a product out of its heaps; call before its columns change"""
+        if doc_id >= len(self.values['score']):
+            return
+        categories = self._categories(doc_id)
+        for metric, values in self.values.items():
+            entry = (float(values[doc_id]), -doc_id)
+            for category in categories:
+                heap = self.heaps.get((metric, category))
+                if heap and heap[0] <= entry:  # Only entries at or above the heap minimum can be in it
+                    try:
+                        heap.remove(entry)
+                    except ValueError:
+                        continue
+                    heapq.heapify(heap)
+            values[doc_id] = np.nan
+
+    def set_row(self, doc_id: int, product):
+        """Insert or update a product's heap entries; call after its columns are set"""
+        self._reserve(doc_id + 1)
+        product_values = trending_values([product.get('retail_price')], [product.get('discounted_price')],
+                                         [product.get('product_rating')])
+        eligible = self.columns.live[doc_id] and not self.columns.blocked[doc_id]
+        categories = self._categories(doc_id)
+        for metric, value in zip(TRENDING_METRICS, product_values):
+            value = float(value[0])
+            self.values[metric][doc_id] = value
+            if not eligible or not np.isfinite(value):
+                continue
+            entry = (value, -doc_id)
+            for category in categories:
+                key = (metric, category)
+                floor = self.floors.get(key)
+                if floor is not None and entry <= floor:
+                    continue  # Ranks below a product already left out
+                heap = self.heaps.setdefault(key, [])
+                if len(heap) < self.capacity:
+                    heapq.heappush(heap, entry)
+                else:
+                    popped = heapq.heappushpop(heap, entry)
+                    self.floors[key] = popped if floor is None else max(popped, floor)
+
+    def top(self, metric: str = 'discount', category: Optional[str] = None,
+            limit: int = 10) -> List[Tuple[int, float]]:
+        """(doc_id, value) of the best products in a category (or the whole catalog), best first
+
+        At most `capacity` products are returned.
+        """
+        if metric not in TRENDING_METRICS:
+            raise ValueError(f"Unknown trending metric: {metric}")
+        if category:
+            category_id = self.columns.category_vocab.get(category.strip().lower())
+            if category_id is None:
+                return []
+        else:
+            category_id = ALL_CATEGORIES
+        key = (metric, category_id)
+        heap = self.heaps.get(key, [])
+        if len(heap) < min(limit, self.capacity) and key in self.floors:
+            self._fill(metric, category_id)  # Removals used up the heap; products were left out
+            heap = self.heaps[key]
+        return [(-neg_doc, value) for value, neg_doc in heapq.nlargest(limit, heap)]
@@ -0,0 +1,90 @@
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Characters dropped before splitting; ₹ is kept so prices like "₹500" stay one token
+STRIP_PATTERN = re.compile(r'[^\w\s₹]')
+MIN_TOKEN_LENGTH = 3  # Ignore short words
+# Joins texts for batch tokenization; whitespace, so STRIP_PATTERN keeps it
+BATCH_SEPARATOR = '\x1e'
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalize and tokenize text for indexing"""
+    if not isinstance(text, str):
+        return []
+    return [word for word in STRIP_PATTERN.sub('', text.lower()).split() if len(word) >= MIN_TOKEN_LENGTH]
+
+
+def tokenize_positions(text: str) -> List[Tuple[str, int]]:
+    """tokenize, with each token's word position; dropped short words still take up a position"""
+    if not isinstance(text, str):
+        return []
+    return [(word, position) for position, word in enumerate(STRIP_PATTERN.sub('', text.lower()).split())
+            if len(word) >= MIN_TOKEN_LENGTH]
+
+
+@lru_cache(maxsize=4096)
+def tokenize_query(text: str) -> Tuple[str, ...]:
+    """tokenize, memoized for repeated query strings"""
+    return tuple(tokenize(text))
+
+
+def tokenize_batch(texts: Sequence[str]) -> List[List[str]]:
+    """tokenize applied to every text, with one regex pass over the whole batch
+
+    Lowercasing and stripping work character by character, so running them
+    once over the joined texts gives the same tokens as running them per text.
+    """
+    if not texts:
+        return []
+    if not all(isinstance(text, str) for text in texts):
+        return [tokenize(text) for text in texts]
+    joined = BATCH_SEPARATOR.join(texts)
+    if joined.count(BATCH_SEPARATOR) != len(texts) - 1:
+        return [tokenize(text) for text in texts]  # A text contains the separator itself
+    return [[word for word in part.split() if len(word) >= MIN_TOKEN_LENGTH]
+            for part in STRIP_PATTERN.sub('', joined.lower()).split(BATCH_SEPARATOR)]
+
+
+class Vocabulary:
+    """Dense integer ids for terms, shared by every index of an engine
+
+    Ids are assigned in first-seen order and never reused, so postings,
+    statistics and snapshots can key on ints instead of term strings.
+    """
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self.ids: Dict[str, int] = {}
+        self.terms: List[str] = []
+        for term in terms:
+            self.add(term)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.ids
+
+    def add(self, term: str) -> int:
+        """Id of term, assigning the next one if it is new"""
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = self.ids[term] = len(self.terms)
+            self.terms.append(sys.intern(term))
+        return term_id
+
+    def add_all(self, terms: Iterable[str]) -> List[int]:
+        return [self.add(term) for term in terms]
+
+    def get(self, term: str) -> Optional[int]:
+        """Id of term, or None when it was never indexed"""
+        return self.ids.get(term)
+
+    def lookup(self, terms: Iterable[str]) -> List[Optional[int]]:
+        """Ids of query terms, None for terms outside the vocabulary"""
+        return [self.ids.get(term) for term in terms]
+
+    def term(self, term_id: int) -> str:
+        return self.terms[term_id]